@@ -3,13 +3,20 @@ import os
 import dash
 import dash_bootstrap_components as dbc
 import dash_mantine_components as dmc
-from dash import Dash, dcc, html
+import diskcache
+from dash import Dash, DiskcacheManager, dcc, html
 from icecream import install, ic
 
 from components.footer import my_footer
 from components.navbar import my_navbar
+from utils.api import api
+from utils.comfort_boundaries import background_cache_path
+from utils.heat_balance import compile_two_nodes
+from utils.instrumentation import instrument_app
 from utils.my_config_file import (
+    BackgroundSettings,
     Config,
+    InstrumentationSettings,
     MyStores,
     ElementsIDs,
     Dimensions,
@@ -23,6 +30,13 @@ ic.configureOutput(includeContext=True)
 # This is required by dash mantine components to work with react 18
 dash._dash_renderer._set_react_version("18.2.0")
 
+# heavy charts run in separate processes, their jobs and results are kept on disk
+background_callback_manager = DiskcacheManager(
+    diskcache.Cache(str(background_cache_path())),
+    expire=BackgroundSettings.expire.value,
+)
+compile_two_nodes()
+
 # Exposing the Flask Server to enable configuring it for logging in
 app = Dash(
     __name__,
@@ -45,8 +59,12 @@ app = Dash(
     prevent_initial_callbacks=True,
     use_pages=True,
     serve_locally=True,
+    background_callback_manager=background_callback_manager,
 )
 app.config.suppress_callback_exceptions = True
+app.server.register_blueprint(api)
+if InstrumentationSettings.enabled.value:
+    instrument_app(app)
 app.layout = dmc.MantineProvider(
     defaultColorScheme="light",
     theme={
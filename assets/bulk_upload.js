@@ -0,0 +1,120 @@
+// Bulk evaluation of a file. The file is posted with a native form submission, the
+// browser streams it from disk and saves the CSV file returned as a download, so
+// neither of them is held in the memory of the page. Files plotted as a time series
+// are posted with fetch, the server keeps their results and only returns their id.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+  bulk: {
+    upload_file: function (nClicks, inputs, settings) {
+      const noUpdate = window.dash_clientside.no_update;
+      if (!nClicks || !inputs || !settings) {
+        return noUpdate;
+      }
+
+      const form = document.createElement("form");
+      form.method = "post";
+      form.action = settings.route;
+      form.enctype = "multipart/form-data";
+      // errors are shown in a new tab, downloads close it
+      form.target = "_blank";
+      form.style.display = "none";
+
+      const fields = {
+        model: inputs[settings.model_key],
+        units: inputs[settings.units_key],
+        inputs: JSON.stringify(inputs),
+      };
+      Object.keys(fields).forEach(function (name) {
+        const field = document.createElement("input");
+        field.type = "hidden";
+        field.name = name;
+        field.value = fields[name];
+        form.appendChild(field);
+      });
+      const file = document.createElement("input");
+      file.type = "file";
+      file.name = "file";
+      file.accept = settings.accept;
+      form.appendChild(file);
+      document.body.appendChild(form);
+
+      return new Promise(function (resolve) {
+        file.addEventListener("cancel", function () {
+          form.remove();
+          resolve(noUpdate);
+        });
+        file.addEventListener("change", function () {
+          if (!file.files.length) {
+            form.remove();
+            resolve(noUpdate);
+            return;
+          }
+          form.submit();
+          setTimeout(function () {
+            form.remove();
+          }, 0);
+          resolve(
+            "Evaluating " +
+              file.files[0].name +
+              ", the results are downloaded when they are ready"
+          );
+        });
+        file.click();
+      });
+    },
+
+    plot_file: function (nClicks, inputs, settings) {
+      const noUpdate = window.dash_clientside.no_update;
+      if (!nClicks || !inputs || !settings) {
+        return noUpdate;
+      }
+
+      const file = document.createElement("input");
+      file.type = "file";
+      file.accept = settings.accept;
+
+      return new Promise(function (resolve) {
+        file.addEventListener("cancel", function () {
+          resolve(noUpdate);
+        });
+        file.addEventListener("change", function () {
+          if (!file.files.length) {
+            resolve(noUpdate);
+            return;
+          }
+          const name = file.files[0].name;
+          const body = new FormData();
+          body.append("model", inputs[settings.model_key]);
+          body.append("units", inputs[settings.units_key]);
+          body.append("inputs", JSON.stringify(inputs));
+          body.append("file", file.files[0]);
+          window.dash_clientside.set_props(settings.status_id, {
+            children: "Evaluating " + name,
+          });
+          fetch(settings.series_route, { method: "POST", body: body })
+            .then(function (response) {
+              return response.json();
+            })
+            .then(function (result) {
+              if (result.error) {
+                resolve("Could not plot " + name + ": " + result.error);
+                return;
+              }
+              window.dash_clientside.set_props(settings.series_store, {
+                data: result.dataset,
+              });
+              window.dash_clientside.set_props(settings.chart_key, {
+                value: settings.time_series_chart,
+              });
+              resolve(
+                "Plotted " + result.rows + " rows of " + name + " in the Time series chart"
+              );
+            })
+            .catch(function (error) {
+              resolve("Could not plot " + name + ": " + error.message);
+            });
+        });
+        file.click();
+      });
+    },
+  },
+});
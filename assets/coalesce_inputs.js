@@ -0,0 +1,29 @@
+// Coalescing stage between the inputs of the form and the input store. Every change
+// restarts the quiet period, only the values of the last change are written to the
+// store, the calls superseded in the meantime resolve to no_update and never reach
+// the server.
+let coalesceSequence = 0;
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+  inputs: {
+    coalesce_model_inputs: function (values, settings) {
+      const context = window.dash_clientside.callback_context;
+      const formValues = {};
+      context.inputs_list[0].forEach(function (item) {
+        formValues[item.id.id] = item.value === undefined ? null : item.value;
+      });
+      const quietPeriod = (settings && settings.quiet_period_ms) || 0;
+      const sequence = ++coalesceSequence;
+
+      return new Promise(function (resolve) {
+        setTimeout(function () {
+          resolve(
+            sequence === coalesceSequence
+              ? formValues
+              : window.dash_clientside.no_update
+          );
+        }, quietPeriod);
+      });
+    },
+  },
+});
@@ -0,0 +1,130 @@
+// Psychrometric readout shown when hovering the t_rh and psychrometric charts.
+// The ids and names below must match utils/my_config_file.py, the equations are the
+// ones used by psy_ta_rh in pythermalcomfort.psychrometrics.
+const HOVER_INPUT_IDS = {
+  units: "id-unit-toggle",
+  chart: "id-chart-selection",
+};
+const HOVER_CHARTS = {
+  tRh: "Temperature vs. Relative Humidity",
+  psychrometric: "Psychrometric (air temperature)",
+};
+const P_ATM = 101325;
+
+function roundTo(value, decimals) {
+  const factor = Math.pow(10, decimals);
+  return Math.round(value * factor) / factor;
+}
+
+function pSat(tdb) {
+  // saturation vapour pressure [Pa], Hyland and Wexler
+  const taK = tdb + 273.15;
+  let pascals;
+  if (taK < 273.15) {
+    pascals = Math.exp(
+      -5674.5359 / taK +
+        6.3925247 +
+        taK *
+          (-0.9677843e-2 +
+            taK * (0.62215701e-6 + taK * (0.20747825e-8 + -0.9484024e-12 * taK))) +
+        4.1635019 * Math.log(taK)
+    );
+  } else {
+    pascals = Math.exp(
+      -5800.2206 / taK +
+        1.3914993 +
+        taK * (-0.048640239 + taK * (0.41764768e-4 + taK * -0.14452093e-7)) +
+        6.5459673 * Math.log(taK)
+    );
+  }
+  return roundTo(pascals, 1);
+}
+
+function psyTaRh(tdb, rh) {
+  const pVap = (rh / 100) * pSat(tdb);
+  const hr = (0.62198 * pVap) / (P_ATM - pVap);
+  const tWb =
+    tdb * Math.atan(0.151977 * Math.sqrt(rh + 8.313659)) +
+    Math.atan(tdb + rh) -
+    Math.atan(rh - 1.676331) +
+    0.00391838 * Math.pow(rh, 1.5) * Math.atan(0.023101 * rh) -
+    4.686035;
+  const gammaM = Math.log(
+    (rh / 100) * Math.exp((18.678 - tdb / 234.5) * (tdb / (257.14 + tdb)))
+  );
+  const tDp = (257.14 * gammaM) / (18.678 - gammaM);
+  const h = 1004 * tdb + hr * (2501000 + 1805.0 * tdb);
+  return {
+    hr: hr,
+    t_wb: roundTo(tWb, 1),
+    t_dp: roundTo(tDp, 1),
+    h: roundTo(h, 2),
+  };
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+  comfort: {
+    update_hover_annotation: function (hoverData, figure, inputs) {
+      const noUpdate = window.dash_clientside.no_update;
+      if (!hoverData || !hoverData.points || !hoverData.points.length || !inputs) {
+        return noUpdate;
+      }
+      const annotations = figure && figure.layout && figure.layout.annotations;
+      if (!annotations || !annotations.length) {
+        return noUpdate;
+      }
+
+      const point = hoverData.points[0];
+      if (point.x === undefined || point.y === undefined) {
+        return noUpdate;
+      }
+      const units = inputs[HOVER_INPUT_IDS.units];
+      const chartSelected = inputs[HOVER_INPUT_IDS.chart];
+      const oTdb = point.x;
+      const yValue = point.y;
+      const tdb = units === "IP" ? (oTdb - 32) / 1.8 : oTdb;
+      if (yValue <= 0) {
+        return noUpdate;
+      }
+
+      let rh;
+      if (chartSelected === HOVER_CHARTS.tRh) {
+        rh = yValue;
+      } else if (chartSelected === HOVER_CHARTS.psychrometric) {
+        const vp = (yValue * P_ATM) / 1000 / (0.62198 + yValue / 1000);
+        rh = Math.max(0, Math.min((vp / pSat(tdb)) * 100, 100));
+      } else {
+        return noUpdate;
+      }
+
+      const psy = psyTaRh(tdb, rh);
+      const wa = psy.hr * 1000; // convert to g/kgda
+      const h = psy.h / 1000; // convert to kj/kg
+      let text;
+      if (units === "SI") {
+        text =
+          `t<sub>db</sub>: ${oTdb.toFixed(1)} °C<br>` +
+          `rh: ${rh.toFixed(1)} %<br>` +
+          `W<sub>a</sub>: ${wa.toFixed(1)} g<sub>w</sub>/kg<sub>da</sub><br>` +
+          `t<sub>wb</sub>: ${psy.t_wb.toFixed(1)} °C<br>` +
+          `t<sub>dp</sub>: ${psy.t_dp.toFixed(1)} °C<br>` +
+          `h: ${h.toFixed(1)} kJ/kg<br>`;
+      } else {
+        text =
+          `t<sub>db</sub>: ${oTdb.toFixed(1)} °F<br>` +
+          `rh: ${rh.toFixed(1)} %<br>` +
+          `W<sub>a</sub>: ${wa.toFixed(1)} lb<sub>w</sub>/klb<sub>da</sub><br>` +
+          `t<sub>wb</sub>: ${(psy.t_wb * 1.8 + 32).toFixed(1)} °F<br>` +
+          `t<sub>dp</sub>: ${(psy.t_dp * 1.8 + 32).toFixed(1)} °F<br>` +
+          `h: ${(h / 2.326).toFixed(1)} btu/lb<br>`; // kJ/kg to btu/lb
+      }
+
+      // only the layout is copied, the traces are passed through untouched
+      const newAnnotations = annotations.slice();
+      newAnnotations[0] = Object.assign({}, annotations[0], { text: text });
+      return Object.assign({}, figure, {
+        layout: Object.assign({}, figure.layout, { annotations: newAnnotations }),
+      });
+    },
+  },
+});
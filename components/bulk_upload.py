@@ -0,0 +1,62 @@
+import dash_mantine_components as dmc
+from dash import dcc
+
+from utils.my_config_file import ApiSettings, Charts, ElementsIDs, MyStores
+
+
+def bulk_upload():
+    return dmc.Stack(
+        [
+            dmc.Text(
+                "Evaluate the selected model on every row of a CSV or Parquet file, "
+                "e.g. a sensor time series. Name the columns tdb, tr, rh, v, met, clo "
+                "and trm, with values in the units selected; the inputs missing from "
+                "the file take the values of the form. The rows are downloaded as a "
+                "CSV file with the results appended, or plotted against time in the "
+                "Time series chart. The rows plotted must be sorted by their time "
+                "column.",
+                size="sm",
+            ),
+            dmc.Group(
+                [
+                    dmc.Button(
+                        "Upload file",
+                        id=ElementsIDs.BULK_UPLOAD_BUTTON.value,
+                        variant="outline",
+                    ),
+                    dmc.Button(
+                        "Plot time series",
+                        id=ElementsIDs.BULK_PLOT_BUTTON.value,
+                        variant="outline",
+                    ),
+                    dmc.Text(id=ElementsIDs.BULK_UPLOAD_STATUS.value, size="sm"),
+                ],
+            ),
+            dmc.Switch(
+                id=ElementsIDs.DENSITY_OVERLAY.value,
+                label="Show the points of the plotted file on the psychrometric and "
+                "temperature vs. relative humidity charts",
+                checked=False,
+                size="sm",
+            ),
+            dcc.Store(
+                id=MyStores.upload_settings.value,
+                storage_type="memory",
+                data={
+                    "route": ApiSettings.url_prefix.value
+                    + ApiSettings.file_route.value,
+                    "accept": ",".join(ApiSettings.file_types.value),
+                    "model_key": ElementsIDs.MODEL_SELECTION.value,
+                    "units_key": ElementsIDs.UNIT_TOGGLE.value,
+                    "series_route": ApiSettings.url_prefix.value
+                    + ApiSettings.series_route.value,
+                    "series_store": MyStores.series_dataset.value,
+                    "status_id": ElementsIDs.BULK_UPLOAD_STATUS.value,
+                    "chart_key": ElementsIDs.chart_selected.value,
+                    "time_series_chart": Charts.time_series.value.name,
+                },
+            ),
+            dcc.Store(id=MyStores.series_dataset.value, storage_type="memory"),
+        ],
+        p="xs",
+    )
@@ -1,31 +1,49 @@
-import math
 import numpy as np
 import pandas as pd
 from pythermalcomfort.psychrometrics import t_o, psy_ta_rh
 from pythermalcomfort.models import (
-    pmv,
-    cooling_effect,
     adaptive_en,
     adaptive_ashrae,
-    two_nodes,
 )
-from pythermalcomfort.utilities import v_relative, clo_dynamic, units_converter
-from scipy import optimize
+from pythermalcomfort.utilities import units_converter
 
 from components.drop_down_inline import generate_dropdown_inline
 from utils.my_config_file import (
+    ADAPTIVE_CATEGORIES,
+    PMV_EN_CATEGORIES,
+    DensityOverlaySettings,
     ElementsIDs,
     Models,
     Functionalities,
     UnitSystem,
     UnitConverter,
 )
+from utils.heat_balance import pmv_ppd_heat_losses, two_nodes_outputs
+from utils.psychrometrics import humidity_ratio, rh_curves
+from utils.comfort_boundaries import (
+    batch_cooling_effect,
+    pmv_boundaries,
+    find_tdb_for_pmv,
+    pmv_speed_boundaries,
+)
+from utils.comfort_context import comfort_context
+from utils.time_series import (
+    SERIES_COLUMNS,
+    TIME_COLUMN,
+    downsample,
+    observed_points,
+    read_series,
+    series_window,
+)
 from utils.website_text import TextHome
 
 import plotly.graph_objects as go
 from dash import dcc
 from decimal import Decimal, ROUND_HALF_UP
 
+# tags the traces that only depend on the inputs listed in ChartsInfo.marker_inputs
+INPUT_MARKER = "input-marker"
+
 
 def chart_selector(selected_model: str, function_selection: str, chart_selected: str):
     list_charts = list(Models[selected_model].value.charts)
@@ -75,6 +93,34 @@ def compare_get_inputs(inputs):
     return met_2, clo_2, tr_2, t_db_2, v_2, rh_2
 
 
+# input marker of the adaptive charts, the comfort bands do not depend on the
+# running mean temperature (see update_chart)
+def adaptive_chart_markers(inputs: dict = None):
+    x = inputs[ElementsIDs.t_rm_input.value]
+    y = t_o(
+        tdb=inputs[ElementsIDs.t_db_input.value],
+        tr=inputs[ElementsIDs.t_r_input.value],
+        v=inputs[ElementsIDs.v_input.value],
+    )
+    red_point = [x, y]
+    markers = [
+        go.Scatter(
+            x=[red_point[0]],
+            y=[red_point[1]],
+            mode="markers",
+            marker=dict(
+                color="red",
+                size=6,
+            ),
+            name="current input",
+            showlegend=False,
+            hoverinfo="skip",
+            meta=INPUT_MARKER,
+        )
+    ]
+    return markers, None
+
+
 def adaptive_chart(
     inputs: dict = None,
     model: str = "iso",
@@ -107,19 +153,7 @@ def adaptive_chart(
         units=units,
     )
 
-    if model == "iso":
-        categories = [
-            ("cat_iii", "Category III", "rgba(168, 195, 161, 0.6)"),
-            ("cat_ii", "Category II", "rgba(34, 139, 34, 0.5)"),
-            ("cat_i", "Category I", "rgba(0, 100, 0, 0.5)"),
-        ]
-    else:
-        categories = [
-            ("80", "80% Acceptability", "rgba(144, 205, 239, 0.8)"),
-            ("90", "90% Acceptability", "rgba(63, 105, 152, 0.8)"),
-        ]
-
-    for cat, name, color in categories:
+    for cat, name, color in ADAPTIVE_CATEGORIES[model]:
         y_values_up = [
             results_min[f"tmp_cmf_{cat}_up"],
             results_max[f"tmp_cmf_{cat}_up"],
@@ -141,27 +175,8 @@ def adaptive_chart(
                 hoverinfo="skip",
             )
         )
-    x = inputs[ElementsIDs.t_rm_input.value]
-    y = t_o(
-        tdb=inputs[ElementsIDs.t_db_input.value],
-        tr=inputs[ElementsIDs.t_r_input.value],
-        v=inputs[ElementsIDs.v_input.value],
-    )
-    red_point = [x, y]
-    traces.append(
-        go.Scatter(
-            x=[red_point[0]],
-            y=[red_point[1]],
-            mode="markers",
-            marker=dict(
-                color="red",
-                size=6,
-            ),
-            name="current input",
-            showlegend=False,
-            hoverinfo="skip",
-        )
-    )
+    markers, _ = adaptive_chart_markers(inputs=inputs)
+    traces += markers
 
     layout = go.Layout(
         xaxis=dict(
@@ -225,158 +240,40 @@ def adaptive_chart(
 
 # Thermal heat losses vs. air temperature of ASHRAE
 def get_heat_losses(inputs: dict = None, model: str = "ashrae", units: str = "SI"):
-    def pmv_pdd_6_heat_loss(ta, tr, vel, rh, met, clo, wme=0):
-        pa = rh * 10 * np.exp(16.6536 - 4030.183 / (ta + 235))
-        icl = 0.155 * clo
-        m = met * 58.15
-        w = wme * 58.15
-        mw = m - w
-
-        if icl <= 0.078:
-            fcl = 1 + 1.29 * icl
-        else:
-            fcl = 1.05 + 0.645 * icl
-
-        hcf = 12.1 * np.sqrt(vel)
-        hc = hcf
-        taa = ta + 273
-        tra = tr + 273
-        t_cla = taa + (35.5 - ta) / (3.5 * icl + 0.1)
-
-        p1 = icl * fcl
-        p2 = p1 * 3.96
-        p3 = p1 * 100
-        p4 = p1 * taa
-        p5 = 308.7 - 0.028 * mw + (p2 * (tra / 100.0) ** 4)
-        xn = t_cla / 100
-        xf = t_cla / 50
-        eps = 0.00015
-
-        n = 0
-        while np.abs(xn - xf) > eps:
-            xf = (xf + xn) / 2
-            hcn = 2.38 * np.abs(100.0 * xf - taa) ** 0.25
-            if hcf > hcn:
-                hc = hcf
-            else:
-                hc = hcn
-            xn = (p5 + p4 * hc - p2 * xf**4) / (100 + p3 * hc)
-            n += 1
-            if n > 150:
-                raise ValueError("Max iterations exceeded")
-
-        tcl = 100 * xn - 273
-
-        hl1 = 3.05 * 0.001 * (5733 - 6.99 * mw - pa)
-        hl2 = 0.42 * (mw - 58.15) if mw > 58.15 else 0
-        hl3 = 1.7 * 0.00001 * m * (5867 - pa)
-        hl4 = 0.0014 * m * (34 - ta)
-        hl5 = 3.96 * fcl * (xn**4 - (tra / 100.0) ** 4)
-        hl6 = fcl * hc * (tcl - ta)
-
-        ts = 0.303 * math.exp(-0.036 * m) + 0.028
-        pmv = ts * (mw - hl1 - hl2 - hl3 - hl4 - hl5 - hl6)
-
-        ppd = 100.0 - 95.0 * math.exp(
-            -0.03353 * math.pow(pmv, 4.0) - 0.2179 * math.pow(pmv, 2.0)
-        )
-
-        return {
-            "pmv": pmv,
-            "ppd": ppd,
-            "hl1": hl1,
-            "hl2": hl2,
-            "hl3": hl3,
-            "hl4": hl4,
-            "hl5": hl5,
-            "hl6": hl6,
-        }
-
     tr = inputs[ElementsIDs.t_r_input.value]
     met = inputs[ElementsIDs.met_input.value]
-    vel = v_relative(
-        v=inputs[ElementsIDs.v_input.value], met=inputs[ElementsIDs.met_input.value]
-    )
-    clo_d = clo_dynamic(
-        clo=inputs[ElementsIDs.clo_input.value], met=inputs[ElementsIDs.met_input.value]
-    )
+    condition = comfort_context(inputs).condition
+    vel = condition.vr
+    clo_d = condition.clo_d
     rh = inputs[ElementsIDs.rh_input.value]
-    results = {
-        "h1": [],  # Water vapor diffusion through the skin
-        "h2": [],  # Evaporation of sweat
-        "h3": [],  # Respiration latent
-        "h4": [],  # Respiration sensible
-        "h5": [],  # Radiation from clothing surface
-        "h6": [],  # Convection from clothing surface
-        "h7": [],  # Total latent heat loss
-        "h8": [],  # Total sensible heat loss
-        "h9": [],  # Total heat loss
-        "h10": [],  # Metabolic rate
-    }
 
     if units == UnitSystem.IP.value:
         ta_range = np.arange(50, 105)
-        for ta in ta_range:
-            ta_si = UnitConverter.fahrenheit_to_celsius(ta)
-            tr_si = UnitConverter.fahrenheit_to_celsius(tr)
-            vel_si = UnitConverter.fps_to_mps(vel)
-            heat_losses = pmv_pdd_6_heat_loss(
-                ta=ta_si, tr=tr_si, vel=vel_si, rh=rh, met=met, clo=clo_d, wme=0
-            )
-            results["h1"].append(round(heat_losses["hl1"], 1))
-            results["h2"].append(round(heat_losses["hl2"], 1))
-            results["h3"].append(round(heat_losses["hl3"], 1))
-            results["h4"].append(round(heat_losses["hl4"], 1))
-            results["h5"].append(round(heat_losses["hl5"], 1))
-            results["h6"].append(round(heat_losses["hl6"], 1))
-            results["h7"].append(
-                round(heat_losses["hl1"] + heat_losses["hl2"] + heat_losses["hl3"], 1)
-            )
-            results["h8"].append(
-                round(heat_losses["hl4"] + heat_losses["hl5"] + heat_losses["hl6"], 1)
-            )
-            results["h9"].append(
-                round(
-                    heat_losses["hl1"]
-                    + heat_losses["hl2"]
-                    + heat_losses["hl3"]
-                    + heat_losses["hl4"]
-                    + heat_losses["hl5"]
-                    + heat_losses["hl6"],
-                    1,
-                )
-            )
-            results["h10"].append(round(met * 58.15, 1))
+        ta_si = np.round((ta_range - 32) * 5 / 9, 2)
+        tr_si = UnitConverter.fahrenheit_to_celsius(tr)
+        vel_si = UnitConverter.fps_to_mps(vel)
     else:
         ta_range = np.arange(10, 41)
-        for ta in ta_range:
-            heat_losses = pmv_pdd_6_heat_loss(
-                ta=ta, tr=tr, vel=vel, rh=rh, met=met, clo=clo_d, wme=0
-            )
-            results["h1"].append(round(heat_losses["hl1"], 1))
-            results["h2"].append(round(heat_losses["hl2"], 1))
-            results["h3"].append(round(heat_losses["hl3"], 1))
-            results["h4"].append(round(heat_losses["hl4"], 1))
-            results["h5"].append(round(heat_losses["hl5"], 1))
-            results["h6"].append(round(heat_losses["hl6"], 1))
-            results["h7"].append(
-                round(heat_losses["hl1"] + heat_losses["hl2"] + heat_losses["hl3"], 1)
-            )
-            results["h8"].append(
-                round(heat_losses["hl4"] + heat_losses["hl5"] + heat_losses["hl6"], 1)
-            )
-            results["h9"].append(
-                round(
-                    heat_losses["hl1"]
-                    + heat_losses["hl2"]
-                    + heat_losses["hl3"]
-                    + heat_losses["hl4"]
-                    + heat_losses["hl5"]
-                    + heat_losses["hl6"],
-                    1,
-                )
-            )
-            results["h10"].append(round(met * 58.15, 1))
+        ta_si, tr_si, vel_si = ta_range, tr, vel
+
+    heat_losses = pmv_ppd_heat_losses(
+        ta=ta_si, tr=tr_si, vel=vel_si, rh=rh, met=met, clo=clo_d, wme=0
+    )
+    latent = heat_losses["hl1"] + heat_losses["hl2"] + heat_losses["hl3"]
+    sensible = heat_losses["hl4"] + heat_losses["hl5"] + heat_losses["hl6"]
+    results = {
+        "h1": heat_losses["hl1"],  # Water vapor diffusion through the skin
+        "h2": heat_losses["hl2"],  # Evaporation of sweat
+        "h3": heat_losses["hl3"],  # Respiration latent
+        "h4": heat_losses["hl4"],  # Respiration sensible
+        "h5": heat_losses["hl5"],  # Radiation from clothing surface
+        "h6": heat_losses["hl6"],  # Convection from clothing surface
+        "h7": latent,  # Total latent heat loss
+        "h8": sensible,  # Total sensible heat loss
+        "h9": latent + sensible,  # Total heat loss
+    }
+    results = {key: np.round(value, 1) for key, value in results.items()}
+    results["h10"] = np.full(ta_range.size, round(met * 58.15, 1))  # Metabolic rate
 
     fig = go.Figure()
 
@@ -446,6 +343,182 @@ def get_heat_losses(inputs: dict = None, model: str = "ashrae", units: str = "SI
     return fig
 
 
+def hover_area(x_range, y_range):
+    # transparent heatmap whose cells are centred on the x_range x y_range grid, it
+    # reports the same hover coordinates as a meshgrid of invisible markers while
+    # the figure only carries the two axes and an integer z matrix
+    return go.Heatmap(
+        x=x_range,
+        y=y_range,
+        z=np.zeros((len(y_range), len(x_range)), dtype=int),
+        colorscale=[[0, "rgba(0,0,0,0)"], [1, "rgba(0,0,0,0)"]],
+        showscale=False,
+        hoverinfo="none",
+        name="Interactive Hover Area",
+    )
+
+
+def histogram_2d(x, y, x_range, y_range, x_bins: int, y_bins: int) -> np.ndarray:
+    # counts of the points in each bin as (y_bins, x_bins), the same as
+    # np.histogram2d with equal bins but a single bincount over the flat bin indices
+    indices = []
+    inside = True
+    for values, (low, high), bins in ((x, x_range, x_bins), (y, y_range, y_bins)):
+        edges = np.linspace(low, high, bins + 1)
+        position = np.floor((values - low) * (bins / (high - low)))
+        index = np.clip(np.nan_to_num(position, nan=-1), -1, bins).astype(np.intp)
+        # the rounding puts some points on an edge in the bin next to the one of
+        # np.histogram2d, they are moved by comparing them with the edges
+        index -= values < edges[np.clip(index, 0, bins)]
+        index += values >= edges[np.clip(index + 1, 0, bins)]
+        # the upper edge belongs to the last bin
+        index[values == high] = bins - 1
+        indices.append(index)
+        inside = inside & (index >= 0) & (index < bins)
+    return np.bincount(
+        indices[1][inside] * x_bins + indices[0][inside], minlength=x_bins * y_bins
+    ).reshape(y_bins, x_bins)
+
+
+def density_heatmap(x, y, x_range, y_range):
+    # 2D histogram of the points of a plotted file, binned on the server so the
+    # figure holds x_bins * y_bins counts whatever the number of points, empty bins
+    # are transparent
+    x_bins = DensityOverlaySettings.x_bins.value
+    y_bins = DensityOverlaySettings.y_bins.value
+    counts = histogram_2d(x, y, x_range, y_range, x_bins, y_bins).astype(float)
+    counts[counts == 0] = np.nan
+    x_edges = np.linspace(*x_range, x_bins + 1)
+    y_edges = np.linspace(*y_range, y_bins + 1)
+    return go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=counts,
+        colorscale=DensityOverlaySettings.colorscale.value,
+        opacity=0.8,
+        showscale=False,
+        hoverinfo="skip",
+        name="Plotted file",
+    )
+
+
+def comfort_fractions(t_db, rh, boundaries: dict) -> dict:
+    # share of the points between the boundaries of each pair of opposite PMV limits,
+    # boundaries maps the limits to the (rh, t_db) points of their curve, which are
+    # interpolated at the relative humidity of each point
+    limits = sorted(boundaries)
+    curves = {}
+    for limit in limits:
+        rh_curve, t_db_curve = (
+            np.asarray(values, dtype=float) for values in boundaries[limit]
+        )
+        known = np.isfinite(t_db_curve)
+        curves[limit] = np.interp(rh, rh_curve[known], t_db_curve[known])
+    return {
+        up_limit: np.mean((t_db >= curves[low_limit]) & (t_db <= curves[up_limit]))
+        for low_limit, up_limit in zip(limits[: len(limits) // 2], limits[::-1])
+    }
+
+
+def density_annotation(fractions: dict, n_points: int, model: str) -> dict:
+    if model.lower() == "ashrae":
+        text = f"{fractions[0.5]:.1%} of the points in the comfort zone"
+    else:
+        text = "<br>".join(
+            f"Category {PMV_EN_CATEGORIES[limit]}: {fraction:.1%}"
+            for limit, fraction in sorted(fractions.items())
+        )
+    return dict(
+        text=f"{n_points:,} points<br>{text}",
+        xref="paper",
+        yref="paper",
+        x=0.98,
+        y=0.02,
+        xanchor="right",
+        yanchor="bottom",
+        showarrow=False,
+        align="right",
+        bgcolor="rgba(255,255,255,0.8)",
+    )
+
+
+def density_overlay(inputs: dict, units: str):
+    # dry-bulb temperatures and relative humidities of the file plotted, when the
+    # density overlay is on, without the rows that have no value
+    points = observed_points(inputs.get(ElementsIDs.DENSITY_OVERLAY.value), units)
+    if points is None:
+        return None
+    t_db, rh = (np.asarray(values) for values in points)
+    valid = np.isfinite(t_db) & np.isfinite(rh)
+    if not valid.any():
+        return None
+    return t_db[valid], rh[valid]
+
+
+# input markers and annotation of the t_rh chart, they are the only part of the
+# chart that changes when only t_db or rh change (see update_chart)
+def t_rh_pmv_markers(
+    inputs: dict = None,
+    model: str = "iso",
+    function_selection: str = Functionalities.Default,
+    units: str = "SI",
+):
+    met, clo, tr, t_db, v, rh = get_inputs(inputs)
+    markers = [
+        go.Scatter(
+            x=[t_db],
+            y=[rh],
+            mode="markers",
+            marker=dict(color="red", size=8),
+            name="Current Input",
+            meta=INPUT_MARKER,
+            # hoverinfo="skip",
+        )
+    ]
+    if model == "ashrae" and function_selection == Functionalities.Compare.value:
+        met_2, clo_2, tr_2, t_db_2, v_2, rh_2 = compare_get_inputs(inputs)
+        markers.append(
+            go.Scatter(
+                x=[t_db_2],
+                y=[rh_2],
+                mode="markers",
+                marker=dict(symbol="cross", color="blue", size=8),
+                name="Compare Input",
+                hoverinfo="skip",
+                meta=INPUT_MARKER,
+            )
+        )
+        # the annotation is not shown in the compare mode
+        return markers, None
+
+    if units == UnitSystem.SI.value:
+        psy_results = psy_ta_rh(t_db, rh)
+        annotation_text = (
+            f"t<sub>db</sub>: {t_db:.1f} °C<br>"
+            f"rh: {rh:.1f} %<br>"
+            f"W<sub>a</sub>: {psy_results.hr*1000:.1f} g<sub>w</sub>/kg<sub>da</sub><br>"
+            f"t<sub>wb</sub>: {psy_results.t_wb:.1f} °C<br>"
+            f"t<sub>dp</sub>: {psy_results.t_dp:.1f} °C<br>"
+            f"h: {psy_results.h / 1000:.1f} kJ/kg"
+        )
+    else:
+        t_db = (t_db - 32) / 1.8
+        psy_results = psy_ta_rh(t_db, rh)
+        hr = psy_results.hr * 1000  # convert to g/kgda
+        t_wb_value = psy_results.t_wb * 1.8 + 32
+        t_dp_value = psy_results.t_dp * 1.8 + 32
+        h = (psy_results.h / 1000) / 2.326  # convert to kj/kg
+        annotation_text = (
+            f"t<sub>db</sub>: {t_db * 1.8 + 32:.1f} °F<br>"
+            f"RH: {rh:.1f} %<br>"
+            f"W<sub>a</sub>: {hr:.1f} lb<sub>w</sub>/klb<sub>da</sub><br>"
+            f"t<sub>wb</sub>: {t_wb_value:.1f} °F<br>"
+            f"t<sub>dp</sub>: {t_dp_value:.1f} °F<br>"
+            f"h: {h:.1f} btu/lb<br>"  # kJ/kg to btu/lb
+        )
+    return markers, annotation_text
+
+
 def t_rh_pmv(
     inputs: dict = None,
     model: str = "iso",
@@ -467,43 +540,36 @@ def t_rh_pmv(
         colors = ["rgba(59, 189, 237, 0.7)"]
 
     met, clo, tr, t_db, v, rh = get_inputs(inputs)
-    clo_d = clo_dynamic(clo, met)
-    vr = v_relative(v, met)
+    context = comfort_context(inputs)
+    clo_d = context.condition.clo_d
+    vr = context.condition.vr
 
     def calculate_pmv_results(tr, vr, met, clo):
-        results = []
-        for pmv_limit in pmv_limits:
-            for rh in np.arange(0, 110, 10):
-
-                def function(x):
-                    return (
-                        pmv(
-                            x,
-                            tr=tr,
-                            vr=vr,
-                            rh=rh,
-                            met=met,
-                            clo=clo,
-                            wme=0,
-                            standard=model,
-                            units=units,
-                            limit_inputs=False,
-                        )
-                        - pmv_limit
-                    )
-
-                try:
-                    temp = optimize.brentq(function, 10, 120)
-                    results.append(
-                        {
-                            "rh": rh,
-                            "temp": temp,
-                            "pmv_limit": pmv_limit,
-                        }
-                    )
-                except ValueError:
-                    continue
-        return pd.DataFrame(results)
+        rh_values = np.arange(0, 110, 10)
+        # solve all the (pmv_limit, rh) boundary points at once
+        temps = pmv_boundaries(
+            pmv_limits,
+            rh_values,
+            tr=tr,
+            vr=vr,
+            met=met,
+            clo=clo,
+            wme=0,
+            standard=model,
+            units=units,
+            low=10,
+            high=120,
+        )
+        limits_grid, rh_grid = np.meshgrid(pmv_limits, rh_values, indexing="ij")
+        results = pd.DataFrame(
+            {
+                "rh": rh_grid.ravel(),
+                "temp": temps.ravel(),
+                "pmv_limit": limits_grid.ravel(),
+            }
+        )
+        # points without a solution in the bracket are skipped
+        return results.dropna(subset=["temp"]).reset_index(drop=True)
 
     df = calculate_pmv_results(
         tr=tr,
@@ -541,38 +607,39 @@ def t_rh_pmv(
             )
         )
 
-    # Add scatter point for the current input
-    fig.add_trace(
-        go.Scatter(
-            x=[t_db],
-            y=[rh],
-            mode="markers",
-            marker=dict(color="red", size=8),
-            name="Current Input",
-            # hoverinfo="skip",
+    points = density_overlay(inputs, units)
+    if points is not None:
+        fig.add_trace(
+            density_heatmap(
+                *points,
+                x_range=[10, 36] if units == UnitSystem.SI.value else [50, 100],
+                y_range=[0, 100],
+            )
+        )
+        fractions = comfort_fractions(
+            *points,
+            {
+                limit: (curve["rh"], curve["temp"])
+                for limit, curve in df.groupby("pmv_limit")
+            },
         )
+
+    # Add scatter point for the current input
+    markers, annotation_text = t_rh_pmv_markers(
+        inputs=inputs, model=model, function_selection=function_selection, units=units
     )
+    fig.add_trace(markers[0])
 
     x_range = np.linspace(10, 40, 100)
     if units == UnitSystem.IP.value:  # The X-axis range of gridlines in the IP state
         x_range = np.linspace(50, 100, 100)
     y_range = np.linspace(0, 100, 100)
-    xx, yy = np.meshgrid(x_range, y_range)
-    fig.add_trace(
-        go.Scatter(
-            x=xx.flatten(),
-            y=yy.flatten(),
-            mode="markers",
-            marker=dict(color="rgba(0,0,0,0)"),
-            hoverinfo="none",
-            name="Interactive Hover Area",
-        )
-    )
+    fig.add_trace(hover_area(x_range, y_range))
 
     if model == "ashrae" and function_selection == Functionalities.Compare.value:
         met_2, clo_2, tr_2, t_db_2, v_2, rh_2 = compare_get_inputs(inputs)
-        clo_d_compare = clo_dynamic(clo_2, met_2)
-        vr_compare = v_relative(v_2, met_2)
+        clo_d_compare = context.compare_condition.clo_d
+        vr_compare = context.compare_condition.vr
 
         df_compare = calculate_pmv_results(
             tr_2,
@@ -605,48 +672,12 @@ def t_rh_pmv(
                 hoverinfo="skip",
             )
         )
-        fig.add_trace(
-            go.Scatter(
-                x=[t_db_2],
-                y=[rh_2],
-                mode="markers",
-                marker=dict(symbol="cross", color="blue", size=8),
-                name="Compare Input",
-                hoverinfo="skip",
-            )
-        )
-
-    tdb = inputs[ElementsIDs.t_db_input.value]
-    rh = inputs[ElementsIDs.rh_input.value]
-    tr = inputs[ElementsIDs.t_r_input.value]
-    psy_results = psy_ta_rh(tdb, rh)
+        fig.add_trace(markers[1])
 
     if units == UnitSystem.SI.value:
-        annotation_text = (
-            f"t<sub>db</sub>: {tdb:.1f} °C<br>"
-            f"rh: {rh:.1f} %<br>"
-            f"W<sub>a</sub>: {psy_results.hr*1000:.1f} g<sub>w</sub>/kg<sub>da</sub><br>"
-            f"t<sub>wb</sub>: {psy_results.t_wb:.1f} °C<br>"
-            f"t<sub>dp</sub>: {psy_results.t_dp:.1f} °C<br>"
-            f"h: {psy_results.h / 1000:.1f} kJ/kg"
-        )
         annotation_x = 32  # x coordinates in SI units
         annotation_y = 86  # Y-coordinate of relative humidity
     elif units == UnitSystem.IP.value:
-        t_db = (t_db - 32) / 1.8
-        psy_results = psy_ta_rh(t_db, rh)
-        hr = psy_results.hr * 1000  # convert to g/kgda
-        t_wb_value = psy_results.t_wb * 1.8 + 32
-        t_dp_value = psy_results.t_dp * 1.8 + 32
-        h = (psy_results.h / 1000) / 2.326  # convert to kj/kg
-        annotation_text = (
-            f"t<sub>db</sub>: {t_db * 1.8 + 32:.1f} °F<br>"
-            f"RH: {rh:.1f} %<br>"
-            f"W<sub>a</sub>: {hr:.1f} lb<sub>w</sub>/klb<sub>da</sub><br>"
-            f"t<sub>wb</sub>: {t_wb_value:.1f} °F<br>"
-            f"t<sub>dp</sub>: {t_dp_value:.1f} °F<br>"
-            f"h: {h:.1f} btu/lb<br>"  # kJ/kg to btu/lb
-        )
         annotation_x = 90  # x coordinates in IP units
         annotation_y = 86  # Y-coordinate of relative humidity (unchanged)
 
@@ -670,6 +701,10 @@ def t_rh_pmv(
             font=dict(size=14),
         )
 
+    # added after the readout, which is the first annotation of the chart
+    if points is not None:
+        fig.add_annotation(density_annotation(fractions, len(points[0]), model))
+
     fig.update_layout(
         yaxis=dict(title="Relative Humidity [%]", range=[0, 100], dtick=10),
         xaxis=dict(
@@ -704,205 +739,51 @@ def SET_outputs_chart(
     body_position="standing",
     units: str = "SI",
 ):
-    # create tdb list for plotting lines when tdb is x-axis
-    tdb_values = np.arange(10, 41, 5, dtype=float).tolist()
-
-    # Prepare arrays for the outputs we want to plot
-    set_temp = []  # set_tmp()
-    skin_temp = []  # t_skin
-    core_temp = []  # t_core
-    clothing_temp = []  # t_cl
-    mean_body_temp = []  # t_body
-    total_skin_evaporative_heat_loss = []  # e_skin
-    sweat_evaporation_skin_heat_loss = []  # e_rsw
-    vapour_diffusion_skin_heat_loss = []  # e_diff
-    total_skin_sensible_heat_loss = []  # q_sensible
-    total_skin_heat_loss = []  # q_skin
-    heat_loss_respiration = []  # q_res
-    skin_wettedness = []  # w
+    # create tdb array for plotting lines when tdb is x-axis
+    tdb_values = np.arange(10, 40.5, 0.5)
 
     # Extract common input values
+    condition = comfort_context(inputs).condition
     tr = float(inputs[ElementsIDs.t_r_input.value])
-    vr = float(
-        v_relative(  # Ensure vr is scalar
-            v=inputs[ElementsIDs.v_input.value], met=inputs[ElementsIDs.met_input.value]
-        )
-    )
+    vr = float(condition.vr)  # Ensure vr is scalar
     rh = float(inputs[ElementsIDs.rh_input.value])  # Ensure rh is scalar
     met = float(inputs[ElementsIDs.met_input.value])  # Ensure met is scalar
-    clo = float(
-        clo_dynamic(  # Ensure clo is scalar
-            clo=inputs[ElementsIDs.clo_input.value],
-            met=inputs[ElementsIDs.met_input.value],
-        )
-    )
+    clo = float(condition.clo_d)  # Ensure clo is scalar
 
     if units == UnitSystem.IP.value:
         tr = round(float(units_converter(tr=tr)[0]), 1)
         vr = round(float(units_converter(vr=vr)[0]), 1)
 
-    for tdb in tdb_values:
-        ce = cooling_effect(
-            tdb=tdb,
-            tr=tr,
-            vr=vr,
-            rh=rh,
-            met=met,
-            clo=clo,
-            wme=0,
-        )
-
-        # Iterate through each temperature value and call `two_nodes`
-        results = two_nodes(
-            tdb=tdb,
-            tr=tr,
-            v=vr,
-            rh=rh,
-            met=met,
-            clo=clo,
-            wme=0,
-            p_atmospheric=p_atmospheric,
-            body_position=body_position,
-            calculate_ce=calculate_ce,
-        )
-
-        # Collect relevant data for each variable, converting to float
-        set_temp.append(
-            float(results["_set"]) - ce
-        )  # Convert np.float64 to float & Manual Cooling effect
-        skin_temp.append(
-            float(results["t_skin"]) - ce
-        )  # Convert np.float64 to float & Manual Cooling effect
-        core_temp.append(
-            float(results["t_core"]) - ce
-        )  # Convert np.float64 to float & Manual Cooling effect
-        total_skin_evaporative_heat_loss.append(
-            float(results["e_skin"])
-        )  # Convert np.float64 to float
-        sweat_evaporation_skin_heat_loss.append(
-            float(results["e_rsw"])
-        )  # Convert np.float64 to float
-        vapour_diffusion_skin_heat_loss.append(
-            float(results["e_skin"] - results["e_rsw"])
-        )  # Convert np.float64 to float
-        total_skin_sensible_heat_loss.append(
-            float(results["q_sensible"])
-        )  # Convert np.float64 to float
-        total_skin_heat_loss.append(
-            float(results["q_skin"])
-        )  # Convert np.float64 to float
-        heat_loss_respiration.append(
-            float(results["q_res"])
-        )  # Convert np.float64 to float
-        skin_wettedness.append(
-            float(results["w"]) * 100
-        )  # Convert to percentage and float
-
-        # progress from two_nodes() for final clothing temperature t_cl & mean body temperature t_body
-        alfa = 0.1
-        sbc = 0.000000056697
-        pressure_in_atmospheres = float(p_atmospheric / 101325)
-        length_time_simulation = 60  # length time simulation
-        n_simulation = 0
-        r_clo = 0.155 * clo
-        f_a_cl = 1.0 + 0.15 * clo
-        h_cc = 3.0 * pow(pressure_in_atmospheres, 0.53)
-        h_fc = 8.600001 * pow((vr * pressure_in_atmospheres), 0.53)
-        h_cc = max(h_cc, h_fc)
-        if not calculate_ce and met > 0.85:
-            h_c_met = 5.66 * (met - 0.85) ** 0.39
-            h_cc = max(h_cc, h_c_met)
-        h_r = 4.7
-        h_t = h_r + h_cc
-        r_a = 1.0 / (f_a_cl * h_t)
-        t_op = (h_r * tr + h_cc * tdb) / h_t
-
-        while n_simulation < length_time_simulation:
-
-            n_simulation += 1
-
-            iteration_limit = 150  # for following while loop
-            # t_cl temperature of the outer surface of clothing
-            t_cl = (r_a * results["t_skin"] + r_clo * t_op) / (
-                r_a + r_clo
-            )  # initial guess
-            n_iterations = 0
-            tc_converged = False
-            while not tc_converged:
-                # update h_r
-                # 0.95 is the clothing emissivity from ASHRAE fundamentals Ch. 9.7 Eq. 35
-                if body_position == "sitting":
-                    # 0.7 ratio between radiation area of the body and the body area
-                    h_r = 4.0 * 0.95 * sbc * ((t_cl + tr) / 2.0 + 273.15) ** 3.0 * 0.7
-                else:  # if standing
-                    # 0.73 ratio between radiation area of the body and the body area
-                    h_r = 4.0 * 0.95 * sbc * ((t_cl + tr) / 2.0 + 273.15) ** 3.0 * 0.73
-                h_t = h_r + h_cc
-                r_a = 1.0 / (f_a_cl * h_t)
-                t_op = (h_r * tr + h_cc * tdb) / h_t
-                t_cl_new = (r_a * results["t_skin"] + r_clo * t_op) / (r_a + r_clo)
-                if abs(t_cl_new - t_cl) <= 0.01:
-                    tc_converged = True
-                t_cl = t_cl_new
-                n_iterations += 1
-
-                if n_iterations > iteration_limit:
-                    raise StopIteration("Max iterations exceeded")
-
-            t_body = alfa * results["t_skin"] + (1 - alfa) * results["t_core"]
-            # update alfa
-            alfa = 0.0417737 + 0.7451833 / (results["m_bl"] + 0.585417)
-        # get final clothing temperature t_cl
-        clothing_temp.append(
-            float(t_cl) - ce
-        )  # Convert np.float64 to float & Manual Cooling effect
-        # get final mean body temperature t_body
-        mean_body_temp.append(
-            float(t_body) - ce
-        )  # Convert np.float64 to float & Manual Cooling effect
+    ce = batch_cooling_effect(
+        tdb=tdb_values, tr=tr, vr=vr, rh=rh, met=met, clo=clo, wme=0
+    )
+    results = two_nodes_outputs(
+        tdb=tdb_values,
+        tr=tr,
+        v=vr,
+        rh=rh,
+        met=met,
+        clo=clo,
+        wme=0,
+        p_atmospheric=p_atmospheric,
+        body_position=body_position,
+        calculate_ce=calculate_ce,
+    )
+    # Manual Cooling effect
+    temperatures = ["set", "t_skin", "t_core", "t_cl", "t_body"]
+    results[temperatures] = results[temperatures].sub(ce, axis=0)
 
     if units == UnitSystem.IP.value:
-        tdb_values = list(
-            map(
-                lambda x: round(float(units_converter(tdb=x, from_units="si")[0]), 1),
-                tdb_values,
-            )
-        )
-        set_temp = list(
-            map(
-                lambda x: round(float(units_converter(tmp=x, from_units="si")[0]), 1),
-                set_temp,
-            )
-        )
-        skin_temp = list(
-            map(
-                lambda x: round(float(units_converter(tmp=x, from_units="si")[0]), 1),
-                skin_temp,
-            )
-        )
-        core_temp = list(
-            map(
-                lambda x: round(float(units_converter(tmp=x, from_units="si")[0]), 1),
-                core_temp,
-            )
-        )
-        clothing_temp = list(
-            map(
-                lambda x: round(float(units_converter(tmp=x, from_units="si")[0]), 1),
-                clothing_temp,
-            )
-        )
-        mean_body_temp = list(
-            map(
-                lambda x: round(float(units_converter(tmp=x, from_units="si")[0]), 1),
-                mean_body_temp,
-            )
+        tdb_values = np.round(units_converter(tdb=tdb_values, from_units="si")[0], 1)
+        results[temperatures] = np.round(
+            units_converter(tmp=results[temperatures], from_units="si")[0], 1
         )
+
     fig = go.Figure()
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=set_temp,
+            y=results["set"],
             mode="lines",
             name="SET temperature",
             line=dict(color="blue"),
@@ -913,7 +794,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=skin_temp,
+            y=results["t_skin"],
             mode="lines",
             name="Skin temperature",
             line=dict(color="cyan"),
@@ -925,7 +806,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=core_temp,
+            y=results["t_core"],
             mode="lines",
             name="Core temperature",
             line=dict(color="limegreen"),
@@ -938,7 +819,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=clothing_temp,
+            y=results["t_cl"],
             mode="lines",
             name="Clothing temperature",
             line=dict(color="lightgreen"),
@@ -951,7 +832,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=mean_body_temp,
+            y=results["t_body"],
             mode="lines",
             name="Mean body temperature",
             visible="legendonly",
@@ -965,7 +846,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=total_skin_evaporative_heat_loss,
+            y=results["e_skin"],
             mode="lines",
             name="Total skin evaporative heat loss",
             visible="legendonly",
@@ -978,7 +859,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=sweat_evaporation_skin_heat_loss,
+            y=results["e_rsw"],
             mode="lines",
             name="Sweat evaporation skin heat loss ",
             visible="legendonly",
@@ -992,7 +873,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=vapour_diffusion_skin_heat_loss,
+            y=results["e_diff"],
             mode="lines",
             name="Vapour diffusion skin heat loss ",
             visible="legendonly",
@@ -1006,7 +887,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=total_skin_heat_loss,
+            y=results["q_skin"],
             mode="lines",
             name="Total skin sensible heat loss ",
             visible="legendonly",
@@ -1020,7 +901,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=total_skin_heat_loss,
+            y=results["q_skin"],
             mode="lines",
             name="Total skin heat loss",
             line=dict(color="black"),
@@ -1033,7 +914,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=heat_loss_respiration,
+            y=results["q_res"],
             mode="lines",
             name="Heat loss respiration",
             line=dict(color="black", dash="dash"),
@@ -1046,7 +927,7 @@ def SET_outputs_chart(
     fig.add_trace(
         go.Scatter(
             x=tdb_values,
-            y=skin_wettedness,
+            y=results["w"],
             mode="lines",
             name="Skin wettedness",
             visible="legendonly",
@@ -1102,59 +983,6 @@ def SET_outputs_chart(
     return fig
 
 
-def find_tdb_for_pmv(
-    target_pmv,
-    tr,
-    vr,
-    rh,
-    met,
-    clo,
-    wme=0,
-    standard="ISO",
-    units="SI",
-    tol=1e-2,
-    max_iter=100,
-):
-
-    if units == UnitSystem.SI.value:
-        low, high = 10, 40
-    else:
-        low, high = 50, 96.8
-    iterations = 0
-
-    while iterations < max_iter:
-        t_db_guess = (low + high) / 2
-        try:
-            pmv_value = pmv(
-                tdb=t_db_guess,
-                tr=tr,
-                vr=vr,
-                rh=rh,
-                met=met,
-                clo=clo,
-                wme=wme,
-                standard=standard,
-                units=units,
-                limit_inputs=False,
-            )
-        except Exception as e:
-            print(f"Error during PMV calculation: {e}")
-            pmv_value = np.nan
-
-        if abs(pmv_value - target_pmv) < tol:
-            return round(t_db_guess, 2)
-        elif pmv_value < target_pmv:
-            low = t_db_guess
-        else:
-            high = t_db_guess
-
-        iterations += 1
-
-    raise ValueError(
-        "Unable to find suitable t_db value within maximum number of iterations"
-    )
-
-
 def curve_fit(x, y, num_points=50):
     coefficients = np.polyfit(x, y, 2)
     polynomial = np.poly1d(coefficients)
@@ -1163,34 +991,80 @@ def curve_fit(x, y, num_points=50):
     return x_new, y_new
 
 
+# input marker and annotation of the psychrometric chart, they are the only part
+# of the chart that changes when only t_db or rh change (see update_chart)
+def psy_pmv_markers(
+    inputs: dict = None,
+    units: str = "SI",
+):
+    p_tdb = float(inputs[ElementsIDs.t_db_input.value])
+    p_rh = float(inputs[ElementsIDs.rh_input.value])
+    if units == UnitSystem.IP.value:
+        tdb = round(float(units_converter(tdb=p_tdb)[0]), 1)
+    else:
+        tdb = p_tdb
+
+    psy_results = psy_ta_rh(tdb, p_rh)
+    hr = round(float(psy_results["hr"]) * 1000, 1)
+    t_wb = round(float(psy_results["t_wb"]), 1)
+    t_dp = round(float(psy_results["t_dp"]), 1)
+    h = round(float(psy_results["h"]) / 1000, 1)
+
+    if units == UnitSystem.IP.value:
+        t_wb = round(float(units_converter(tmp=t_wb, from_units="si")[0]), 1)
+        t_dp = round(float(units_converter(tmp=t_dp, from_units="si")[0]), 1)
+        h = round(float(h / 2.326), 1)  # kJ/kg => btu/lb
+        tdb = p_tdb
+
+    markers = [
+        go.Scatter(
+            x=[tdb],
+            y=[hr],
+            mode="markers",
+            marker=dict(
+                color="red",
+                size=6,
+            ),
+            showlegend=False,
+            hoverinfo="skip",
+            meta=INPUT_MARKER,
+        )
+    ]
+
+    if units == UnitSystem.SI.value:
+        temperature_unit = "°C"
+        hr_unit = "g<sub>w</sub>/kg<sub>da</sub>"
+        h_unit = "kJ/kg"
+    else:
+        temperature_unit = "°F"
+        hr_unit = "lb<sub>w</sub>/klb<sub>da</sub>"
+        h_unit = "btu/lb"
+
+    annotation_text = (
+        f"t<sub>db</sub>: {tdb:.1f} {temperature_unit}<br>"
+        f"rh: {p_rh:.1f} %<br>"
+        f"W<sub>a</sub>: {hr} {hr_unit}<br>"
+        f"t<sub>wb</sub>: {t_wb} {temperature_unit}<br>"
+        f"t<sub>dp</sub>: {t_dp} {temperature_unit}<br>"
+        f"h: {h} {h_unit}"
+    )
+    return markers, annotation_text
+
+
 def psy_pmv(
     inputs: dict = None,
     model: str = "ASHRAE",
     units: str = "SI",
 ):
 
-    p_tdb = float(inputs[ElementsIDs.t_db_input.value])
+    condition = comfort_context(inputs).condition
     tr = float(inputs[ElementsIDs.t_r_input.value])
-    vr = float(
-        v_relative(  # Ensure vr is scalar
-            v=inputs[ElementsIDs.v_input.value], met=inputs[ElementsIDs.met_input.value]
-        )
-    )
-    p_rh = float(inputs[ElementsIDs.rh_input.value])
+    vr = float(condition.vr)  # Ensure vr is scalar
     met = float(inputs[ElementsIDs.met_input.value])
-    clo = float(
-        clo_dynamic(  # Ensure clo is scalar
-            clo=inputs[ElementsIDs.clo_input.value],
-            met=inputs[ElementsIDs.met_input.value],
-        )
-    )
-    # save original values for plotting
+    clo = float(condition.clo_d)  # Ensure clo is scalar
     if units == UnitSystem.IP.value:
-        tdb = round(float(units_converter(tdb=p_tdb)[0]), 1)
         tr = round(float(units_converter(tr=tr)[0]), 1)
         vr = round(float(units_converter(vr=vr)[0]), 1)
-    else:
-        tdb = p_tdb
 
     traces = []
 
@@ -1200,20 +1074,15 @@ def psy_pmv(
         pmv_targets = [-0.5, 0.5]
     else:
         pmv_targets = [-0.7, -0.5, -0.2, 0.2, 0.5, 0.7]
-    tdb_array = np.zeros((len(pmv_targets), len(rh_values)))
-
-    for j, pmv_target in enumerate(pmv_targets):
-        for i, rh_value in enumerate(rh_values):
-            tdb_solution = find_tdb_for_pmv(
-                target_pmv=pmv_target,
-                tr=tr,
-                vr=vr,
-                rh=rh_value,
-                met=met,
-                clo=clo,
-                standard=model,
-            )
-            tdb_array[j, i] = tdb_solution
+    tdb_array = find_tdb_for_pmv(
+        target_pmv=pmv_targets,
+        rh=rh_values,
+        tr=tr,
+        vr=vr,
+        met=met,
+        clo=clo,
+        standard=model,
+    )
 
     # calculate hr
     lower_rh_list = np.arange(0, 110, 10)
@@ -1221,34 +1090,12 @@ def psy_pmv(
     if model == "ASHRAE":
         lower_tdb = tdb_array[0]
         upper_tdb = tdb_array[1][::-1]
-        lower_hr = []
-        upper_hr = []
-        for i in range(len(lower_rh_list)):
-            lower_hr.append(
-                psy_ta_rh(tdb=lower_tdb[i], rh=lower_rh_list[i])["hr"] * 1000
-            )
-        for i in range(len(upper_rh_list)):
-            upper_hr.append(
-                psy_ta_rh(tdb=upper_tdb[i], rh=upper_rh_list[i])["hr"] * 1000
-            )
+        lower_hr = humidity_ratio(tdb=lower_tdb, rh=lower_rh_list) * 1000
+        upper_hr = humidity_ratio(tdb=upper_tdb, rh=upper_rh_list) * 1000
 
         if units == UnitSystem.IP.value:
-            lower_tdb = list(
-                map(
-                    lambda x: round(
-                        float(units_converter(tmp=x, from_units="si")[0]), 1
-                    ),
-                    lower_tdb,
-                )
-            )
-            upper_tdb = list(
-                map(
-                    lambda x: round(
-                        float(units_converter(tmp=x, from_units="si")[0]), 1
-                    ),
-                    upper_tdb,
-                )
-            )
+            lower_tdb = np.round(units_converter(tmp=lower_tdb, from_units="si")[0], 1)
+            upper_tdb = np.round(units_converter(tmp=upper_tdb, from_units="si")[0], 1)
 
         new_lower_tdb, new_lower_hr = curve_fit(lower_tdb, lower_hr)
         new_upper_tdb, new_upper_hr = curve_fit(upper_tdb, upper_hr)
@@ -1275,83 +1122,22 @@ def psy_pmv(
         ii_upper_tdb = tdb_array[4][::-1]
         i_lower_tdb = tdb_array[2]
         i_upper_tdb = tdb_array[3][::-1]
-        iii_lower_hr = []
-        iii_upper_hr = []
-        ii_lower_hr = []
-        ii_upper_hr = []
-        i_lower_hr = []
-        i_upper_hr = []
-
-        for i in range(len(lower_rh_list)):
-            iii_lower_hr.append(
-                psy_ta_rh(tdb=iii_lower_tdb[i], rh=lower_rh_list[i])["hr"] * 1000
-            )
-            ii_lower_hr.append(
-                psy_ta_rh(tdb=ii_lower_tdb[i], rh=lower_rh_list[i])["hr"] * 1000
-            )
-            i_lower_hr.append(
-                psy_ta_rh(tdb=i_lower_tdb[i], rh=lower_rh_list[i])["hr"] * 1000
-            )
-        for i in range(len(upper_rh_list)):
-            iii_upper_hr.append(
-                psy_ta_rh(tdb=iii_upper_tdb[i], rh=upper_rh_list[i])["hr"] * 1000
-            )
-            ii_upper_hr.append(
-                psy_ta_rh(tdb=ii_upper_tdb[i], rh=upper_rh_list[i])["hr"] * 1000
-            )
-            i_upper_hr.append(
-                psy_ta_rh(tdb=i_upper_tdb[i], rh=upper_rh_list[i])["hr"] * 1000
-            )
+        iii_lower_hr = humidity_ratio(tdb=iii_lower_tdb, rh=lower_rh_list) * 1000
+        iii_upper_hr = humidity_ratio(tdb=iii_upper_tdb, rh=upper_rh_list) * 1000
+        ii_lower_hr = humidity_ratio(tdb=ii_lower_tdb, rh=lower_rh_list) * 1000
+        ii_upper_hr = humidity_ratio(tdb=ii_upper_tdb, rh=upper_rh_list) * 1000
+        i_lower_hr = humidity_ratio(tdb=i_lower_tdb, rh=lower_rh_list) * 1000
+        i_upper_hr = humidity_ratio(tdb=i_upper_tdb, rh=upper_rh_list) * 1000
 
         if units == UnitSystem.IP.value:
-            iii_lower_tdb = list(
-                map(
-                    lambda x: round(
-                        float(units_converter(tmp=x, from_units="si")[0]), 1
-                    ),
-                    iii_lower_tdb,
-                )
-            )
-            iii_upper_tdb = list(
-                map(
-                    lambda x: round(
-                        float(units_converter(tmp=x, from_units="si")[0]), 1
-                    ),
-                    iii_upper_tdb,
-                )
-            )
-            ii_lower_tdb = list(
-                map(
-                    lambda x: round(
-                        float(units_converter(tmp=x, from_units="si")[0]), 1
-                    ),
-                    ii_lower_tdb,
-                )
-            )
-            ii_upper_tdb = list(
-                map(
-                    lambda x: round(
-                        float(units_converter(tmp=x, from_units="si")[0]), 1
-                    ),
-                    ii_upper_tdb,
-                )
-            )
-            i_lower_tdb = list(
-                map(
-                    lambda x: round(
-                        float(units_converter(tmp=x, from_units="si")[0]), 1
-                    ),
-                    i_lower_tdb,
-                )
-            )
-            i_upper_tdb = list(
-                map(
-                    lambda x: round(
-                        float(units_converter(tmp=x, from_units="si")[0]), 1
-                    ),
-                    i_upper_tdb,
-                )
-            )
+            iii_lower_tdb, iii_upper_tdb, ii_lower_tdb, ii_upper_tdb = [
+                np.round(units_converter(tmp=tdb, from_units="si")[0], 1)
+                for tdb in (iii_lower_tdb, iii_upper_tdb, ii_lower_tdb, ii_upper_tdb)
+            ]
+            i_lower_tdb, i_upper_tdb = [
+                np.round(units_converter(tmp=tdb, from_units="si")[0], 1)
+                for tdb in (i_lower_tdb, i_upper_tdb)
+            ]
 
         new_iii_lower_tdb, new_iii_lower_hr = curve_fit(iii_lower_tdb, iii_lower_hr)
         new_ii_lower_tdb, new_ii_lower_hr = curve_fit(ii_lower_tdb, ii_lower_hr)
@@ -1409,52 +1195,34 @@ def psy_pmv(
             )
         )
 
+    points = density_overlay(inputs, units)
+    if points is not None:
+        t_db_points, rh_points = points
+        if units == UnitSystem.IP.value:
+            t_db_points = (t_db_points - 32) / 1.8
+        traces.append(
+            density_heatmap(
+                points[0],
+                humidity_ratio(tdb=t_db_points, rh=rh_points) * 1000,
+                x_range=[10, 36] if units == UnitSystem.SI.value else [50, 96.8],
+                y_range=[0, 30],
+            )
+        )
+        fractions = comfort_fractions(
+            t_db_points,
+            rh_points,
+            {limit: (rh_values, tdb) for limit, tdb in zip(pmv_targets, tdb_array)},
+        )
+
     # current point
     # Red point
-    psy_results = psy_ta_rh(tdb, p_rh)
-    hr = round(float(psy_results["hr"]) * 1000, 1)
-    t_wb = round(float(psy_results["t_wb"]), 1)
-    t_dp = round(float(psy_results["t_dp"]), 1)
-    h = round(float(psy_results["h"]) / 1000, 1)
-
-    if units == UnitSystem.IP.value:
-        t_wb = round(float(units_converter(tmp=t_wb, from_units="si")[0]), 1)
-        t_dp = round(float(units_converter(tmp=t_dp, from_units="si")[0]), 1)
-        h = round(float(h / 2.326), 1)  # kJ/kg => btu/lb
-        tdb = p_tdb
-
-    traces.append(
-        go.Scatter(
-            x=[tdb],
-            y=[hr],
-            mode="markers",
-            marker=dict(
-                color="red",
-                size=6,
-            ),
-            showlegend=False,
-            hoverinfo="skip",
-        )
-    )
+    markers, annotation_text = psy_pmv_markers(inputs=inputs, units=units)
+    traces += markers
 
     # lines
 
-    rh_list = np.arange(0, 110, 10, dtype=float).tolist()
-    tdb_list = np.linspace(10, 36, 500, dtype=float).tolist()
-    if units == UnitSystem.IP.value:
-        tdb_list_conv = list(
-            map(
-                lambda x: round(float(units_converter(tmp=x, from_units="si")[0]), 1),
-                tdb_list,
-            )
-        )
-    else:
-        tdb_list_conv = tdb_list
-
-    for rh in rh_list:
-        hr_list = np.array(
-            [psy_ta_rh(tdb=t, rh=rh, p_atm=101325)["hr"] * 1000 for t in tdb_list]
-        )  # kg/kg => g/kg
+    rh_list, tdb_list_conv, hr_lists = rh_curves(units=units, p_atm=101325)
+    for rh, hr_list in zip(rh_list, hr_lists):
         trace = go.Scatter(
             x=tdb_list_conv,
             y=hr_list,
@@ -1473,28 +1241,7 @@ def psy_pmv(
         else np.linspace(50, 96.8, 100)
     )
     y_range = np.linspace(0, 30, 100)
-    xx, yy = np.meshgrid(x_range, y_range)
-
-    traces.append(
-        go.Scatter(
-            x=xx.flatten(),
-            y=yy.flatten(),
-            mode="markers",
-            marker=dict(size=2, color="rgba(0,0,0,0)"),
-            hoverinfo="none",
-            name="Interactive Hover Area",
-            showlegend=False,
-        )
-    )
-
-    if units == UnitSystem.SI.value:
-        temperature_unit = "°C"
-        hr_unit = "g<sub>w</sub>/kg<sub>da</sub>"
-        h_unit = "kJ/kg"
-    else:
-        temperature_unit = "°F"
-        hr_unit = "lb<sub>w</sub>/klb<sub>da</sub>"
-        h_unit = "btu/lb"
+    traces.append(hover_area(x_range, y_range))
 
     # layout
     layout = go.Layout(
@@ -1532,21 +1279,19 @@ def psy_pmv(
                 y=25,
                 xref="x",
                 yref="y",
-                text=(
-                    f"t<sub>db</sub>: {tdb:.1f} {temperature_unit}<br>"
-                    f"rh: {p_rh:.1f} %<br>"
-                    f"W<sub>a</sub>: {hr} {hr_unit}<br>"
-                    f"t<sub>wb</sub>: {t_wb} {temperature_unit}<br>"
-                    f"t<sub>dp</sub>: {t_dp} {temperature_unit}<br>"
-                    f"h: {h} {h_unit}"
-                ),
+                text=annotation_text,
                 showarrow=False,
                 align="left",
                 bgcolor="rgba(255,255,255,0.8)",
                 bordercolor="rgba(0,0,0,0)",
                 font=dict(size=14),
             )
-        ],
+        ]
+        + (
+            []
+            if points is None
+            else [density_annotation(fractions, len(points[0]), model)]
+        ),
         showlegend=True,
         plot_bgcolor="white",
         margin=dict(l=0, t=10),
@@ -1558,66 +1303,53 @@ def psy_pmv(
     return fig
 
 
+# input marker of the air speed chart, the comfort zone does not depend on t_db
+# or on the air speed itself (see update_chart)
+def speed_temp_pmv_markers(inputs: dict = None):
+    markers = [
+        go.Scatter(
+            x=[inputs[ElementsIDs.t_db_input.value]],
+            y=[inputs[ElementsIDs.v_input.value]],
+            mode="markers",
+            marker=dict(color="red"),
+            name="Input",
+            showlegend=False,
+            meta=INPUT_MARKER,
+        )
+    ]
+    return markers, None
+
+
 def speed_temp_pmv(
     inputs: dict = None,
     model: str = "iso",
     units: str = "SI",
 ):
-    results = []
-    met, clo, tr, t_db, v, rh = get_inputs(inputs)
-    clo_d = clo_dynamic(clo, met)
-    if units == "IP":
-        v = v
-        t_db = (5.0 / 9.0) * (t_db - 32)
-    else:
-        v = 0.3048 * v
-    vr = v_relative(v, met)
     pmv_limits = [-0.5, 0.5]
-    clo_d = clo_dynamic(
-        clo=inputs[ElementsIDs.clo_input.value], met=inputs[ElementsIDs.met_input.value]
+    clo_d = comfort_context(inputs).condition.clo_d
+    vr_values = np.arange(0.1, 0.9, 0.1)
+    temps = pmv_speed_boundaries(
+        pmv_limits,
+        vr_values,
+        rh=inputs[ElementsIDs.rh_input.value],
+        met=inputs[ElementsIDs.met_input.value],
+        clo=clo_d,
+        wme=0,
+        standard=model,
+        low=10,
+        high=40,
     )
-    for pmv_limit in pmv_limits:
-        for vr in np.arange(0.1, 0.9, 0.1):
-
-            def function(x):
-                pmv_value = (
-                    pmv(
-                        x,
-                        x,
-                        vr=vr,
-                        rh=inputs[ElementsIDs.rh_input.value],
-                        met=inputs[ElementsIDs.met_input.value],
-                        clo=clo_d,
-                        wme=0,
-                        standard=model,
-                        units="SI",
-                        limit_inputs=False,
-                    )
-                    - pmv_limit
-                )
-                return pmv_value
-
-            try:
-                temp = optimize.brentq(function, 10, 40)
-                if units == "SI":
-                    results.append(
-                        {
-                            "vr": vr,
-                            "temp": temp,
-                            "pmv_limit": pmv_limit,
-                        }
-                    )
-                else:
-                    results.append(
-                        {
-                            "vr": vr * 3.28084,
-                            "temp": temp * (9.0 / 5.0) + 32,
-                            "pmv_limit": pmv_limit,
-                        }
-                    )
-            except ValueError:
-                continue
-    df = pd.DataFrame(results)
+    limits_grid, vr_grid = np.meshgrid(pmv_limits, vr_values, indexing="ij")
+    if units == "SI":
+        results = {"vr": vr_grid.ravel(), "temp": temps.ravel()}
+    else:
+        results = {
+            "vr": vr_grid.ravel() * 3.28084,
+            "temp": temps.ravel() * (9.0 / 5.0) + 32,
+        }
+    results["pmv_limit"] = limits_grid.ravel()
+    # points without a solution in the bracket are skipped
+    df = pd.DataFrame(results).dropna(subset=["temp"])
     fig = go.Figure()
     # Define trace1
     fig.add_trace(
@@ -1644,16 +1376,8 @@ def speed_temp_pmv(
         )
     )
     # Define input point
-    fig.add_trace(
-        go.Scatter(
-            x=[inputs[ElementsIDs.t_db_input.value]],
-            y=[inputs[ElementsIDs.v_input.value]],
-            mode="markers",
-            marker=dict(color="red"),
-            name="Input",
-            showlegend=False,
-        )
-    )
+    markers, _ = speed_temp_pmv_markers(inputs=inputs)
+    fig.add_trace(markers[0])
     fig.update_layout(
         hovermode=False,
         xaxis_title=(
@@ -1694,3 +1418,123 @@ def speed_temp_pmv(
         ),
     )
     return fig
+
+
+def time_series_message(message: str):
+    fig = go.Figure()
+    fig.add_annotation(
+        text=message,
+        xref="paper",
+        yref="paper",
+        x=0.5,
+        y=0.5,
+        showarrow=False,
+    )
+    fig.update_layout(
+        template="plotly_white",
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        height=500,
+        width=680,
+    )
+    return fig
+
+
+def time_series_chart(inputs: dict, dataset: str = None, x_range=(None, None)):
+    """Results of a file plotted with the Plot time series button against time.
+
+    Only the rows in x_range are read from the memory-mapped results and each
+    trace is downsampled to TimeSeriesSettings.max_points points, so the figure
+    has the same size whatever the length of the file and the zoom.
+    """
+    selected_model: str = inputs[ElementsIDs.MODEL_SELECTION.value]
+    units: str = inputs[ElementsIDs.UNIT_TOGGLE.value]
+    series = read_series(dataset)
+    if series is None:
+        return time_series_message(
+            "Plot a file with Plot time series in the Bulk evaluation section"
+        )
+    meta, columns = series
+    if meta["model"] != selected_model or meta["units"] != units:
+        return time_series_message(
+            f"The file was evaluated with {Models[meta['model']].value.description} in "
+            f"{meta['units']} units, plot it again with the model selected"
+        )
+
+    window = series_window(columns[TIME_COLUMN], *x_range)
+    times = columns[TIME_COLUMN][window]
+    value_column = SERIES_COLUMNS[selected_model][0]
+    values = columns[value_column][window]
+    indices = downsample(times, values)
+    x = times[indices]
+    if meta["time"]:
+        x = pd.to_datetime(x)
+
+    fig = go.Figure()
+    if selected_model in (Models.PMV_ashrae.name, Models.PMV_EN.name):
+        if selected_model == Models.PMV_EN.name:
+            bands = [
+                (0.7, "rgba(168,204,162,0.9)"),
+                (0.5, "rgba(114,174,106,0.9)"),
+                (0.2, "rgba(78,156,71,0.9)"),
+            ]
+        else:
+            bands = [(0.5, "rgba(59, 189, 237, 0.7)")]
+        for limit, color in bands:
+            fig.add_hrect(
+                y0=-limit, y1=limit, fillcolor=color, line_width=0, layer="below"
+            )
+        y_title = "PMV"
+    else:
+        model = "iso" if selected_model == Models.Adaptive_EN.name else "ashrae"
+        # the limits are sampled at the points kept for the operative temperature
+        for cat, name, color in ADAPTIVE_CATEGORIES[model]:
+            for bound in ("low", "up"):
+                fig.add_trace(
+                    go.Scatter(
+                        x=x,
+                        y=columns[f"tmp_cmf_{cat}_{bound}"][window][indices],
+                        mode="lines",
+                        line=dict(color="rgba(0,0,0,0)"),
+                        fill="tonexty" if bound == "up" else None,
+                        fillcolor=color,
+                        name=name,
+                        showlegend=False,
+                        hoverinfo="skip",
+                    )
+                )
+        y_title = (
+            "Operative Temperature [°C]"
+            if units == UnitSystem.SI.value
+            else "Operative Temperature [°F]"
+        )
+
+    fig.add_trace(
+        go.Scatter(
+            x=x,
+            y=values[indices],
+            mode="lines",
+            line=dict(color="black", width=1),
+            name=y_title,
+            showlegend=False,
+        )
+    )
+    fig.update_layout(
+        template="plotly_white",
+        xaxis=dict(
+            title="Time" if meta["time"] else "Row",
+            linecolor="lightgrey",
+            gridcolor="lightgray",
+        ),
+        yaxis=dict(
+            title=y_title,
+            linecolor="lightgrey",
+            gridcolor="lightgray",
+        ),
+        # keeps the zoom of the user while the points of the range are replaced
+        uirevision=meta["dataset"],
+        margin=dict(l=10, t=10),
+        height=500,
+        width=680,
+    )
+    return fig
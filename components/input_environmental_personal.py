@@ -6,8 +6,8 @@ from components.dropdowns import options
 from utils.my_config_file import (
     ModelInputsInfo,
     Models,
-    convert_units,
     ElementsIDs,
+    model_input_id,
     UnitSystem,
     MetabolicRateSelection,
     ClothingSelection,
@@ -15,6 +15,7 @@ from utils.my_config_file import (
     AdaptiveENSpeeds,
     AdaptiveAshraeSpeeds,
 )
+from utils.get_inputs import model_inputs_snapshot
 from utils.website_text import (
     TextWarning,
 )
@@ -314,7 +315,9 @@ def input_environmental_personal(
     include_tr: bool = True,
     include_air_temp: bool = True,
     is_operative_temperature: bool = False,
+    input_values: dict = None,
 ):
+    # input_values are the inputs of the session, when None the defaults are shown
     inputs = []
     all_inputs = set()
 
@@ -328,8 +331,12 @@ def input_environmental_personal(
             for input_info in Models.PMV_ashrae.value.inputs2:
                 all_inputs.add(input_info.id)
 
-    model_inputs = Models[selected_model].value.inputs
-    model_inputs = convert_units(model_inputs, units)
+    values_units = (
+        input_values.get(ElementsIDs.UNIT_TOGGLE.value) if input_values else None
+    )
+    model_inputs = model_inputs_snapshot(
+        selected_model, units, values=input_values, values_units=values_units
+    )
 
     def shared_label_and_description(values):
         return dmc.Stack(
@@ -341,7 +348,13 @@ def input_environmental_personal(
         )
 
     model_inputs2 = (
-        convert_units(Models[selected_model].value.inputs2, units)
+        model_inputs_snapshot(
+            selected_model,
+            units,
+            True,
+            values=input_values,
+            values_units=values_units,
+        )
         if function_selection == Functionalities.Compare.value
         and selected_model in [Models.PMV_ashrae.name]
         else None
@@ -350,9 +363,9 @@ def input_environmental_personal(
     for idx, values in enumerate(model_inputs):
         input_id = values.id
         if input_id == ElementsIDs.t_db_input.value and is_operative_temperature:
-            values.name = "Operative Temperature"
+            values = values.model_copy(update={"name": "Operative Temperature"})
         elif input_id == ElementsIDs.t_db_input.value and not is_operative_temperature:
-            values.name = "Air Temperature"
+            values = values.model_copy(update={"name": "Air Temperature"})
         if input_id in all_inputs:
             if input_id == ElementsIDs.t_r_input.value and not include_tr:
                 continue
@@ -373,7 +386,7 @@ def input_environmental_personal(
                     min=values.min,
                     max=values.max,
                     step=values.step,
-                    id=values.id,
+                    id=model_input_id(values.id),
                     debounce=True,
                 )
 
@@ -404,7 +417,7 @@ def input_environmental_personal(
                         min=comparison_values.min,
                         max=comparison_values.max,
                         step=comparison_values.step,
-                        id=comparison_values.id,
+                        id=model_input_id(comparison_values.id),
                     )
                     input_stack = dmc.Stack(
                         [
@@ -431,7 +444,9 @@ def input_environmental_personal(
 
     for input_id in all_inputs:
         if input_id not in [input_info.id for input_info in model_inputs]:
-            inputs.append(html.Div(style={"display": "none"}, id=input_id))
+            inputs.append(
+                html.Div(style={"display": "none"}, id=model_input_id(input_id))
+            )
 
     unit_toggle = dmc.Center(
         dmc.Switch(
@@ -484,7 +499,7 @@ def input_environmental_personal(
 # Custom Ensemble
 @callback(
     Output(ElementsIDs.modal_custom_ensemble.value, "opened"),
-    Output(ElementsIDs.clo_input.value, "value", allow_duplicate=True),
+    Output(model_input_id(ElementsIDs.clo_input.value), "value", allow_duplicate=True),
     Output(ElementsIDs.modal_custom_ensemble_warning.value, "display"),
     Output(ElementsIDs.modal_custom_ensemble_warning.value, "children"),
     Input(ElementsIDs.modal_custom_ensemble_value.value, "value"),
@@ -538,7 +553,7 @@ def handle_modal(clo_value, _nc_open, _nc_close, _nc_submit, opened, selected_mo
 
 def create_autocomplete(values: ModelInputsInfo):
     return dmc.Autocomplete(
-        id=values.id,
+        id=model_input_id(values.id),
         # label=f"{values.name} ({values.unit})",
         placeholder=f"Enter a value or select a {values.name}",
         data=[],
@@ -556,7 +571,7 @@ def create_select_component(values: ModelInputsInfo, model_name):
 
     if model_name in speed_options:
         air_speed_box = {
-            "id": ElementsIDs.v_input.value,
+            "id": model_input_id(ElementsIDs.v_input.value),
             "question": None,
             "options": speed_options[model_name],
             "multi": False,
@@ -626,7 +641,9 @@ def update_options(input_value, selection_enum, model, input_type):
     return filtered_options, input_value
 
 
-def create_and_update_callback(element_id, selection_enum, input_type):
+def create_and_update_callback(input_id, selection_enum, input_type):
+    element_id = model_input_id(input_id)
+
     @callback(
         Output(element_id, "data"),
         Output(element_id, "value"),
@@ -1,10 +1,10 @@
 import dash_mantine_components as dmc
-from pythermalcomfort.models import pmv_ppd, adaptive_ashrae
-from pythermalcomfort.utilities import v_relative, clo_dynamic, mapping
-from pythermalcomfort.models import adaptive_en, set_tmp, pmv_ppd, cooling_effect
+from pythermalcomfort.models import adaptive_ashrae
+from pythermalcomfort.utilities import mapping
+from pythermalcomfort.models import adaptive_en
 from pythermalcomfort.psychrometrics import t_o
 
-from utils.get_inputs import get_inputs
+from utils.comfort_context import comfort_context
 from utils.my_config_file import (
     Models,
     UnitSystem,
@@ -14,6 +14,8 @@ from utils.my_config_file import (
     CompareInputColor,
     ComfortLevel,
     Charts,
+    PMV_SENSATIONS,
+    PMV_EN_CATEGORIES,
 )
 
 
@@ -29,58 +31,8 @@ def display_results(inputs: dict):
         if selected_model == Models.PMV_ashrae.name:
             standard = "ashrae"
 
-        r_pmv = pmv_ppd(
-            tdb=inputs[ElementsIDs.t_db_input.value],
-            tr=inputs[ElementsIDs.t_r_input.value],
-            vr=v_relative(
-                v=inputs[ElementsIDs.v_input.value],
-                met=inputs[ElementsIDs.met_input.value],
-            ),
-            rh=inputs[ElementsIDs.rh_input.value],
-            met=inputs[ElementsIDs.met_input.value],
-            clo=clo_dynamic(
-                clo=inputs[ElementsIDs.clo_input.value],
-                met=inputs[ElementsIDs.met_input.value],
-            ),
-            wme=0,
-            limit_inputs=True,
-            units=units,
-            standard=standard,
-        )
-        r_set_tmp = set_tmp(
-            tdb=inputs[ElementsIDs.t_db_input.value],
-            tr=inputs[ElementsIDs.t_r_input.value],
-            v=v_relative(
-                v=inputs[ElementsIDs.v_input.value],
-                met=inputs[ElementsIDs.met_input.value],
-            ),
-            rh=inputs[ElementsIDs.rh_input.value],
-            met=inputs[ElementsIDs.met_input.value],
-            clo=clo_dynamic(
-                clo=inputs[ElementsIDs.clo_input.value],
-                met=inputs[ElementsIDs.met_input.value],
-            ),
-            wme=0,
-            limit_inputs=True,
-            units=units,
-            standard=standard,
-        )
-        r_cooling_effect = cooling_effect(
-            tdb=inputs[ElementsIDs.t_db_input.value],
-            tr=inputs[ElementsIDs.t_r_input.value],
-            vr=v_relative(
-                v=inputs[ElementsIDs.v_input.value],
-                met=inputs[ElementsIDs.met_input.value],
-            ),
-            rh=inputs[ElementsIDs.rh_input.value],
-            met=inputs[ElementsIDs.met_input.value],
-            clo=clo_dynamic(
-                clo=inputs[ElementsIDs.clo_input.value],
-                met=inputs[ElementsIDs.met_input.value],
-            ),
-            wme=0,
-            units=units,
-        )
+        condition = comfort_context(inputs).condition
+        r_pmv = condition.pmv_ppd
 
         # Standard Checker for PMV
         # todo: need to add standard for adaptive methods by ensure if the current red point out of area
@@ -117,7 +69,9 @@ def display_results(inputs: dict):
                     children=[
                         dmc.Center(dmc.Text(f"PMV: {r_pmv['pmv']:.2f}")),
                         dmc.Center(dmc.Text(f"PPD: {r_pmv['ppd']:.1f} %")),
-                        dmc.Center(dmc.Text(f"SET: {r_set_tmp:.1f} {temp_unit}")),
+                        dmc.Center(
+                            dmc.Text(f"SET: {condition.set_tmp:.1f} {temp_unit}")
+                        ),
                     ],
                 ),
             ]
@@ -136,25 +90,12 @@ def display_results(inputs: dict):
             ]
 
         if selected_model == Models.PMV_ashrae.name:
-            comfort_category = mapping(
-                r_pmv["pmv"],
-                {
-                    -2.5: "Cold",
-                    -1.5: "Cool",
-                    -0.5: "Slightly Cool",
-                    0.5: "Neutral",
-                    1.5: "Slightly Warm",
-                    2.5: "Warm",
-                    10: "Hot",
-                },
-            )
+            comfort_category = mapping(r_pmv["pmv"], PMV_SENSATIONS)
             results[1].children.append(
                 dmc.Center(dmc.Text(f"Sensation: {comfort_category}"))
             )
         elif selected_model == Models.PMV_EN.name:
-            comfort_category = mapping(
-                abs(r_pmv["pmv"]), {0.2: "I", 0.5: "II", 0.7: "III", float("inf"): "IV"}
-            )
+            comfort_category = mapping(abs(r_pmv["pmv"]), PMV_EN_CATEGORIES)
             results[1].children.append(
                 dmc.Center(dmc.Text(f"Category: {comfort_category}"))
             )
@@ -249,13 +190,13 @@ def display_results(inputs: dict):
             if units == UnitSystem.SI.value:
 
                 results[0].children.append(
-                    dmc.Center(dmc.Text(f"{r_set_tmp:.1f} {temp_unit}"))
+                    dmc.Center(dmc.Text(f"{condition.set_tmp:.1f} {temp_unit}"))
                 )
 
             else:
 
                 results[0].children.append(
-                    dmc.Center(dmc.Text(f"{r_set_tmp:.1f} {temp_unit}"))
+                    dmc.Center(dmc.Text(f"{condition.set_tmp:.1f} {temp_unit}"))
                 )
                 results[0].children.append(
                     dmc.Center(
@@ -263,7 +204,7 @@ def display_results(inputs: dict):
                     )
                 )
                 results[0].children.append(
-                    dmc.Center(dmc.Text(f"{r_cooling_effect:.1f} {temp_unit}"))
+                    dmc.Center(dmc.Text(f"{condition.cooling_effect:.1f} {temp_unit}"))
                 )
 
             for i in range(0, len(results)):
@@ -276,59 +217,8 @@ def display_results(inputs: dict):
                         ):
                             child.children.style = {"color": color}
 
-            r_pmv_input2 = pmv_ppd(
-                tdb=inputs[ElementsIDs.t_db_input_input2.value],
-                tr=inputs[ElementsIDs.t_r_input_input2.value],
-                vr=v_relative(
-                    v=inputs[ElementsIDs.v_input_input2.value],
-                    met=inputs[ElementsIDs.met_input_input2.value],
-                ),
-                rh=inputs[ElementsIDs.rh_input_input2.value],
-                met=inputs[ElementsIDs.met_input_input2.value],
-                clo=clo_dynamic(
-                    clo=inputs[ElementsIDs.clo_input_input2.value],
-                    met=inputs[ElementsIDs.met_input_input2.value],
-                ),
-                wme=0,
-                limit_inputs=True,
-                units=units,
-                standard=standard,
-            )
-            r_set_tmp_input2 = set_tmp(
-                tdb=inputs[ElementsIDs.t_db_input_input2.value],
-                tr=inputs[ElementsIDs.t_r_input_input2.value],
-                v=v_relative(
-                    v=inputs[ElementsIDs.v_input_input2.value],
-                    met=inputs[ElementsIDs.met_input_input2.value],
-                ),
-                rh=inputs[ElementsIDs.rh_input_input2.value],
-                met=inputs[ElementsIDs.met_input_input2.value],
-                clo=clo_dynamic(
-                    clo=inputs[ElementsIDs.clo_input_input2.value],
-                    met=inputs[ElementsIDs.met_input_input2.value],
-                ),
-                wme=0,
-                limit_inputs=True,
-                units=units,
-                standard=standard,
-            )
-
-            r_cooling_effect_input2 = cooling_effect(
-                tdb=inputs[ElementsIDs.t_db_input_input2.value],
-                tr=inputs[ElementsIDs.t_r_input_input2.value],
-                vr=v_relative(
-                    v=inputs[ElementsIDs.v_input_input2.value],
-                    met=inputs[ElementsIDs.met_input_input2.value],
-                ),
-                rh=inputs[ElementsIDs.rh_input_input2.value],
-                met=inputs[ElementsIDs.met_input_input2.value],
-                clo=clo_dynamic(
-                    clo=inputs[ElementsIDs.clo_input_input2.value],
-                    met=inputs[ElementsIDs.met_input_input2.value],
-                ),
-                wme=0,
-                units=units,
-            )
+            compare_condition = comfort_context(inputs).compare_condition
+            r_pmv_input2 = compare_condition.pmv_ppd
 
             if (
                 inputs[ElementsIDs.functionality_selection.value]
@@ -372,13 +262,13 @@ def display_results(inputs: dict):
             if units == UnitSystem.SI.value:
 
                 results2[0].children.append(
-                    dmc.Center(dmc.Text(f"{r_set_tmp_input2:.1f} {temp_unit}"))
+                    dmc.Center(dmc.Text(f"{compare_condition.set_tmp:.1f} {temp_unit}"))
                 )
 
             else:
 
                 results2[0].children.append(
-                    dmc.Center(dmc.Text(f"{r_set_tmp_input2:.1f} {temp_unit}"))
+                    dmc.Center(dmc.Text(f"{compare_condition.set_tmp:.1f} {temp_unit}"))
                 )
                 results2[0].children.append(
                     dmc.Center(
@@ -388,7 +278,9 @@ def display_results(inputs: dict):
                     )
                 )
                 results2[0].children.append(
-                    dmc.Center(dmc.Text(f"{r_cooling_effect_input2:.1f} {temp_unit}"))
+                    dmc.Center(
+                        dmc.Text(f"{compare_condition.cooling_effect:.1f} {temp_unit}")
+                    )
                 )
 
             for i in range(0, len(results2)):
@@ -1,16 +1,36 @@
 import dash
 import dash_mantine_components as dmc
-from dash import html, callback, Output, Input, no_update, State, ctx, dcc
+from dash import (
+    html,
+    callback,
+    clientside_callback,
+    ClientsideFunction,
+    Output,
+    Input,
+    no_update,
+    State,
+    ctx,
+    dcc,
+    Patch,
+    ALL,
+)
 
 from components.charts import (
     t_rh_pmv,
+    t_rh_pmv_markers,
     chart_selector,
     get_heat_losses,
     SET_outputs_chart,
     adaptive_chart,
+    adaptive_chart_markers,
     psy_pmv,
+    psy_pmv_markers,
     speed_temp_pmv,
+    speed_temp_pmv_markers,
+    INPUT_MARKER,
+    time_series_chart,
 )
+from components.bulk_upload import bulk_upload
 from components.dropdowns import (
     model_selection,
 )
@@ -19,6 +39,8 @@ from components.input_environmental_personal import input_environmental_personal
 from components.my_card import my_card
 from components.show_results import display_results
 from utils.get_inputs import get_inputs
+from utils.instrumentation import instrument_background
+from utils.time_series import relayout_range
 from utils.my_config_file import (
     URLS,
     ElementsIDs,
@@ -29,9 +51,11 @@ from utils.my_config_file import (
     ChartsInfo,
     MyStores,
     Functionalities,
+    InputSettings,
+    BackgroundSettings,
+    model_input_id,
 )
 import plotly.graph_objects as go
-from pythermalcomfort.psychrometrics import psy_ta_rh, p_sat
 from urllib.parse import parse_qs, urlencode
 
 dash.register_page(__name__, path=URLS.HOME.value)
@@ -70,6 +94,14 @@ layout = dmc.Stack(
                                 id=ElementsIDs.charts_dropdown.value,
                                 children=html.Div(id=ElementsIDs.chart_selected.value),
                             ),
+                            dmc.Progress(
+                                id=ElementsIDs.CHART_PROGRESS.value,
+                                # indeterminate, the render of a chart has no stages
+                                value=100,
+                                striped=True,
+                                animated=True,
+                                style={"display": "none"},
+                            ),
                             html.Div(
                                 id=ElementsIDs.CHART_CONTAINER.value,
                             ),
@@ -78,6 +110,22 @@ layout = dmc.Stack(
                             dcc.Store(
                                 id=ElementsIDs.INITIAL_URL.value, storage_type="memory"
                             ),
+                            dcc.Store(
+                                id=MyStores.chart_zone.value, storage_type="memory"
+                            ),
+                            dcc.Store(
+                                id=MyStores.form_inputs.value, storage_type="memory"
+                            ),
+                            dcc.Store(
+                                id=MyStores.chart_request.value, storage_type="memory"
+                            ),
+                            dcc.Store(
+                                id=MyStores.input_settings.value,
+                                storage_type="memory",
+                                data={
+                                    "quiet_period_ms": InputSettings.quiet_period_ms.value
+                                },
+                            ),
                         ],
                     ),
                     span={"base": 12, "sm": Dimensions.right_container_width.value},
@@ -85,53 +133,98 @@ layout = dmc.Stack(
             ],
             gutter="xl",
         ),
+        dmc.Grid(
+            children=[
+                my_card(
+                    title="Bulk evaluation",
+                    children=bulk_upload(),
+                    span=12,
+                ),
+            ],
+            gutter="xl",
+        ),
     ]
 )
 
 
 # Todo adding reflecting value to the url
 # done
+# the values of the form are coalesced in the browser, fast typing only sends the last
+clientside_callback(
+    ClientsideFunction(namespace="inputs", function_name="coalesce_model_inputs"),
+    Output(MyStores.form_inputs.value, "data"),
+    Input(model_input_id(ALL), "value"),
+    State(MyStores.input_settings.value, "data"),
+)
+
+
+# the files are posted by the browser, see assets/bulk_upload.js
+clientside_callback(
+    ClientsideFunction(namespace="bulk", function_name="upload_file"),
+    Output(ElementsIDs.BULK_UPLOAD_STATUS.value, "children"),
+    Input(ElementsIDs.BULK_UPLOAD_BUTTON.value, "n_clicks"),
+    State(MyStores.input_data.value, "data"),
+    State(MyStores.upload_settings.value, "data"),
+    prevent_initial_call=True,
+)
+
+clientside_callback(
+    ClientsideFunction(namespace="bulk", function_name="plot_file"),
+    Output(ElementsIDs.BULK_UPLOAD_STATUS.value, "children", allow_duplicate=True),
+    Input(ElementsIDs.BULK_PLOT_BUTTON.value, "n_clicks"),
+    State(MyStores.input_data.value, "data"),
+    State(MyStores.upload_settings.value, "data"),
+    prevent_initial_call=True,
+)
+
+
 @callback(
     Output(MyStores.input_data.value, "data"),
     Output(ElementsIDs.URL.value, "search", allow_duplicate=True),
-    Input(ElementsIDs.inputs_form.value, "n_clicks"),
-    Input(ElementsIDs.inputs_form.value, "children"),
-    Input(ElementsIDs.clo_input.value, "value"),
-    ### V input
-    Input(ElementsIDs.v_input.value, "value"),
-    Input(ElementsIDs.met_input.value, "value"),
+    Input(MyStores.form_inputs.value, "data"),
     Input(ElementsIDs.UNIT_TOGGLE.value, "checked"),
     Input(ElementsIDs.chart_selected.value, "value"),
     Input(ElementsIDs.functionality_selection.value, "value"),
+    Input(ElementsIDs.DENSITY_OVERLAY.value, "checked"),
+    Input(MyStores.series_dataset.value, "data"),
     State(ElementsIDs.MODEL_SELECTION.value, "value"),
+    State(MyStores.input_data.value, "data"),
     prevent_initial_call=True,
 )
 def update_store_inputs(
-    form_clicks: int,
-    form_content: dict,
-    clo_value: float,
-    met_value: float,
-    v_input: float,
+    form_values: dict,
     units_selection: str,
     chart_selected: str,
     functionality_selection: str,
+    density_overlay: bool,
+    series_dataset: str,
     selected_model: str,
+    stored_inputs: dict,
 ):
     units = UnitSystem.IP.value if units_selection else UnitSystem.SI.value
+    # when the units are toggled the form still shows the values in the previous units
+    form_units = units
+    if ctx.triggered_id == ElementsIDs.UNIT_TOGGLE.value and stored_inputs:
+        form_units = stored_inputs.get(ElementsIDs.UNIT_TOGGLE.value, units)
     inputs = get_inputs(
-        selected_model, form_content, units, functionality_selection, type="input"
+        selected_model,
+        form_values or {},
+        units,
+        functionality_selection,
+        form_units=form_units,
     )
-    if ctx.triggered:
-        triggered_id = ctx.triggered[0]["prop_id"].split(".")[0]
-        if triggered_id == ElementsIDs.clo_input.value and clo_value != "":
-            inputs[ElementsIDs.clo_input.value] = float(clo_value)
-        if triggered_id == ElementsIDs.met_input.value and met_value != "":
-            inputs[ElementsIDs.met_input.value] = float(met_value)
 
     inputs[ElementsIDs.UNIT_TOGGLE.value] = units
     inputs[ElementsIDs.MODEL_SELECTION.value] = selected_model
     inputs[ElementsIDs.chart_selected.value] = chart_selected
     inputs[ElementsIDs.functionality_selection.value] = functionality_selection
+    # the charts overlay the points of the file plotted with Plot time series
+    if density_overlay and series_dataset:
+        inputs[ElementsIDs.DENSITY_OVERLAY.value] = series_dataset
+
+    # identical inputs would only recompute the same charts and results
+    if inputs == stored_inputs:
+        return no_update, no_update
 
     url_search = f"?{urlencode(inputs)}"
 
@@ -145,11 +238,21 @@ def update_store_inputs(
     Input(ElementsIDs.UNIT_TOGGLE.value, "checked"),
     Input(ElementsIDs.functionality_selection.value, "value"),
     Input(ElementsIDs.chart_selected.value, "value"),
+    State(MyStores.input_data.value, "data"),
 )
-def update_inputs(selected_model, units_selection, function_selection, chart_selected):
+def update_inputs(
+    selected_model, units_selection, function_selection, chart_selected, stored_inputs
+):
     if selected_model is None:
         return no_update
     units = UnitSystem.IP.value if units_selection else UnitSystem.SI.value
+    # the form keeps the values of this session, they are kept in the store
+    input_values = None
+    if (
+        stored_inputs
+        and stored_inputs.get(ElementsIDs.MODEL_SELECTION.value) == selected_model
+    ):
+        input_values = stored_inputs
     if chart_selected == Charts.wind_temp_chart.value.name:
         return input_environmental_personal(
             selected_model,
@@ -157,6 +260,7 @@ def update_inputs(selected_model, units_selection, function_selection, chart_sel
             function_selection,
             include_tr=False,
             is_operative_temperature=True,
+            input_values=input_values,
         )
     elif chart_selected in [
         Charts.set_outputs.value.name,
@@ -168,6 +272,7 @@ def update_inputs(selected_model, units_selection, function_selection, chart_sel
             function_selection,
             include_tr=True,
             include_air_temp=False,
+            input_values=input_values,
         )
     else:
         return input_environmental_personal(
@@ -177,6 +282,7 @@ def update_inputs(selected_model, units_selection, function_selection, chart_sel
             include_tr=True,
             include_air_temp=True,
             is_operative_temperature=False,
+            input_values=input_values,
         )
 
 
@@ -205,13 +311,13 @@ def update_page_from_url(url_search, url_initialized):
     units = url_params.get(ElementsIDs.UNIT_TOGGLE.value)
     function_selection = url_params.get(ElementsIDs.functionality_selection.value)
     chart_selected = url_params.get(ElementsIDs.chart_selected.value)
-    inputs = get_inputs(
-        selected_model, url_params, units, function_selection, type="url"
-    )
+    inputs = get_inputs(selected_model, url_params, units, function_selection)
 
     return (
         selected_model,
-        input_environmental_personal(selected_model, units, function_selection),
+        input_environmental_personal(
+            selected_model, units, function_selection, input_values=inputs
+        ),
         chart_selected,
         function_selection,
         units == UnitSystem.IP.value,
@@ -251,105 +357,121 @@ def update_note_model(selected_model, function_selection, chart_selected):
     )
 
 
-#  double check the calculating method from pythermalcomfort lib, especially the units
-last_valid_annotation = None
-
-
-@callback(
+# the psychrometric readout is computed in the browser (assets/hover_annotation.js)
+# so hovering the chart does not need a round trip to the server
+clientside_callback(
+    ClientsideFunction(namespace="comfort", function_name="update_hover_annotation"),
     Output(ElementsIDs.GRAPH_HOVER.value, "figure"),
     Input(ElementsIDs.GRAPH_HOVER.value, "hoverData"),
     State(ElementsIDs.GRAPH_HOVER.value, "figure"),
     State(MyStores.input_data.value, "data"),
 )
-def update_hover_annotation(hover_data, figure, inputs):
-    # For ensure tdp never shown as nan value
-    global last_valid_annotation
 
-    # import units
-    units = inputs[ElementsIDs.UNIT_TOGGLE.value]
 
-    if not hover_data or "points" not in hover_data or not hover_data["points"]:
-        return figure
-
-    chart_selected = inputs[ElementsIDs.chart_selected.value]
+def get_chart_info(selected_model: str, chart_selected: str):
+    chart: ChartsInfo
+    for chart in Models[selected_model].value.charts:
+        if chart.name == chart_selected:
+            return chart
+    return None
 
-    point = hover_data["points"][0]
-
-    if "x" in point and "y" in point:
-        o_t_db = point["x"]
-        y_value = point["y"]
-        if units == UnitSystem.IP.value:
-            t_db = (o_t_db - 32) / 1.8
-        else:
-            t_db = o_t_db
-        # check if y <= 0
-        if y_value <= 0:
-            if last_valid_annotation is not None and "annotations" in figure["layout"]:
-                figure["layout"]["annotations"][0]["text"] = last_valid_annotation
-            return figure
-
-        if chart_selected in [
-            Charts.t_rh.value.name,
-        ]:
-            rh = y_value
-        elif chart_selected in [
-            Charts.psychrometric.value.name,
-        ]:
-            hr = y_value
-            vp = (hr * 101325) / 1000 / (0.62198 + hr / 1000)
-            rh = (vp / p_sat(t_db)) * 100
-            rh = max(0, min(rh, 100))  # boundary check
-        else:
-            return figure
-
-        # calculations
-        psy_results = psy_ta_rh(t_db, rh)
-        t_wb_value = psy_results.t_wb
-        t_dp_value = psy_results.t_dp
-        wa = psy_results.hr * 1000  # convert to g/kgda
-        h = psy_results.h / 1000  # convert to kj/kg
-
-        # Added unit judgment logic
-        if units == UnitSystem.SI.value:
-            annotation_text = (
-                f"t<sub>db</sub>: {o_t_db:.1f} °C<br>"
-                f"rh: {rh:.1f} %<br>"
-                f"W<sub>a</sub>: {wa:.1f} g<sub>w</sub>/kg<sub>da</sub><br>"
-                f"t<sub>wb</sub>: {t_wb_value:.1f} °C<br>"
-                f"t<sub>dp</sub>: {t_dp_value:.1f} °C<br>"
-                f"h: {h:.1f} kJ/kg<br>"
-            )
-        else:  # IP
-            annotation_text = (
-                f"t<sub>db</sub>: {o_t_db:.1f} °F<br>"
-                f"rh: {rh:.1f} %<br>"
-                f"W<sub>a</sub>: {wa:.1f} lb<sub>w</sub>/klb<sub>da</sub><br>"
-                f"t<sub>wb</sub>: {t_wb_value*1.8+32:.1f} °F<br>"
-                f"t<sub>dp</sub>: {t_dp_value*1.8+32:.1f} °F<br>"
-                f"h: {h / 2.326:.1f} btu/lb<br>"  # kJ/kg to btu/lb
-            )
 
-        if (
-            "annotations" in figure["layout"]
-            and len(figure["layout"]["annotations"]) > 0
-        ):
-            figure["layout"]["annotations"][0]["text"] = annotation_text
-    else:
-        print("Unexpected hover data structure:", point)
-
-    return figure
+def get_chart_markers(
+    inputs: dict, selected_model: str, chart_selected: str, function_selection: str
+):
+    # marker traces and annotation text of the chart rendered by update_chart
+    units: str = inputs[ElementsIDs.UNIT_TOGGLE.value]
+    if chart_selected == Charts.t_rh.value.name:
+        model = "iso" if selected_model == Models.PMV_EN.name else "ashrae"
+        return t_rh_pmv_markers(
+            inputs=inputs,
+            model=model,
+            function_selection=function_selection,
+            units=units,
+        )
+    elif chart_selected == Charts.psychrometric.value.name:
+        return psy_pmv_markers(inputs=inputs, units=units)
+    elif chart_selected == Charts.wind_temp_chart.value.name:
+        return speed_temp_pmv_markers(inputs=inputs)
+    elif chart_selected in [
+        Charts.adaptive_en.value.name,
+        Charts.adaptive_ashrae.value.name,
+    ]:
+        return adaptive_chart_markers(inputs=inputs)
+    return None, None
 
 
 @callback(
     Output(ElementsIDs.CHART_CONTAINER.value, "children"),
+    Output(MyStores.chart_zone.value, "data"),
+    Output(MyStores.chart_request.value, "data"),
     Input(MyStores.input_data.value, "data"),
     Input(ElementsIDs.functionality_selection.value, "value"),
+    State(MyStores.chart_zone.value, "data"),
+)
+def update_chart(inputs: dict, function_selection: str, rendered_zone: dict):
+    selected_model: str = inputs[ElementsIDs.MODEL_SELECTION.value]
+    chart_selected = inputs[ElementsIDs.chart_selected.value]
+    function_selection = inputs[ElementsIDs.functionality_selection.value]
+
+    # the comfort zones only depend on the inputs that are not marker inputs, if
+    # none of them changed only the input markers of the rendered figure are patched
+    chart_info = get_chart_info(selected_model, chart_selected)
+    marker_inputs = chart_info.marker_inputs if chart_info else []
+    zone_inputs = {k: v for k, v in inputs.items() if k not in marker_inputs}
+    if rendered_zone and rendered_zone["inputs"] == zone_inputs:
+        markers, annotation_text = get_chart_markers(
+            inputs, selected_model, chart_selected, function_selection
+        )
+        patched_chart = Patch()
+        # the graph is the first child of the dmc.Stack returned by render_chart
+        figure = patched_chart["props"]["children"][0]["props"]["figure"]
+        for index, marker in zip(rendered_zone["marker_indices"], markers):
+            figure["data"][index] = marker.to_plotly_json()
+        if annotation_text is not None:
+            figure["layout"]["annotations"][0]["text"] = annotation_text
+        return patched_chart, no_update, no_update
+
+    # heavy charts are handed over to update_background_chart, the chart shown
+    # stays until the new one is ready
+    if chart_info and chart_info.background:
+        return no_update, no_update, inputs
+
+    return *render_chart(inputs), no_update
+
+
+@callback(
+    Output(ElementsIDs.CHART_CONTAINER.value, "children", allow_duplicate=True),
+    Output(MyStores.chart_zone.value, "data", allow_duplicate=True),
+    Input(MyStores.chart_request.value, "data"),
+    background=True,
+    interval=BackgroundSettings.poll_interval.value,
+    running=[
+        (
+            Output(ElementsIDs.CHART_PROGRESS.value, "style"),
+            {"display": "block"},
+            {"display": "none"},
+        ),
+    ],
+    # a job still running when the inputs change would overwrite the newer chart
+    cancel=[Input(MyStores.input_data.value, "data")],
+    prevent_initial_call=True,
 )
-def update_chart(inputs: dict, function_selection: str):
+@instrument_background
+def update_background_chart(inputs: dict):
+    return render_chart(inputs)
+
+
+def render_chart(inputs: dict):
+    # full render of the selected chart, returns the children of the chart container
+    # and the comfort zone data used to patch its input markers
     selected_model: str = inputs[ElementsIDs.MODEL_SELECTION.value]
     units: str = inputs[ElementsIDs.UNIT_TOGGLE.value]
     chart_selected = inputs[ElementsIDs.chart_selected.value]
     function_selection = inputs[ElementsIDs.functionality_selection.value]
+    chart_info = get_chart_info(selected_model, chart_selected)
+    marker_inputs = chart_info.marker_inputs if chart_info else []
+    zone_inputs = {k: v for k, v in inputs.items() if k not in marker_inputs}
 
     placeholder = html.Div(
         [
@@ -360,6 +482,7 @@ def update_chart(inputs: dict, function_selection: str):
         ]
     )
     image = go.Figure()
+    graph_id = ElementsIDs.GRAPH_HOVER.value
     if chart_selected == Charts.t_rh.value.name:
         if (
             selected_model == Models.PMV_EN.name
@@ -429,35 +552,67 @@ def update_chart(inputs: dict, function_selection: str):
         ):
             image = psy_pmv(inputs=inputs, model="ISO", units=units)
 
-    note = ""
-    chart: ChartsInfo
-    for chart in Models[selected_model].value.charts:
-        if chart.name == chart_selected:
-            note = chart.note_chart
+    elif chart_selected == Charts.time_series.value.name:
+        if function_selection == Functionalities.Default.value:
+            # the figure is drawn by update_time_series once the graph is mounted
+            graph_id = ElementsIDs.TIME_SERIES_GRAPH.value
+
+    note = chart_info.note_chart if chart_info else ""
+
+    # remember which traces are markers so the next update can patch them
+    marker_indices = [
+        index for index, trace in enumerate(image.data) if trace.meta == INPUT_MARKER
+    ]
+    rendered_zone = (
+        {"inputs": zone_inputs, "marker_indices": marker_indices}
+        if marker_inputs and marker_indices
+        else None
+    )
 
     graph_component = (
         placeholder
-        if not image.data
+        if not image.data and graph_id == ElementsIDs.GRAPH_HOVER.value
         else dcc.Graph(
-            id=ElementsIDs.GRAPH_HOVER.value,
+            id=graph_id,
             figure=image,  # Pass the Plotly figure object here
             config={"displayModeBar": False},
         )
     )
 
-    return dmc.Stack(
-        [
-            graph_component,
-            html.Div(
-                [
-                    dmc.Text("Note: ", size="sm", fw=700, span=True),
-                    dmc.Text(note, size="sm", span=True),
-                ]
-            ),
-        ]
+    return (
+        dmc.Stack(
+            [
+                graph_component,
+                html.Div(
+                    [
+                        dmc.Text("Note: ", size="sm", fw=700, span=True),
+                        dmc.Text(note, size="sm", span=True),
+                    ]
+                ),
+            ]
+        ),
+        rendered_zone,
     )
 
 
+# the points of the time series are downsampled to the range shown, zooming in
+# reads the rows of the range again
+@callback(
+    Output(ElementsIDs.TIME_SERIES_GRAPH.value, "figure"),
+    Input(ElementsIDs.TIME_SERIES_GRAPH.value, "relayoutData"),
+    Input(MyStores.series_dataset.value, "data"),
+    State(MyStores.input_data.value, "data"),
+    prevent_initial_call=False,
+)
+def update_time_series(relayout_data: dict, dataset: str, inputs: dict):
+    x_range = (None, None)
+    if ctx.triggered_id == ElementsIDs.TIME_SERIES_GRAPH.value:
+        x_range = relayout_range(relayout_data)
+        if x_range is None:
+            return no_update
+    return time_series_chart(inputs, dataset, x_range)
+
+
 @callback(
     Output(ElementsIDs.RESULTS_SECTION.value, "children"),
     Input(MyStores.input_data.value, "data"),
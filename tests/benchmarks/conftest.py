@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+
+import pytest
+
+SIZE_BASELINE = Path(__file__).parent / "baseline_sizes.json"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-size-baseline",
+        action="store_true",
+        default=False,
+        help="store the JSON sizes of this run as the new baseline",
+    )
+
+
+class SizeBaseline:
+    # JSON sizes of the figures and results sent to the browser, a benchmark fails
+    # when its payload grows by more than the tolerance over the stored baseline
+    tolerance = 0.05
+
+    def __init__(self, path: Path, update: bool):
+        self.path = path
+        self.update = update
+        self.baseline = json.loads(path.read_text()) if path.exists() else {}
+        self.sizes = {}
+
+    def check(self, name: str, size: int):
+        self.sizes[name] = size
+        expected = self.baseline.get(name)
+        if self.update or expected is None:
+            return
+        assert size <= expected * (
+            1 + self.tolerance
+        ), f"{name} JSON grew from {expected} to {size} bytes"
+
+    def save(self):
+        sizes = dict(sorted({**self.baseline, **self.sizes}.items()))
+        self.path.write_text(json.dumps(sizes, indent=2) + "\n")
+
+
+@pytest.fixture(scope="session")
+def json_sizes(request):
+    sizes = SizeBaseline(
+        SIZE_BASELINE, request.config.getoption("--update-size-baseline")
+    )
+    yield sizes
+    if sizes.update:
+        sizes.save()
@@ -0,0 +1,218 @@
+import pytest
+from plotly.io.json import to_json_plotly
+
+from components.charts import (
+    SET_outputs_chart,
+    adaptive_chart,
+    get_heat_losses,
+    psy_pmv,
+    speed_temp_pmv,
+    t_rh_pmv,
+)
+from components.show_results import display_results
+from utils.comfort_boundaries import boundary_cache
+from utils.comfort_context import context_cache
+from utils.get_inputs import get_inputs
+from utils.my_config_file import (
+    Charts,
+    ElementsIDs,
+    Functionalities,
+    Models,
+    UnitSystem,
+)
+
+# representative conditions entered in the form, in SI units
+INPUT_SETS = {
+    "defaults": {},
+    "elevated_speed": {
+        ElementsIDs.v_input.value: 0.8,
+        ElementsIDs.met_input.value: 1.4,
+        ElementsIDs.clo_input.value: 0.5,
+    },
+    "warm_humid": {
+        ElementsIDs.t_db_input.value: 30,
+        ElementsIDs.t_r_input.value: 32,
+        ElementsIDs.rh_input.value: 75,
+    },
+}
+
+# name of the builder, model, functionality, chart and call of the builder
+CHART_CASES = [
+    (
+        "t_rh_pmv-iso",
+        Models.PMV_EN,
+        Functionalities.Default,
+        Charts.t_rh,
+        lambda inputs, units: t_rh_pmv(
+            inputs=inputs,
+            model="iso",
+            function_selection=Functionalities.Default.value,
+            units=units,
+        ),
+    ),
+    (
+        "t_rh_pmv-ashrae",
+        Models.PMV_ashrae,
+        Functionalities.Default,
+        Charts.t_rh,
+        lambda inputs, units: t_rh_pmv(
+            inputs=inputs,
+            model="ashrae",
+            function_selection=Functionalities.Default.value,
+            units=units,
+        ),
+    ),
+    (
+        "t_rh_pmv-ashrae",
+        Models.PMV_ashrae,
+        Functionalities.Compare,
+        Charts.t_rh,
+        lambda inputs, units: t_rh_pmv(
+            inputs=inputs,
+            model="ashrae",
+            function_selection=Functionalities.Compare.value,
+            units=units,
+        ),
+    ),
+    (
+        "psy_pmv-iso",
+        Models.PMV_EN,
+        Functionalities.Default,
+        Charts.psychrometric,
+        lambda inputs, units: psy_pmv(inputs=inputs, model="ISO", units=units),
+    ),
+    (
+        "psy_pmv-ashrae",
+        Models.PMV_ashrae,
+        Functionalities.Default,
+        Charts.psychrometric,
+        lambda inputs, units: psy_pmv(inputs=inputs, model="ASHRAE", units=units),
+    ),
+    (
+        "speed_temp_pmv",
+        Models.PMV_ashrae,
+        Functionalities.Default,
+        Charts.wind_temp_chart,
+        lambda inputs, units: speed_temp_pmv(
+            inputs=inputs, model="ashrae", units=units
+        ),
+    ),
+    (
+        "get_heat_losses",
+        Models.PMV_ashrae,
+        Functionalities.Default,
+        Charts.thl_psychrometric,
+        lambda inputs, units: get_heat_losses(
+            inputs=inputs, model="ashrae", units=units
+        ),
+    ),
+    (
+        "SET_outputs_chart",
+        Models.PMV_ashrae,
+        Functionalities.Default,
+        Charts.set_outputs,
+        lambda inputs, units: SET_outputs_chart(inputs=inputs, units=units),
+    ),
+    (
+        "adaptive_chart-iso",
+        Models.Adaptive_EN,
+        Functionalities.Default,
+        Charts.adaptive_en,
+        lambda inputs, units: adaptive_chart(inputs=inputs, model="iso", units=units),
+    ),
+    (
+        "adaptive_chart-ashrae",
+        Models.Adaptive_ASHRAE,
+        Functionalities.Default,
+        Charts.adaptive_ashrae,
+        lambda inputs, units: adaptive_chart(
+            inputs=inputs, model="ashrae", units=units
+        ),
+    ),
+]
+
+RESULT_CASES = [
+    (Models.PMV_EN, Functionalities.Default),
+    (Models.PMV_ashrae, Functionalities.Default),
+    (Models.PMV_ashrae, Functionalities.Compare),
+    (Models.Adaptive_EN, Functionalities.Default),
+    (Models.Adaptive_ASHRAE, Functionalities.Default),
+]
+
+UNITS = [UnitSystem.SI.value, UnitSystem.IP.value]
+
+
+def model_inputs(
+    model, functionality, chart_name: str, units: str, input_set: str
+) -> dict:
+    # inputs as they are stored by the page, the form values are entered in SI
+    inputs = get_inputs(
+        model.name,
+        INPUT_SETS[input_set],
+        units,
+        functionality.value,
+        form_units=UnitSystem.SI.value,
+    )
+    inputs[ElementsIDs.UNIT_TOGGLE.value] = units
+    inputs[ElementsIDs.MODEL_SELECTION.value] = model.name
+    inputs[ElementsIDs.chart_selected.value] = chart_name
+    inputs[ElementsIDs.functionality_selection.value] = functionality.value
+    return inputs
+
+
+def clear_caches():
+    # every round computes new inputs, as for a request with changed comfort inputs
+    boundary_cache.clear()
+    context_cache.clear()
+
+
+def run_benchmark(benchmark, json_sizes, name: str, func):
+    result = benchmark.pedantic(
+        func, setup=clear_caches, rounds=10, warmup_rounds=1, iterations=1
+    )
+    size = len(to_json_plotly(result))
+    benchmark.extra_info["json_size"] = size
+    json_sizes.check(name, size)
+
+
+@pytest.mark.parametrize("input_set", INPUT_SETS)
+@pytest.mark.parametrize("units", UNITS)
+@pytest.mark.parametrize(
+    "name, model, functionality, chart, build",
+    CHART_CASES,
+    ids=[f"{case[0]}-{case[2].value}" for case in CHART_CASES],
+)
+def test_chart(
+    benchmark, json_sizes, name, model, functionality, chart, build, units, input_set
+):
+    inputs = model_inputs(model, functionality, chart.value.name, units, input_set)
+    benchmark.group = name
+    run_benchmark(
+        benchmark,
+        json_sizes,
+        f"{name}-{functionality.value}-{units}-{input_set}",
+        lambda: build(inputs, units),
+    )
+
+
+@pytest.mark.parametrize("input_set", INPUT_SETS)
+@pytest.mark.parametrize("units", UNITS)
+@pytest.mark.parametrize(
+    "model, functionality",
+    RESULT_CASES,
+    ids=[
+        f"{model.name}-{functionality.value}" for model, functionality in RESULT_CASES
+    ],
+)
+def test_display_results(benchmark, json_sizes, model, functionality, units, input_set):
+    # the results only depend on the chart when it is the SET one
+    inputs = model_inputs(
+        model, functionality, model.value.charts[0].name, units, input_set
+    )
+    benchmark.group = "display_results"
+    run_benchmark(
+        benchmark,
+        json_sizes,
+        f"display_results-{model.name}-{functionality.value}-{units}-{input_set}",
+        lambda: display_results(inputs),
+    )
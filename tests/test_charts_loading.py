@@ -1,6 +1,11 @@
 import asyncio
 from playwright.async_api import async_playwright
 
+
+def model_input_selector(input_id):
+    # the inputs have pattern-matching ids, rendered as their JSON with sorted keys
+    return f"[id='{{\"id\":\"{input_id}\",\"type\":\"model-input\"}}']"
+
 async def test_unit_conversion():
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=False)
@@ -22,7 +27,7 @@ async def test_unit_conversion():
         # Initial check: Record input values in SI units
         initial_values = {}
         for selector in input_selectors.keys():
-            initial_values[selector] = float(await page.locator(f"#{selector}").input_value())
+            initial_values[selector] = float(await page.locator(model_input_selector(selector)).input_value())
 
         # Click the unit toggle button to switch units from SI to IP
         unit_toggle_selector = "#id-unit-toggle"
@@ -35,7 +40,7 @@ async def test_unit_conversion():
 
         # Check after switching: Record input values in IP units and verify conversion
         for selector, description in input_selectors.items():
-            updated_value = float(await page.locator(f"#{selector}").input_value())
+            updated_value = float(await page.locator(model_input_selector(selector)).input_value())
             initial_value = initial_values[selector]
 
             # Verify if the unit conversion is correct (check based on expected conversion rules)
@@ -1,6 +1,11 @@
 from playwright.sync_api import Playwright, sync_playwright
 
 
+def model_input_selector(input_id):
+    # the inputs have pattern-matching ids, rendered as their JSON with sorted keys
+    return f"[id='{{\"id\":\"{input_id}\",\"type\":\"model-input\"}}']"
+
+
 def test_unit_conversion(playwright: Playwright) -> None:
     browser = playwright.chromium.launch(headless=False)
     context = browser.new_context()
@@ -20,7 +25,7 @@ def test_unit_conversion(playwright: Playwright) -> None:
     # Record values in the initial (SI) units
     initial_values = {}
     for selector in input_selectors.keys():
-        initial_values[selector] = float(page.locator(f"#{selector}").input_value())
+        initial_values[selector] = float(page.locator(model_input_selector(selector)).input_value())
 
     # Click the unit toggle button (switch to IP units)
     unit_toggle_button = page.locator("#id-inputs-form span").nth(1)
@@ -28,12 +33,12 @@ def test_unit_conversion(playwright: Playwright) -> None:
 
     # Click the relevant input fields to ensure unit conversion takes effect
     for selector in input_selectors.keys():
-        page.locator(f"#{selector}").click()
+        page.locator(model_input_selector(selector)).click()
 
     # Validate values after unit conversion
     for selector, (description, conversion_fn) in input_selectors.items():
         # Get the value after conversion
-        updated_value = float(page.locator(f"#{selector}").input_value())
+        updated_value = float(page.locator(model_input_selector(selector)).input_value())
         expected_value = conversion_fn(initial_values[selector])  # Calculate expected value
 
         # Assert the conversion is correct (allowing for some floating-point error)
@@ -47,12 +52,12 @@ def test_unit_conversion(playwright: Playwright) -> None:
 
     # Click the relevant input fields to ensure unit conversion back to SI units takes effect
     for selector in input_selectors.keys():
-        page.locator(f"#{selector}").click()
+        page.locator(model_input_selector(selector)).click()
 
     # Validate values after reverting back to SI units
     for selector, (description, _) in input_selectors.items():
         # Get the value after reverting back to SI units
-        reverted_value = float(page.locator(f"#{selector}").input_value())
+        reverted_value = float(page.locator(model_input_selector(selector)).input_value())
         initial_value = initial_values[selector]  # Original SI unit value
 
         # Assert the reversion is correct
@@ -0,0 +1,87 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from utils.batch_results import batch_inputs, batch_results
+from utils.comfort_context import comfort_context
+from utils.my_config_file import ElementsIDs, Models, UnitSystem
+
+# tdb, tr, v, rh, met and clo of the grid of each unit system, the air speeds
+# above 0.1 m/s give an elevated air speed cooling effect with the ASHRAE model
+GRIDS = {
+    UnitSystem.SI.value: (
+        (18, 25, 31),
+        (20, 29),
+        (0.1, 0.6, 1.2),
+        (30, 70),
+        (1.1, 1.6),
+        (0.5, 1.0),
+    ),
+    UnitSystem.IP.value: (
+        (64, 77, 88),
+        (68, 84),
+        (0.33, 2.0, 3.9),
+        (30, 70),
+        (1.1, 1.6),
+        (0.5, 1.0),
+    ),
+}
+INPUT_IDS = (
+    ElementsIDs.t_db_input.value,
+    ElementsIDs.t_r_input.value,
+    ElementsIDs.v_input.value,
+    ElementsIDs.rh_input.value,
+    ElementsIDs.met_input.value,
+    ElementsIDs.clo_input.value,
+)
+
+
+def grid_conditions(selected_model: str, units: str):
+    # batch results of the grid and the condition of the results panel of each row
+    records = [
+        dict(zip(INPUT_IDS, values)) for values in itertools.product(*GRIDS[units])
+    ]
+    inputs = batch_inputs(selected_model, records, units)
+    results = batch_results(selected_model, inputs, units)
+    conditions = [
+        comfort_context(
+            {
+                **row,
+                ElementsIDs.UNIT_TOGGLE.value: units,
+                ElementsIDs.MODEL_SELECTION.value: selected_model,
+            }
+        ).condition
+        for row in inputs.to_dict("records")
+    ]
+    return results, conditions
+
+
+@pytest.mark.parametrize("units", [UnitSystem.SI.value, UnitSystem.IP.value])
+@pytest.mark.parametrize("selected_model", [Models.PMV_ashrae.name, Models.PMV_EN.name])
+def test_pmv_ppd(selected_model, units):
+    results, conditions = grid_conditions(selected_model, units)
+    np.testing.assert_allclose(
+        results["pmv"], [condition.pmv_ppd["pmv"] for condition in conditions]
+    )
+    np.testing.assert_allclose(
+        results["ppd"], [condition.pmv_ppd["ppd"] for condition in conditions]
+    )
+
+
+@pytest.mark.parametrize("units", [UnitSystem.SI.value, UnitSystem.IP.value])
+def test_set(units):
+    results, conditions = grid_conditions(Models.PMV_ashrae.name, units)
+    np.testing.assert_allclose(
+        results["set"], [condition.set_tmp for condition in conditions]
+    )
+
+
+@pytest.mark.parametrize("units", [UnitSystem.SI.value, UnitSystem.IP.value])
+def test_cooling_effect(units):
+    # in IP units both are the cooling effect in °C times 3.28 / 1.8, as returned by
+    # pythermalcomfort, the batch one is rounded to 2 decimals
+    results, conditions = grid_conditions(Models.PMV_ashrae.name, units)
+    expected = np.array([condition.cooling_effect for condition in conditions])
+    assert (expected > 0).any()
+    np.testing.assert_allclose(results["cooling_effect"], expected, atol=0.011)
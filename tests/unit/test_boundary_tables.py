@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+import utils.comfort_boundaries as comfort_boundaries
+from utils.build_boundary_tables import build_boundary_tables
+from utils.comfort_boundaries import (
+    boundary_cache,
+    pmv_boundaries,
+    pmv_roots,
+    tabulated_boundaries,
+)
+from utils.heat_balance import pmv_ppd_heat_losses
+from utils.my_config_file import BoundaryTableSettings
+
+AXES = {
+    "tr": (24, 26),
+    "vr": (0.1, 0.2),
+    "met": (1.1, 1.2),
+    "clo": (0.5, 0.6),
+    "pmv_limit": (-0.5, 0.5),
+    "rh": (40, 60),
+}
+LIMITS = np.array(AXES["pmv_limit"], dtype=float)
+RH = np.array(AXES["rh"], dtype=float)
+INSIDE = {"tr": 25, "vr": 0.15, "met": 1.15, "clo": 0.55}
+# a quarter of the way between two nodes of t_r, the boundaries are close to linear
+NEAR_NODE = {"tr": 24.5, "vr": 0.1, "met": 1.1, "clo": 0.5}
+
+
+@pytest.fixture
+def table(tmp_path, monkeypatch):
+    # a small table, read instead of the one of the application
+    build_boundary_tables(str(tmp_path), axes=AXES)
+    axes, values = comfort_boundaries.boundary_table.__wrapped__(str(tmp_path))
+    monkeypatch.setattr(comfort_boundaries, "boundary_table", lambda: (axes, values))
+    boundary_cache.clear()
+    yield tmp_path
+    boundary_cache.clear()
+
+
+def exact(tr, vr, met, clo, limits=LIMITS, rh=RH):
+    limits_grid, rh_grid = np.meshgrid(limits, rh, indexing="ij")
+    return pmv_roots(
+        limits_grid.ravel(),
+        low=np.full(limits_grid.size, 10.0),
+        high=np.full(limits_grid.size, 120.0),
+        tr=tr,
+        vr=vr,
+        rh=rh_grid.ravel(),
+        met=met,
+        clo=clo,
+    ).reshape(limits_grid.shape)
+
+
+def test_nodes(table):
+    # at a node of the grid the table value is returned
+    values = np.load(table / "pmv_boundaries.npy")
+    tdb = tabulated_boundaries(LIMITS, RH, tr=24, vr=0.1, met=1.1, clo=0.5)
+    accepted = ~np.isnan(tdb)
+    assert accepted.any()
+    np.testing.assert_allclose(tdb[accepted], values[0, 0, 0, 0][accepted])
+
+
+def test_interpolation(table):
+    # between two nodes the boundaries are interpolated linearly, and the ones
+    # accepted have an unrounded PMV within the tolerance of the limit
+    values = np.load(table / "pmv_boundaries.npy").astype(float)
+    tdb = tabulated_boundaries(LIMITS, RH, **NEAR_NODE)
+    accepted = ~np.isnan(tdb)
+    assert accepted.any()
+    np.testing.assert_allclose(
+        tdb[accepted],
+        (0.75 * values[0, 0, 0, 0] + 0.25 * values[1, 0, 0, 0])[accepted],
+        rtol=1e-6,
+    )
+    limits_grid, rh_grid = np.meshgrid(LIMITS, RH, indexing="ij")
+    pmv = pmv_ppd_heat_losses(
+        tdb[accepted],
+        NEAR_NODE["tr"],
+        NEAR_NODE["vr"],
+        rh_grid[accepted],
+        NEAR_NODE["met"],
+        NEAR_NODE["clo"],
+    )["pmv"]
+    assert np.all(
+        np.abs(pmv - limits_grid[accepted])
+        <= BoundaryTableSettings.pmv_tolerance.value + 1e-9
+    )
+
+
+def test_coarse_interpolation(table):
+    # in the middle of this coarse grid the interpolated boundaries miss their
+    # limits by more than the tolerance, they are solved exactly
+    assert np.isnan(tabulated_boundaries(LIMITS, RH, **INSIDE)).all()
+    np.testing.assert_allclose(
+        pmv_boundaries(LIMITS, RH, **INSIDE), exact(**INSIDE), atol=1e-9
+    )
+
+
+def test_tolerance_rejection(table):
+    # boundaries 0.5 °C off miss their limit by more than the tolerance, they are
+    # rejected and solved exactly
+    values = np.load(table / "pmv_boundaries.npy", mmap_mode="r+")
+    assert not np.isnan(tabulated_boundaries(LIMITS, RH, **NEAR_NODE)).all()
+    values += 0.5
+    values.flush()
+    assert np.isnan(tabulated_boundaries(LIMITS, RH, **NEAR_NODE)).all()
+    np.testing.assert_allclose(
+        pmv_boundaries(LIMITS, RH, **NEAR_NODE), exact(**NEAR_NODE), atol=1e-9
+    )
+
+
+@pytest.mark.parametrize(
+    "inputs, limits, rh",
+    [
+        ({**INSIDE, "tr": 30}, LIMITS, RH),
+        ({**INSIDE, "met": 1.0}, LIMITS, RH),
+        (INSIDE, np.array([-0.7, 0.7]), RH),
+        (INSIDE, LIMITS, np.array([50.0])),
+    ],
+    ids=["tr", "met", "limits", "rh"],
+)
+def test_outside_the_grid(table, inputs, limits, rh):
+    # inputs, limits or rh that the table does not hold are solved exactly
+    assert np.isnan(tabulated_boundaries(limits, rh, **inputs)).all()
+    np.testing.assert_allclose(
+        pmv_boundaries(limits, rh, **inputs),
+        exact(**inputs, limits=limits, rh=rh),
+        atol=1e-9,
+    )
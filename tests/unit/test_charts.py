@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from components.charts import INPUT_MARKER, adaptive_chart, histogram_2d
+from utils.get_inputs import get_inputs
+from utils.my_config_file import (
+    Charts,
+    ElementsIDs,
+    Functionalities,
+    Models,
+    UnitSystem,
+)
+
+X_RANGE, Y_RANGE = (10.0, 36.0), (0.0, 30.0)
+X_BINS, Y_BINS = 104, 100
+
+
+def reference(x, y, x_range=X_RANGE, y_range=Y_RANGE, x_bins=X_BINS, y_bins=Y_BINS):
+    counts, _, _ = np.histogram2d(x, y, bins=(x_bins, y_bins), range=(x_range, y_range))
+    return counts.T
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_histogram_2d_random_points(seed):
+    # points inside and outside the ranges
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(5, 40, 10_000)
+    y = rng.uniform(-2, 32, 10_000)
+    counts = histogram_2d(x, y, X_RANGE, Y_RANGE, X_BINS, Y_BINS)
+    assert counts.shape == (Y_BINS, X_BINS)
+    np.testing.assert_array_equal(counts, reference(x, y))
+
+
+def test_histogram_2d_edges():
+    # every edge of each axis, the upper one belongs to the last bin
+    x_edges = np.linspace(*X_RANGE, X_BINS + 1)
+    y_edges = np.linspace(*Y_RANGE, Y_BINS + 1)
+    x = np.concatenate([x_edges, np.full(y_edges.size, 20.0)])
+    y = np.concatenate([np.full(x_edges.size, 7.0), y_edges])
+    counts = histogram_2d(x, y, X_RANGE, Y_RANGE, X_BINS, Y_BINS)
+    np.testing.assert_array_equal(counts, reference(x, y))
+    # the last bins hold their lower edge and the upper edge
+    assert counts[-1].sum() == 2 and counts[:, -1].sum() == 2
+
+
+def test_histogram_2d_not_finite():
+    x = np.array([np.nan, 15, np.inf, -np.inf, 15])
+    y = np.array([5, np.nan, 5, 5, 5])
+    counts = histogram_2d(x, y, X_RANGE, Y_RANGE, X_BINS, Y_BINS)
+    assert counts.sum() == 1
+    np.testing.assert_array_equal(counts, reference(x, y))
+
+
+ADAPTIVE_CHARTS = [
+    (Models.Adaptive_EN, Charts.adaptive_en, "iso"),
+    (Models.Adaptive_ASHRAE, Charts.adaptive_ashrae, "ashrae"),
+]
+
+
+def adaptive_zones(model, chart_model: str, **values) -> list:
+    # traces of an adaptive chart other than the input marker, at an air speed
+    # whose cooling effect widens the upper limits above 25 °C
+    inputs = get_inputs(
+        model.name,
+        {ElementsIDs.v_input.value: 0.9, **values},
+        UnitSystem.SI.value,
+        Functionalities.Default.value,
+    )
+    figure = adaptive_chart(inputs=inputs, model=chart_model)
+    return [trace for trace in figure.data if trace.meta != INPUT_MARKER]
+
+
+@pytest.mark.parametrize("model, chart, chart_model", ADAPTIVE_CHARTS)
+def test_adaptive_marker_inputs(model, chart, chart_model):
+    # the inputs patched into the marker do not change the comfort bands
+    for input_id in chart.value.marker_inputs:
+        assert adaptive_zones(model, chart_model, **{input_id: 15}) == adaptive_zones(
+            model, chart_model, **{input_id: 25}
+        )
+    # t_db and tr do through the cooling effect, so they rebuild the chart
+    cool, warm = (
+        adaptive_zones(
+            model,
+            chart_model,
+            **{ElementsIDs.t_db_input.value: t, ElementsIDs.t_r_input.value: t},
+        )
+        for t in (22, 28)
+    )
+    assert cool != warm
+    assert ElementsIDs.t_db_input.value not in chart.value.marker_inputs
+    assert ElementsIDs.t_r_input.value not in chart.value.marker_inputs
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+import utils.comfort_context
+from utils.comfort_context import comfort_context, context_cache
+from utils.get_inputs import get_inputs
+from utils.my_config_file import ElementsIDs, Functionalities, Models, UnitSystem
+
+
+@pytest.fixture
+def pmv_ppd_calls(monkeypatch):
+    # counts the pmv_ppd calls of the contexts, slowed down so that the two
+    # callbacks of a change of the store overlap
+    calls = []
+    pmv_ppd = utils.comfort_context.pmv_ppd
+
+    def counted(**kwargs):
+        calls.append(kwargs)
+        time.sleep(0.01)
+        return pmv_ppd(**kwargs)
+
+    monkeypatch.setattr(utils.comfort_context, "pmv_ppd", counted)
+    return calls
+
+
+@pytest.fixture
+def slow_contexts(monkeypatch):
+    # contexts slow to build, so that the two callbacks of a change of the store
+    # would build one each if they were not built under the lock
+    class SlowContext(utils.comfort_context.ComfortContext):
+        def __init__(self, inputs: dict):
+            time.sleep(0.01)
+            super().__init__(inputs)
+
+    monkeypatch.setattr(utils.comfort_context, "ComfortContext", SlowContext)
+
+
+def store_inputs(tdb: float) -> dict:
+    inputs = get_inputs(
+        Models.PMV_ashrae.name,
+        {ElementsIDs.t_db_input.value: tdb},
+        UnitSystem.SI.value,
+        Functionalities.Default.value,
+    )
+    inputs[ElementsIDs.UNIT_TOGGLE.value] = UnitSystem.SI.value
+    inputs[ElementsIDs.MODEL_SELECTION.value] = Models.PMV_ashrae.name
+    return inputs
+
+
+def test_concurrent_callbacks_share_the_context(pmv_ppd_calls, slow_contexts):
+    # update_chart and update_outputs run at the same time on each change of the
+    # store, they get the same context and the PMV is computed once
+    context_cache.clear()
+    for trial in range(20):
+        inputs = store_inputs(20 + trial / 10)
+        barrier = threading.Barrier(2)
+        contexts = [None, None]
+
+        def callback(index):
+            barrier.wait()
+            contexts[index] = comfort_context(inputs)
+            contexts[index].condition.pmv_ppd
+
+        threads = [threading.Thread(target=callback, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert contexts[0] is contexts[1]
+        assert len(pmv_ppd_calls) == trial + 1
@@ -0,0 +1,187 @@
+import io
+
+import flask
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.api import api
+from utils.comfort_hours import (
+    SUMMARY_COLUMNS,
+    comfort_hours,
+    comfort_hours_summary,
+    comfort_hours_totals,
+)
+from utils.my_config_file import ApiSettings, Models
+
+ADAPTIVE_ASHRAE = ["80% Acceptability", "90% Acceptability"]
+# t_rm of 20 °C gives a neutral temperature of 24 °C, with the 80% limits at 20.5 and
+# 27.5 °C and the 90% limits at 21.5 and 26.5 °C, the air speed is 0.1 m/s so there
+# is no cooling effect. The conditions are in comfort, 0.5 and 1.5 °C too warm, 1.5
+# and 2.5 °C too cool, not evaluated and unoccupied
+ADAPTIVE_RECORDS = [
+    {"tdb": 24, "tr": 24, "t_rm": 20, "occupancy": 1},
+    {"tdb": 28, "tr": 28, "t_rm": 20, "occupancy": 1},
+    {"tdb": 19, "tr": 19, "t_rm": 20, "occupancy": 1},
+    {"tdb": "error", "tr": 24, "t_rm": 20, "occupancy": 1},
+    {"tdb": 35, "tr": 35, "t_rm": 20, "occupancy": 0},
+]
+# summary of one hour of each adaptive record
+ADAPTIVE_SUMMARY = {
+    "occupied_hours": [3, 3],
+    "unevaluated_hours": [1, 1],
+    "comfort_hours": [1, 1],
+    "comfort_percentage": [100 / 3, 100 / 3],
+    "exceedance_hours": [2, 2],
+    "warm_hours": [1, 1],
+    "cool_hours": [1, 1],
+    "degree_hours": [2, 4],
+    "warm_degree_hours": [0.5, 1.5],
+    "cool_degree_hours": [1.5, 2.5],
+}
+
+
+def check_summary(summary: pd.DataFrame, expected: dict, scale: float = 1):
+    for column, values in expected.items():
+        if column != "comfort_percentage":
+            values = [value * scale for value in values]
+        assert summary[column].tolist() == pytest.approx(values), column
+
+
+def test_pmv_hours():
+    # in comfort, 0.2 too warm, 0.5 too cool, not evaluated and unoccupied, half an
+    # hour each
+    results = pd.DataFrame({"pmv": [0.0, 0.7, -1.0, np.nan, 0.3]})
+    totals = comfort_hours_totals(
+        Models.PMV_ashrae.name, results, occupied=[1, 1, 1, 1, 0], hours=0.5
+    )
+    summary = comfort_hours_summary(totals)
+    assert summary.index.tolist() == ["PMV ±0.5"]
+    assert summary.columns.tolist() == SUMMARY_COLUMNS
+    check_summary(
+        summary,
+        {
+            "occupied_hours": [1.5],
+            "unevaluated_hours": [0.5],
+            "comfort_hours": [0.5],
+            "comfort_percentage": [100 / 3],
+            "exceedance_hours": [1.0],
+            "warm_hours": [0.5],
+            "cool_hours": [0.5],
+            "degree_hours": [0.35],
+            "warm_degree_hours": [0.1],
+            "cool_degree_hours": [0.25],
+        },
+    )
+
+
+def test_pmv_en_categories():
+    # the hours of each row weigh its degree hours
+    results = pd.DataFrame({"pmv": [0.6, -0.3, 0.1]})
+    summary = comfort_hours_summary(
+        comfort_hours_totals(Models.PMV_EN.name, results, hours=[1, 2, 4])
+    )
+    assert summary.index.tolist() == ["Category III", "Category II", "Category I"]
+    check_summary(
+        summary,
+        {
+            "occupied_hours": [7, 7, 7],
+            "unevaluated_hours": [0, 0, 0],
+            "comfort_hours": [7, 6, 4],
+            "warm_hours": [0, 1, 1],
+            "cool_hours": [0, 0, 2],
+            "warm_degree_hours": [0, 0.1, 0.4],
+            "cool_degree_hours": [0, 0, 0.2],
+        },
+    )
+
+
+def test_unoccupied():
+    summary = comfort_hours_summary(
+        comfort_hours_totals(
+            Models.PMV_ashrae.name, pd.DataFrame({"pmv": [1.0, np.nan]}), [0, 0]
+        )
+    )
+    assert summary["occupied_hours"].tolist() == [0]
+    assert summary["unevaluated_hours"].tolist() == [0]
+    assert np.isnan(summary["comfort_percentage"].iloc[0])
+
+
+@pytest.mark.parametrize("selected_model", [Models.PMV_ashrae.name, Models.PMV_EN.name])
+def test_chunk_accumulation(selected_model):
+    # the totals of the chunks of a file add up to the totals of the whole file
+    rng = np.random.default_rng(0)
+    n = 1000
+    pmv = rng.uniform(-2, 2, n)
+    pmv[rng.random(n) < 0.1] = np.nan
+    results = pd.DataFrame({"pmv": pmv})
+    occupied = rng.random(n) < 0.7
+    hours = rng.uniform(0.5, 2, n)
+    expected = comfort_hours_totals(selected_model, results, occupied, hours)
+    totals = sum(
+        comfort_hours_totals(
+            selected_model, results.iloc[rows], occupied[rows], hours[rows]
+        )
+        for rows in np.array_split(np.arange(n), [1, 250, 600])
+    )
+    pd.testing.assert_frame_equal(totals, expected)
+
+
+def test_adaptive_hours():
+    records = pd.DataFrame(ADAPTIVE_RECORDS)
+    summary = comfort_hours(
+        Models.Adaptive_ASHRAE.name, records, occupied=records["occupancy"], hours=2
+    )
+    assert summary.index.tolist() == ADAPTIVE_ASHRAE
+    check_summary(summary, ADAPTIVE_SUMMARY, scale=2)
+
+
+@pytest.fixture
+def client():
+    app = flask.Flask(__name__)
+    app.register_blueprint(api)
+    return app.test_client()
+
+
+def post_hours(client, records: pd.DataFrame, **form):
+    upload = io.BytesIO(records.to_csv(index=False).encode())
+    return client.post(
+        ApiSettings.url_prefix.value + ApiSettings.hours_route.value,
+        data={
+            "model": Models.Adaptive_ASHRAE.name,
+            "units": "SI",
+            "file": (upload, "hours.csv"),
+            **form,
+        },
+    )
+
+
+def test_hours_file(client):
+    # 500 times the records, read and evaluated in 3 chunks
+    repeats = 500
+    records = pd.DataFrame(ADAPTIVE_RECORDS * repeats)
+    assert len(records) > 2 * ApiSettings.chunk_size.value
+    response = post_hours(client, records, hours="0.5")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["rows"] == len(records)
+    summary = pd.DataFrame(body["categories"]).set_index("category")
+    assert summary.index.tolist() == ADAPTIVE_ASHRAE
+    check_summary(summary, ADAPTIVE_SUMMARY, scale=0.5 * repeats)
+
+
+def test_hours_file_without_occupancy(client):
+    records = pd.DataFrame(ADAPTIVE_RECORDS).drop(columns="occupancy")
+    body = post_hours(client, records).get_json()
+    summary = pd.DataFrame(body["categories"]).set_index("category")
+    # the last record, 7.5 °C above the 80% limit and 8.5 °C above the 90% one, is
+    # counted too
+    assert summary["occupied_hours"].tolist() == [4, 4]
+    assert summary["warm_hours"].tolist() == [2, 2]
+    assert summary["warm_degree_hours"].tolist() == pytest.approx([8, 10])
+
+
+@pytest.mark.parametrize("hours", ["0", "-1", "one"])
+def test_hours_file_invalid_hours(client, hours):
+    response = post_hours(client, pd.DataFrame(ADAPTIVE_RECORDS), hours=hours)
+    assert response.status_code == 400
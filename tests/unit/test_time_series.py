@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from utils.time_series import lttb_indices, min_max_indices
+
+N_OUT = 50
+
+
+def reference_lttb(x, y, n_out):
+    # largest triangle three buckets of Steinarsson's thesis, one point at a time,
+    # the next bucket of the last one is the last point
+    n = len(y)
+    every = (n - 2) / (n_out - 2)
+    indices = [0]
+    for i in range(n_out - 2):
+        low, high = int(i * every) + 1, int((i + 1) * every) + 1
+        next_low = high
+        next_high = min(int((i + 2) * every) + 1, n)
+        mean_x = np.mean(x[next_low:next_high])
+        mean_y = np.mean(y[next_low:next_high])
+        kept = indices[-1]
+        area = [
+            abs(
+                (x[kept] - mean_x) * (y[j] - y[kept])
+                - (x[kept] - x[j]) * (mean_y - y[kept])
+            )
+            for j in range(low, high)
+        ]
+        indices.append(low + int(np.argmax(area)))
+    return np.array(indices + [n - 1])
+
+
+def check_indices(indices, n, n_out):
+    assert len(indices) == n_out
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+
+
+@pytest.mark.parametrize("n", [N_OUT + 1, 137, 1000, 10_007])
+@pytest.mark.parametrize("seed", range(3))
+def test_lttb_reference(n, seed):
+    rng = np.random.default_rng(seed)
+    x = np.sort(rng.uniform(0, 1e6, n))
+    y = np.cumsum(rng.normal(size=n))
+    indices = lttb_indices(x, y, N_OUT)
+    check_indices(indices, n, N_OUT)
+    np.testing.assert_array_equal(indices, reference_lttb(x, y, N_OUT))
+
+
+def test_lttb_last_bucket():
+    # the point kept from the last bucket, 3 to 5, forms the largest triangle with
+    # the point kept before, 2, and the last point, rather than with the mean of
+    # the last bucket, which would keep 3
+    x = np.arange(7.0)
+    y = np.array([0, 0, 0, 4, 0, 2, 10])
+    np.testing.assert_array_equal(lttb_indices(x, y, 4), [0, 2, 5, 6])
+    np.testing.assert_array_equal(lttb_indices(x, y, 4), reference_lttb(x, y, 4))
+
+
+def test_lttb_nan_buckets():
+    # the buckets with finite values keep one of them, even next to a bucket, or a
+    # last point, without any
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=1000)
+    y[100:300] = np.nan
+    y[rng.random(1000) < 0.2] = np.nan
+    y[-1] = np.nan
+    indices = lttb_indices(np.arange(1000), y, N_OUT)
+    check_indices(indices, 1000, N_OUT)
+    for index in indices[1:-1]:
+        assert np.isfinite(y[index]) or 100 <= index < 300
+
+
+@pytest.mark.parametrize("n", [N_OUT + 1, 137, 1000, 10_007])
+@pytest.mark.parametrize("n_out", [N_OUT, N_OUT + 1])
+def test_min_max(n, n_out):
+    rng = np.random.default_rng(n)
+    y = rng.normal(size=n)
+    indices = min_max_indices(y, n_out)
+    check_indices(indices, n, n_out)
+    assert y.argmin() in indices and y.argmax() in indices
+
+
+@pytest.mark.parametrize(
+    "y",
+    [np.ones(1000), np.full(1000, np.nan), np.tile([np.nan, 1.0, np.nan], 333)],
+    ids=["constant", "nan", "sparse"],
+)
+def test_min_max_repeated_values(y):
+    # buckets whose lowest and highest points are the same still keep two points
+    check_indices(min_max_indices(y, N_OUT), len(y), N_OUT)
+
+
+def test_min_max_nan_buckets():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=1000)
+    y[100:300] = np.nan
+    indices = min_max_indices(y, N_OUT)
+    check_indices(indices, 1000, N_OUT)
+    assert np.nanargmin(y) in indices and np.nanargmax(y) in indices
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, N_OUT - 1, N_OUT])
+def test_short_series(n):
+    y = np.arange(n, dtype=float)
+    np.testing.assert_array_equal(lttb_indices(y, y, N_OUT), np.arange(n))
+    np.testing.assert_array_equal(min_max_indices(y, N_OUT), np.arange(n))
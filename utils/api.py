@@ -0,0 +1,268 @@
+import io
+import itertools
+import json
+from pathlib import Path
+
+import flask
+import numpy as np
+import pandas as pd
+import pyarrow
+import pyarrow.parquet as pq
+from werkzeug.utils import secure_filename
+
+from utils.batch_results import batch_inputs, batch_results, batch_results_chunks
+from utils.comfort_hours import (
+    comfort_hours_summary,
+    comfort_hours_totals,
+    occupied_rows,
+)
+from utils.my_config_file import ApiSettings, Models, UnitSystem
+from utils.time_series import write_series
+
+NDJSON = "application/x-ndjson"
+
+api = flask.Blueprint("api", __name__, url_prefix=ApiSettings.url_prefix.value)
+
+
+def error(message: str, status: int = 400):
+    return flask.jsonify({"error": message}), status
+
+
+def selection_error(selected_model: str, units: str):
+    if selected_model not in Models.__members__:
+        return f"model must be one of {', '.join(Models.__members__)}"
+    if units not in (UnitSystem.SI.value, UnitSystem.IP.value):
+        return f"units must be {UnitSystem.SI.value} or {UnitSystem.IP.value}"
+    return None
+
+
+def ndjson_records(stream, errors: list):
+    # records of a newline-delimited JSON body, read one line at a time, the input
+    # stream of the request is not buffered and would be read byte by byte. The
+    # records stop at the first invalid line, whose error is added to errors
+    for line_number, line in enumerate(io.BufferedReader(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict):
+            errors.append(f"line {line_number} is not a JSON object")
+            return
+        yield record
+
+
+def stream_results(selected_model: str, records, units: str, errors: list):
+    for results in batch_results_chunks(selected_model, records, units):
+        yield results.to_json(orient="records", lines=True)
+    # the results of the records before an invalid one are sent before its error
+    for message in errors:
+        yield json.dumps({"error": message}) + "\n"
+
+
+def file_chunks(upload, suffix: str, chunk_size: int = ApiSettings.chunk_size.value):
+    # the uploaded file is spooled to disk by werkzeug and read one chunk of rows
+    # at a time
+    with upload.stream:
+        if suffix == ".csv":
+            yield from pd.read_csv(upload.stream, chunksize=chunk_size)
+        else:
+            with pq.ParquetFile(upload.stream) as parquet:
+                for batch in parquet.iter_batches(batch_size=chunk_size):
+                    yield batch.to_pandas()
+
+
+def stream_csv(selected_model: str, chunks, units: str, defaults: dict):
+    # the columns of the file followed by the results of each row
+    header = True
+    for chunk in chunks:
+        results = batch_results(
+            selected_model, batch_inputs(selected_model, chunk, units, defaults), units
+        )
+        yield pd.concat([chunk, results], axis=1).to_csv(index=False, header=header)
+        header = False
+
+
+@api.route(ApiSettings.comfort_route.value, methods=["POST"])
+def comfort():
+    """Evaluate the model on a batch of input records.
+
+    The records are JSON objects keyed by the ids of the inputs of the model, or
+    their ElementsIDs names, e.g. ``{"t_db_input": 25, "rh_input": 50}``. They are
+    sent either as a JSON body ``{"model": ..., "units": ..., "records": [...]}``
+    or as a newline-delimited JSON body with the model and units in the query
+    string. The results are streamed back as newline-delimited JSON, one line per
+    record and in the same order.
+    """
+    request = flask.request
+    errors = []
+    if request.mimetype == NDJSON:
+        selected_model = request.args.get("model")
+        units = request.args.get("units", UnitSystem.SI.value)
+        records = ndjson_records(request.stream, errors)
+    else:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return error(f"the body must be a JSON object or {NDJSON}")
+        selected_model = body.get("model")
+        units = body.get("units", UnitSystem.SI.value)
+        records = body.get("records")
+        if not isinstance(records, list) or not all(
+            isinstance(record, dict) for record in records
+        ):
+            return error("records must be a list of JSON objects")
+        if len(records) > ApiSettings.max_records.value:
+            return error(
+                f"at most {ApiSettings.max_records.value} records can be sent as "
+                f"JSON, send larger batches as {NDJSON}",
+                413,
+            )
+
+    message = selection_error(selected_model, units)
+    if message:
+        return error(message)
+
+    return flask.Response(
+        flask.stream_with_context(
+            stream_results(selected_model, records, units, errors)
+        ),
+        mimetype=NDJSON,
+    )
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def read_upload():
+    """Parse the multipart form of an uploaded file.
+
+    Returns the model, the units, the defaults of the inputs, the upload and the
+    chunks of the file, whose first chunk is read already so that files that
+    cannot be parsed are reported before the response starts.
+    """
+    form = flask.request.form
+    selected_model = form.get("model")
+    units = form.get("units", UnitSystem.SI.value)
+    message = selection_error(selected_model, units)
+    if message:
+        raise UploadError(message)
+    try:
+        defaults = json.loads(form.get("inputs") or "{}")
+    except ValueError:
+        defaults = None
+    if not isinstance(defaults, dict):
+        raise UploadError("inputs must be a JSON object")
+
+    upload = flask.request.files.get("file")
+    if upload is None or not upload.filename:
+        raise UploadError("a CSV or Parquet file must be sent in the file field")
+    suffix = Path(upload.filename).suffix.lower()
+    if suffix not in ApiSettings.file_types.value:
+        raise UploadError(
+            f"the file must be one of {', '.join(ApiSettings.file_types.value)}", 415
+        )
+
+    chunks = file_chunks(upload, suffix)
+    try:
+        first = next(chunks, None)
+    except (ValueError, UnicodeDecodeError, pyarrow.ArrowException) as e:
+        raise UploadError(f"the file could not be read: {e}")
+    if first is None:
+        raise UploadError("the file has no rows")
+    return (
+        selected_model,
+        units,
+        defaults,
+        upload,
+        itertools.chain([first], chunks),
+    )
+
+
+@api.errorhandler(UploadError)
+def upload_error(e: UploadError):
+    return error(str(e), e.status)
+
+
+@api.route(ApiSettings.file_route.value, methods=["POST"])
+def comfort_file():
+    """Evaluate the model on every row of an uploaded CSV or Parquet file.
+
+    The multipart form holds the file, the model, the units and optionally the
+    inputs of the form as JSON, whose values replace the defaults of the inputs
+    missing from the file. The columns of the file are named as the records of
+    comfort and the rows are returned as a CSV file with the results appended.
+    """
+    selected_model, units, defaults, upload, chunks = read_upload()
+    filename = secure_filename(f"{Path(upload.filename).stem}_{selected_model}.csv")
+    return flask.Response(
+        flask.stream_with_context(stream_csv(selected_model, chunks, units, defaults)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@api.route(ApiSettings.series_route.value, methods=["POST"])
+def comfort_series():
+    """Evaluate the model on every row of an uploaded file for the time series chart.
+
+    The form is the same as the one of comfort_file. The results are kept on the
+    server for an hour and the response describes them, its dataset is the value
+    of the store of the time series chart.
+    """
+    selected_model, units, defaults, upload, chunks = read_upload()
+    try:
+        with upload.stream:
+            meta = write_series(selected_model, chunks, units, defaults)
+    except (ValueError, UnicodeDecodeError, pyarrow.ArrowException) as e:
+        return error(f"the file could not be read: {e}")
+    meta["filename"] = upload.filename
+    return flask.jsonify(meta)
+
+
+@api.route(ApiSettings.hours_route.value, methods=["POST"])
+def comfort_hours_file():
+    """Hours in comfort of the rows of an uploaded CSV or Parquet file.
+
+    The form is the same as the one of comfort_file with an optional hours field,
+    the duration of each row, 1 by default. The rows flagged by an occupancy or
+    occupied column are counted, all of them if the file has neither. The response
+    has one entry per comfort category of the model, see comfort_hours.
+    """
+    try:
+        hours = float(flask.request.form.get("hours", 1))
+    except ValueError:
+        hours = np.nan
+    if not hours > 0:
+        return error("hours must be a positive number")
+    selected_model, units, defaults, upload, chunks = read_upload()
+
+    totals, rows = None, 0
+    try:
+        with upload.stream:
+            for chunk in chunks:
+                results = batch_results(
+                    selected_model,
+                    batch_inputs(selected_model, chunk, units, defaults),
+                    units,
+                )
+                chunk_totals = comfort_hours_totals(
+                    selected_model, results, occupied_rows(chunk), hours
+                )
+                totals = chunk_totals if totals is None else totals + chunk_totals
+                rows += len(chunk)
+    except (ValueError, UnicodeDecodeError, pyarrow.ArrowException) as e:
+        return error(f"the file could not be read: {e}")
+
+    summary = comfort_hours_summary(totals).reset_index()
+    return flask.jsonify(
+        {
+            "model": selected_model,
+            "units": units,
+            "rows": rows,
+            "categories": json.loads(summary.to_json(orient="records")),
+        }
+    )
@@ -0,0 +1,245 @@
+import functools
+import itertools
+
+import numpy as np
+import pandas as pd
+from pythermalcomfort.models import adaptive_ashrae, adaptive_en, pmv_ppd, set_tmp
+from pythermalcomfort.psychrometrics import t_o
+from pythermalcomfort.utilities import (
+    check_standard_compliance_array,
+    clo_dynamic,
+    mapping,
+    units_converter,
+    v_relative,
+)
+
+from utils.comfort_boundaries import batch_cooling_effect
+from utils.get_inputs import default_model_inputs, extract_float
+from utils.my_config_file import (
+    ApiSettings,
+    ComfortLevel,
+    ElementsIDs,
+    Models,
+    UnitSystem,
+    PMV_SENSATIONS,
+    PMV_EN_CATEGORIES,
+)
+
+# names of the columns of the records of each input besides its id, the ElementsIDs
+# name and the usual short names of the sensor data
+INPUT_ALIASES = {
+    ElementsIDs.t_db_input.value: ("t_db_input", "tdb", "t_db"),
+    ElementsIDs.t_r_input.value: ("t_r_input", "tr", "t_r"),
+    ElementsIDs.t_rm_input.value: ("t_rm_input", "t_running_mean", "trm", "t_rm"),
+    ElementsIDs.v_input.value: ("v_input", "v"),
+    ElementsIDs.rh_input.value: ("rh_input", "rh"),
+    ElementsIDs.met_input.value: ("met_input", "met"),
+    ElementsIDs.clo_input.value: ("clo_input", "clo"),
+}
+
+
+def batch_inputs(
+    selected_model: str, records, units: str, defaults: dict = None
+) -> pd.DataFrame:
+    # one column per input of the model, missing values take the value in defaults or
+    # the default of the input and the others are clipped to its range as in
+    # get_inputs, values that are not numbers are kept as NaN and give empty results
+    frame = (
+        records
+        if isinstance(records, pd.DataFrame)
+        else pd.DataFrame.from_records(records)
+    )
+    defaults = defaults or {}
+    inputs = {}
+    for model_input in default_model_inputs(selected_model, units):
+        default = extract_float(defaults.get(model_input.id))
+        if default is None:
+            default = model_input.value
+        column = None
+        for name in (model_input.id, *INPUT_ALIASES.get(model_input.id, ())):
+            if name in frame:
+                column = (
+                    frame[name] if column is None else column.combine_first(frame[name])
+                )
+        if column is None:
+            inputs[model_input.id] = np.full(len(frame), default)
+            continue
+        values = pd.to_numeric(column, errors="coerce").where(column.notna(), default)
+        inputs[model_input.id] = np.clip(
+            values.to_numpy(dtype=float), model_input.min, model_input.max
+        )
+    return pd.DataFrame(inputs, index=frame.index)
+
+
+def nullable(flags, missing) -> pd.array:
+    return pd.array(np.where(missing, None, flags), dtype="boolean")
+
+
+def labels(values, missing) -> np.ndarray:
+    values = np.asarray(values, dtype=object)
+    values[missing] = None
+    return values
+
+
+def comfort_levels(t_op, low, up) -> np.ndarray:
+    levels = np.where(
+        t_op > up,
+        ComfortLevel.TOO_WARM.description,
+        np.where(
+            t_op < low,
+            ComfortLevel.TOO_COOL.description,
+            ComfortLevel.COMFORTABLE.description,
+        ),
+    )
+    return labels(levels, np.isnan(t_op) | np.isnan(low) | np.isnan(up))
+
+
+def pmv_results(inputs: pd.DataFrame, units: str, standard: str) -> pd.DataFrame:
+    tdb, tr, v, rh, met, clo = (
+        inputs[input_id.value].to_numpy()
+        for input_id in (
+            ElementsIDs.t_db_input,
+            ElementsIDs.t_r_input,
+            ElementsIDs.v_input,
+            ElementsIDs.rh_input,
+            ElementsIDs.met_input,
+            ElementsIDs.clo_input,
+        )
+    )
+    vr = v_relative(v=v, met=met)
+    clo_d = clo_dynamic(clo=clo, met=met)
+
+    if standard == "ashrae":
+        # same model as pmv_ppd with the elevated air speed correction of a single
+        # batched cooling effect solve, see batch_pmv
+        tdb_si, tr_si, vr_si = tdb, tr, vr
+        if units == UnitSystem.IP.value:
+            tdb_si, tr_si, vr_si = units_converter(tdb=tdb, tr=tr, v=vr)
+        ce = batch_cooling_effect(tdb_si, tr_si, vr_si, rh, met, clo_d)
+        r_pmv = pmv_ppd(
+            tdb_si - ce,
+            tr_si - ce,
+            vr=np.where(ce > 0, 0.1, vr_si),
+            rh=rh,
+            met=met,
+            clo=clo_d,
+            standard="ISO",
+            limit_inputs=False,
+        )
+        valid = ~np.isnan(
+            check_standard_compliance_array(
+                "ashrae", tdb=tdb_si, tr=tr_si, v=vr_si, met=met, clo=clo_d
+            )
+        ).any(axis=0)
+        valid &= np.abs(r_pmv["pmv"]) <= 100
+        pmv = np.where(valid, r_pmv["pmv"], np.nan)
+        ppd = np.where(valid, r_pmv["ppd"], np.nan)
+    else:
+        r_pmv = pmv_ppd(
+            tdb, tr, vr=vr, rh=rh, met=met, clo=clo_d, units=units, standard="ISO"
+        )
+        pmv, ppd = r_pmv["pmv"], r_pmv["ppd"]
+
+    missing = np.isnan(pmv)
+    if standard == "ashrae":
+        if units == UnitSystem.IP.value:
+            ce = ce / 1.8 * 3.28
+        return pd.DataFrame(
+            {
+                "pmv": pmv,
+                "ppd": ppd,
+                "set": set_tmp(tdb, tr, v=vr, rh=rh, met=met, clo=clo_d, units=units),
+                "cooling_effect": np.round(ce, 2),
+                "sensation": labels(mapping(pmv, PMV_SENSATIONS), missing),
+                "compliance": nullable(np.abs(pmv) <= 0.5, missing),
+            },
+            index=inputs.index,
+        )
+    return pd.DataFrame(
+        {
+            "pmv": pmv,
+            "ppd": ppd,
+            "category": labels(mapping(np.abs(pmv), PMV_EN_CATEGORIES), missing),
+            "compliance": nullable(np.abs(pmv) <= 0.7, missing),
+        },
+        index=inputs.index,
+    )
+
+
+def adaptive_inputs(inputs: pd.DataFrame) -> dict:
+    return {
+        "tdb": inputs[ElementsIDs.t_db_input.value].to_numpy(),
+        "tr": inputs[ElementsIDs.t_r_input.value].to_numpy(),
+        "t_running_mean": inputs[ElementsIDs.t_rm_input.value].to_numpy(),
+        "v": inputs[ElementsIDs.v_input.value].to_numpy(),
+    }
+
+
+def adaptive_en_results(inputs: pd.DataFrame, units: str) -> pd.DataFrame:
+    model_inputs = adaptive_inputs(inputs)
+    result = adaptive_en(**model_inputs, units=units)
+    t_op = t_o(tdb=model_inputs["tdb"], tr=model_inputs["tr"], v=model_inputs["v"])
+    results = {"t_op": np.round(t_op, 1), "tmp_cmf": result["tmp_cmf"]}
+    for category in ("iii", "ii", "i"):
+        low = result[f"tmp_cmf_cat_{category}_low"]
+        up = result[f"tmp_cmf_cat_{category}_up"]
+        results[f"tmp_cmf_cat_{category}_low"] = low
+        results[f"tmp_cmf_cat_{category}_up"] = up
+        results[f"class_{category}"] = comfort_levels(t_op, low, up)
+    low, up = result["tmp_cmf_cat_iii_low"], result["tmp_cmf_cat_iii_up"]
+    results["compliance"] = nullable(
+        (low <= t_op) & (t_op <= up), np.isnan(t_op) | np.isnan(low) | np.isnan(up)
+    )
+    return pd.DataFrame(results, index=inputs.index)
+
+
+def adaptive_ashrae_results(inputs: pd.DataFrame, units: str) -> pd.DataFrame:
+    model_inputs = adaptive_inputs(inputs)
+    result = adaptive_ashrae(**model_inputs, units=units)
+    t_op = t_o(tdb=model_inputs["tdb"], tr=model_inputs["tr"], v=model_inputs["v"])
+    results = {"t_op": np.round(t_op, 1), "tmp_cmf": result.tmp_cmf}
+    for acceptability in ("80", "90"):
+        low = result[f"tmp_cmf_{acceptability}_low"]
+        up = result[f"tmp_cmf_{acceptability}_up"]
+        results[f"tmp_cmf_{acceptability}_low"] = np.round(low, 1)
+        results[f"tmp_cmf_{acceptability}_up"] = np.round(up, 1)
+        results[f"acceptability_{acceptability}"] = comfort_levels(t_op, low, up)
+    low, up = result.tmp_cmf_80_low, result.tmp_cmf_80_up
+    results["compliance"] = nullable(
+        (low <= t_op) & (t_op <= up), np.isnan(t_op) | np.isnan(low) | np.isnan(up)
+    )
+    return pd.DataFrame(results, index=inputs.index)
+
+
+def batch_results(
+    selected_model: str, inputs: pd.DataFrame, units: str
+) -> pd.DataFrame:
+    # results of display_results for every row of inputs, in the units of the inputs,
+    # the iterative models do not converge for missing values so only the complete
+    # rows are evaluated and the others get empty results
+    if selected_model == Models.PMV_ashrae.name:
+        results = functools.partial(pmv_results, standard="ashrae")
+    elif selected_model == Models.PMV_EN.name:
+        results = functools.partial(pmv_results, standard="ISO")
+    elif selected_model == Models.Adaptive_EN.name:
+        results = adaptive_en_results
+    elif selected_model == Models.Adaptive_ASHRAE.name:
+        results = adaptive_ashrae_results
+    else:
+        raise ValueError(f"Unknown model: {selected_model}")
+    return results(inputs[inputs.notna().all(axis=1)], units).reindex(inputs.index)
+
+
+def batch_results_chunks(
+    selected_model: str,
+    records,
+    units: str,
+    chunk_size: int = ApiSettings.chunk_size.value,
+):
+    # the records are consumed lazily, only one chunk of them and of their results
+    # is held in memory at a time
+    records = iter(records)
+    while chunk := list(itertools.islice(records, chunk_size)):
+        yield batch_results(
+            selected_model, batch_inputs(selected_model, chunk, units), units
+        )
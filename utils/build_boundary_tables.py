@@ -0,0 +1,80 @@
+"""Precompute the PMV comfort-zone boundaries used by the charts.
+
+The boundaries are solved on the grid of BoundaryTableSettings and stored next to
+the application as a memory-mappable NumPy array, run it from the repository root
+while building the image with ``python -m utils.build_boundary_tables``.
+"""
+
+import argparse
+
+import numpy as np
+
+from utils.comfort_boundaries import (
+    BOUNDARY_TABLE_AXES,
+    boundary_table_path,
+    pmv_roots,
+)
+from utils.executor import map_chunks
+from utils.my_config_file import BoundaryTableSettings
+
+
+def build_boundary_tables(
+    directory: str = BoundaryTableSettings.directory.value, axes: dict = None
+):
+    # axes maps each of BOUNDARY_TABLE_AXES to its values, the grid of
+    # BoundaryTableSettings by default
+    axes = axes or {
+        "tr": BoundaryTableSettings.tr_values.value,
+        "vr": BoundaryTableSettings.vr_values.value,
+        "met": BoundaryTableSettings.met_values.value,
+        "clo": BoundaryTableSettings.clo_values.value,
+        "pmv_limit": BoundaryTableSettings.pmv_limits.value,
+        "rh": BoundaryTableSettings.rh_values.value,
+    }
+    axes = {name: np.asarray(axes[name], dtype=float) for name in BOUNDARY_TABLE_AXES}
+    path = boundary_table_path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    # the axes are written last, a table without them is never loaded
+    (path / "pmv_boundaries_axes.npz").unlink(missing_ok=True)
+
+    values = np.lib.format.open_memmap(
+        path / "pmv_boundaries.npy",
+        mode="w+",
+        dtype=np.float32,
+        shape=tuple(axis.size for axis in axes.values()),
+    )
+    # one slice per met and clo pair keeps the memory bounded, all the other points
+    # of the slice are solved at once
+    tr, vr, limits, rh = np.meshgrid(
+        axes["tr"], axes["vr"], axes["pmv_limit"], axes["rh"], indexing="ij"
+    )
+    for i, met in enumerate(axes["met"]):
+        for j, clo in enumerate(axes["clo"]):
+            tdb = map_chunks(
+                pmv_roots,
+                split={
+                    "targets": limits.ravel(),
+                    "tr": tr.ravel(),
+                    "vr": vr.ravel(),
+                    "rh": rh.ravel(),
+                    "low": np.full(limits.size, -20, dtype=float),
+                    "high": np.full(limits.size, 120, dtype=float),
+                },
+                met=met,
+                clo=clo,
+            )
+            values[:, :, i, j] = tdb.reshape(limits.shape)
+    values.flush()
+    np.savez(path / "pmv_boundaries_axes.npz", **axes)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--directory",
+        default=BoundaryTableSettings.directory.value,
+        help="output directory, relative to the repository root",
+    )
+    path = build_boundary_tables(parser.parse_args().directory)
+    print(f"boundary tables written to {path}")
@@ -0,0 +1,574 @@
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import diskcache
+import numpy as np
+from pythermalcomfort.models import pmv, set_tmp
+from pythermalcomfort.utilities import units_converter
+
+from utils.executor import map_chunks
+from utils.heat_balance import pmv_ppd_heat_losses
+from utils.my_config_file import (
+    UnitSystem,
+    BackgroundSettings,
+    CacheSettings,
+    BoundaryTableSettings,
+)
+
+
+def background_cache_path(directory: str = BackgroundSettings.cache_directory.value):
+    return Path(__file__).resolve().parent.parent / directory
+
+
+class BoundaryCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds.
+
+    The entries of a cache with a name are also kept in the diskcache of the
+    background callbacks, under that name, so the jobs of the background callbacks,
+    which run in short-lived processes, reuse the values computed by the server and
+    by the previous jobs instead of starting from an empty cache.
+    """
+
+    def __init__(self, max_size: int, ttl: float, name: str = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+
+    @property
+    def disk(self) -> diskcache.Cache:
+        # opened again in the processes forked from the one that opened it
+        if self._disk is None or self._disk[0] != os.getpid():
+            self._disk = (os.getpid(), diskcache.Cache(str(background_cache_path())))
+        return self._disk[1]
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        if self.name is None:
+            value = compute()
+        else:
+            disk_key = (self.name, key)
+            value = self.disk.get(disk_key)
+            if value is None:
+                value = compute()
+                self.disk.set(disk_key, value, expire=self.ttl, tag=self.name)
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+
+        with self._lock:
+            self._entries[key] = (now, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.name is not None:
+            self.disk.evict(self.name)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+boundary_cache = BoundaryCache(
+    max_size=CacheSettings.boundaries_max_size.value,
+    ttl=CacheSettings.boundaries_ttl_seconds.value,
+    name="boundaries",
+)
+
+
+def _quantize(value, decimals: int = CacheSettings.boundaries_decimals.value):
+    if isinstance(value, (np.ndarray, list, tuple)):
+        return tuple(_quantize(item, decimals) for item in np.asarray(value).ravel())
+    if isinstance(value, (float, int, np.number)) and not isinstance(value, bool):
+        return round(float(value), decimals)
+    return value
+
+
+def memoize_boundaries(func):
+    # the boundaries only depend on the inputs that shape the comfort zone, so they
+    # are cached on quantized arguments and reused while only t_db or rh change
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (func.__name__,) + tuple(
+            (name, _quantize(value)) for name, value in bound.arguments.items()
+        )
+        return boundary_cache.get_or_compute(key, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+def batch_cooling_effect(tdb, tr, vr, rh, met, clo, wme=0, xtol: float = 1e-6):
+    # ASHRAE 55 cooling effect in SI units for all the elements at once, it solves
+    # the same SET equality as pythermalcomfort's cooling_effect over [0, 40] °C and
+    # like it returns 0 for still air or when no cooling effect can be found
+    tdb, tr, vr, rh, met, clo, wme = np.broadcast_arrays(
+        *[np.asarray(x, dtype=float) for x in (tdb, tr, vr, rh, met, clo, wme)]
+    )
+    shape = tdb.shape
+    tdb, tr, vr, rh, met, clo, wme = [
+        x.ravel() for x in (tdb, tr, vr, rh, met, clo, wme)
+    ]
+    ce = np.zeros(tdb.size)
+    moving = np.flatnonzero(vr > 0.1)
+    if moving.size == 0:
+        return ce.reshape(shape)
+
+    def still_air_set(x, idx):
+        return set_tmp(
+            tdb[idx] - x,
+            tr[idx] - x,
+            v=0.1,
+            rh=rh[idx],
+            met=met[idx],
+            clo=clo[idx],
+            wme=wme[idx],
+            round=False,
+            calculate_ce=True,
+            limit_inputs=False,
+        )
+
+    initial_set = set_tmp(
+        tdb[moving],
+        tr[moving],
+        v=vr[moving],
+        rh=rh[moving],
+        met=met[moving],
+        clo=clo[moving],
+        wme=wme[moving],
+        round=False,
+        calculate_ce=True,
+        limit_inputs=False,
+    )
+    roots = bracketed_roots(
+        lambda x, idx: still_air_set(x, moving[idx]) - initial_set[idx],
+        np.zeros(moving.size),
+        np.full(moving.size, 40.0),
+        xtol=xtol,
+    )
+    ce[moving] = np.nan_to_num(roots, nan=0.0)
+    return np.round(ce, 2).reshape(shape)
+
+
+def batch_pmv(tdb, tr, vr, rh, met, clo, wme=0, standard="ISO", units="SI"):
+    # pmv() applies the ASHRAE elevated air speed correction one element at a time
+    # and through np.vectorize, which takes its output dtype from the first element.
+    # cooling_effect returns an int 0 for still air or when it fails, which truncates
+    # the cooling effect of every other element in a batch, so the correction is
+    # applied here with a single batched cooling effect solve instead
+    if standard.lower() == "ashrae":
+        tdb, tr, vr = np.asarray(tdb), np.asarray(tr), np.asarray(vr)
+        if units == UnitSystem.IP.value:
+            tdb, tr, vr = units_converter(tdb=tdb, tr=tr, v=vr)
+            units = UnitSystem.SI.value
+        ce = batch_cooling_effect(tdb, tr, vr, rh, met, clo, wme)
+        tdb, tr, vr = tdb - ce, tr - ce, np.where(ce > 0, 0.1, vr)
+
+    return pmv(
+        tdb,
+        tr=tr,
+        vr=vr,
+        rh=rh,
+        met=met,
+        clo=clo,
+        wme=wme,
+        standard="ISO",
+        units=units,
+        limit_inputs=False,
+    )
+
+
+def bracketed_roots(
+    func, low, high, xtol: float = 1e-3, ftol: float = 0, max_iter: int = 100
+):
+    """Vectorised Illinois (modified regula falsi) root finder.
+
+    ``func(x, idx)`` is evaluated on the abscissae ``x`` of the elements ``idx``
+    that are still being solved and must return an array of the same length.
+    An element is converged once its bracket is narrower than ``xtol`` or its
+    residual is within ``ftol``. Elements whose bracket ``[low, high]`` does not
+    contain a sign change are returned as NaN, which mirrors the ValueError
+    raised by ``optimize.brentq``.
+    """
+    a = np.array(low, dtype=float)
+    b = np.array(high, dtype=float)
+    n = a.size
+    all_idx = np.arange(n)
+    fa = np.asarray(func(a, all_idx), dtype=float)
+    fb = np.asarray(func(b, all_idx), dtype=float)
+
+    roots = np.full(n, np.nan)
+    roots[np.abs(fb) <= ftol] = b[np.abs(fb) <= ftol]
+    roots[np.abs(fa) <= ftol] = a[np.abs(fa) <= ftol]
+    active = ((fa * fb) < 0) & np.isnan(roots)
+
+    for _ in range(max_iter):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+
+        a_i, b_i, fa_i, fb_i = a[idx], b[idx], fa[idx], fb[idx]
+        denominator = fb_i - fa_i
+        # secant step through the bracket, bisect if it is degenerate
+        with np.errstate(divide="ignore", invalid="ignore"):
+            c = b_i - fb_i * (b_i - a_i) / denominator
+        mid = (a_i + b_i) / 2
+        inside = (c > np.minimum(a_i, b_i)) & (c < np.maximum(a_i, b_i))
+        c = np.where((denominator != 0) & inside, c, mid)
+        fc = np.asarray(func(c, idx), dtype=float)
+
+        # keep the bracket around the root, halve the stale end (Illinois)
+        sign_change = (fc * fb_i) < 0
+        a[idx] = np.where(sign_change, b_i, a_i)
+        fa[idx] = np.where(sign_change, fb_i, fa_i / 2)
+        b[idx] = c
+        fb[idx] = fc
+
+        done = (np.abs(fc) <= ftol) | (np.abs(b[idx] - a[idx]) < xtol)
+        roots[idx[done]] = c[done]
+        active[idx[done]] = False
+
+    # return the best estimate for anything that ran out of iterations
+    roots[active] = b[active]
+    return roots
+
+
+def pmv_roots(
+    targets,
+    low,
+    high,
+    tr,
+    vr,
+    rh,
+    met: float,
+    clo: float,
+    wme: float = 0,
+    standard: str = "ISO",
+    units: str = "SI",
+    xtol: float = 1e-3,
+    ftol: float = 0,
+    max_iter: int = 100,
+):
+    # dry-bulb temperatures in [low, high] at which the PMV equals the targets, tr, vr
+    # and rh are either scalars or arrays aligned with the targets and tr=None solves
+    # for the operative temperature (tdb = tr), it is a module level function so that
+    # it can be sent to the workers of a process pool
+    targets = np.asarray(targets, dtype=float)
+    operative = tr is None
+    tr, vr, rh = (
+        np.broadcast_to(np.asarray(x, dtype=float), targets.shape)
+        for x in (0 if operative else tr, vr, rh)
+    )
+
+    def residual(tdb, idx):
+        return (
+            batch_pmv(
+                tdb,
+                tr=tdb if operative else tr[idx],
+                vr=vr[idx],
+                rh=rh[idx],
+                met=met,
+                clo=clo,
+                wme=wme,
+                standard=standard,
+                units=units,
+            )
+            - targets[idx]
+        )
+
+    return bracketed_roots(residual, low, high, xtol=xtol, ftol=ftol, max_iter=max_iter)
+
+
+BOUNDARY_TABLE_AXES = ("tr", "vr", "met", "clo", "pmv_limit", "rh")
+
+
+def boundary_table_path(directory: str = BoundaryTableSettings.directory.value):
+    return Path(__file__).resolve().parent.parent / directory
+
+
+@functools.lru_cache(maxsize=1)
+def boundary_table(directory: str = BoundaryTableSettings.directory.value):
+    # axes and memory-mapped values of the precomputed boundaries, the values have one
+    # dimension per BOUNDARY_TABLE_AXES, None if the table has not been built
+    directory = boundary_table_path(directory)
+    try:
+        with np.load(directory / "pmv_boundaries_axes.npz") as axes:
+            axes = {name: axes[name] for name in BOUNDARY_TABLE_AXES}
+        values = np.load(directory / "pmv_boundaries.npy", mmap_mode="r")
+    except FileNotFoundError:
+        return None
+    return axes, values
+
+
+def tabulated_boundaries(
+    pmv_limits,
+    rh_values,
+    tr: float,
+    vr: float,
+    met: float,
+    clo: float,
+    wme: float = 0,
+    standard: str = "ISO",
+    units: str = "SI",
+):
+    """Boundaries interpolated from the precomputed table.
+
+    Same result and shape as ``pmv_boundaries`` but the dry-bulb temperatures are
+    interpolated multilinearly in t_r, v_r, met and clo. Points whose limit or rh
+    is not in the table, inputs outside of the grid and points whose PMV misses
+    the limit by more than the tolerance of the table are returned as NaN.
+    """
+    limits = np.atleast_1d(np.asarray(pmv_limits, dtype=float))
+    rh = np.atleast_1d(np.asarray(rh_values, dtype=float))
+    tdb = np.full((limits.size, rh.size), np.nan)
+    table = boundary_table()
+    if table is None or wme != 0:
+        return tdb
+    axes, values = table
+
+    if units == UnitSystem.IP.value:
+        tr, vr = units_converter(tr=tr, vr=vr)
+    # the ASHRAE cooling effect only applies above 0.1 m/s, below it equals ISO
+    if standard.lower() != "iso" and vr > 0.1:
+        return tdb
+
+    # a single slice of the memory map holds the corners around the inputs, they are
+    # interpolated one axis at a time
+    lower = []
+    weights = []
+    for name, value in zip(BOUNDARY_TABLE_AXES, (tr, vr, met, clo)):
+        axis = axes[name]
+        if not axis[0] <= value <= axis[-1]:
+            return tdb
+        i = min(np.searchsorted(axis, value, side="right") - 1, axis.size - 2)
+        lower.append(i)
+        weights.append((value - axis[i]) / (axis[i + 1] - axis[i]))
+    corners = np.asarray(values[tuple(slice(i, i + 2) for i in lower)], dtype=float)
+    for w in weights:
+        corners = corners[0] * (1 - w) + corners[1] * w
+
+    limit_match = np.isclose(limits[:, np.newaxis], axes["pmv_limit"])
+    rh_match = np.isclose(rh[:, np.newaxis], axes["rh"])
+    tdb = np.where(
+        limit_match.any(axis=1)[:, np.newaxis] & rh_match.any(axis=1),
+        corners[np.ix_(limit_match.argmax(axis=1), rh_match.argmax(axis=1))],
+        np.nan,
+    )
+
+    # accuracy check, a single PMV evaluation of all the interpolated points, with
+    # the heat balance of the ISO PMV as pmv() rounds it to 2 decimals
+    limits_grid, rh_grid = np.meshgrid(limits, rh, indexing="ij")
+    known = ~np.isnan(tdb)
+    error = np.abs(
+        pmv_ppd_heat_losses(tdb[known], tr, vr, rh_grid[known], met, clo)["pmv"]
+        - limits_grid[known]
+    )
+    rejected = np.zeros(tdb.shape, dtype=bool)
+    rejected[known] = error > BoundaryTableSettings.pmv_tolerance.value + 1e-9
+    tdb[rejected] = np.nan
+
+    if units == UnitSystem.IP.value:
+        tdb = units_converter(tdb=tdb, from_units="si")[0]
+    return tdb
+
+
+@memoize_boundaries
+def pmv_boundaries(
+    pmv_limits,
+    rh_values,
+    tr: float,
+    vr: float,
+    met: float,
+    clo: float,
+    wme: float = 0,
+    standard: str = "ISO",
+    units: str = "SI",
+    low: float = 10,
+    high: float = 120,
+    xtol: float = 1e-3,
+):
+    # dry-bulb temperatures at which the PMV equals each limit, for every rh value
+    # the result has shape (len(pmv_limits), len(rh_values))
+    limits_grid, rh_grid = np.meshgrid(
+        np.asarray(pmv_limits, dtype=float),
+        np.asarray(rh_values, dtype=float),
+        indexing="ij",
+    )
+    tdb = tabulated_boundaries(
+        pmv_limits, rh_values, tr, vr, met, clo, wme, standard, units
+    )
+    tdb[(tdb < low) | (tdb > high)] = np.nan
+
+    # the points that the table does not cover are solved exactly
+    missed = np.isnan(tdb)
+    if not missed.any():
+        return tdb
+    tdb[missed] = map_chunks(
+        pmv_roots,
+        split={
+            "targets": limits_grid[missed],
+            "rh": rh_grid[missed],
+            "low": np.full(missed.sum(), low, dtype=float),
+            "high": np.full(missed.sum(), high, dtype=float),
+        },
+        tr=tr,
+        vr=vr,
+        met=met,
+        clo=clo,
+        wme=wme,
+        standard=standard,
+        units=units,
+        xtol=xtol,
+    )
+    return tdb
+
+
+@memoize_boundaries
+def find_tdb_for_pmv(
+    target_pmv,
+    rh,
+    tr: float,
+    vr: float,
+    met: float,
+    clo: float,
+    wme: float = 0,
+    standard: str = "ISO",
+    units: str = "SI",
+    tol: float = 1e-2,
+    max_iter: int = 100,
+):
+    # dry-bulb temperature at which the PMV matches each target for every rh value,
+    # read from the precomputed table when possible, otherwise the outermost rh values
+    # are solved over the full range and the remaining ones are seeded from their
+    # neighbours, the result has shape (len(target_pmv), len(rh))
+    targets = np.atleast_1d(np.asarray(target_pmv, dtype=float))
+    rh = np.atleast_1d(np.asarray(rh, dtype=float))
+
+    if units == UnitSystem.SI.value:
+        low, high, window = 10, 40, 1.0
+    else:
+        low, high, window = 50, 96.8, 1.8
+
+    def solve(target_flat, rh_flat, low_flat, high_flat):
+        return map_chunks(
+            pmv_roots,
+            split={
+                "targets": target_flat,
+                "rh": rh_flat,
+                "low": low_flat,
+                "high": high_flat,
+            },
+            tr=tr,
+            vr=vr,
+            met=met,
+            clo=clo,
+            wme=wme,
+            standard=standard,
+            units=units,
+            xtol=0,
+            ftol=tol,
+            max_iter=max_iter,
+        )
+
+    target_grid, rh_grid = np.meshgrid(targets, rh, indexing="ij")
+    tdb = tabulated_boundaries(targets, rh, tr, vr, met, clo, wme, standard, units)
+    tdb[(tdb < low) | (tdb > high)] = np.nan
+    # without the table the outermost rh values are solved first
+    edges = np.unique([0, rh.size - 1])
+    cold_start = np.isnan(tdb).all()
+    if cold_start:
+        tdb[:, edges] = solve(
+            target_grid[:, edges].ravel(),
+            rh_grid[:, edges].ravel(),
+            np.full(targets.size * edges.size, low, dtype=float),
+            np.full(targets.size * edges.size, high, dtype=float),
+        ).reshape(targets.size, edges.size)
+
+    # warm start the inner rh values from their neighbours
+    inner = np.setdiff1d(np.arange(rh.size), edges)
+    if cold_start and inner.size and not np.isnan(tdb[:, edges]).any():
+        seed = np.array(
+            [np.interp(rh[inner], rh[edges], row[edges]) for row in tdb]
+        ).ravel()
+        tdb[:, inner] = solve(
+            target_grid[:, inner].ravel(),
+            rh_grid[:, inner].ravel(),
+            np.clip(seed - window, low, high),
+            np.clip(seed + window, low, high),
+        ).reshape(targets.size, inner.size)
+
+    # anything the narrow brackets missed is solved over the full range
+    missed = np.isnan(tdb)
+    if missed.any():
+        tdb[missed] = solve(
+            target_grid[missed],
+            rh_grid[missed],
+            np.full(missed.sum(), low, dtype=float),
+            np.full(missed.sum(), high, dtype=float),
+        )
+
+    if np.isnan(tdb).any():
+        raise ValueError(
+            "Unable to find suitable t_db value within maximum number of iterations"
+        )
+
+    return np.round(tdb, 2)
+
+
+@memoize_boundaries
+def pmv_speed_boundaries(
+    pmv_limits,
+    vr_values,
+    rh: float,
+    met: float,
+    clo: float,
+    wme: float = 0,
+    standard: str = "ISO",
+    low: float = 10,
+    high: float = 40,
+    xtol: float = 1e-3,
+):
+    # operative temperatures (tdb = tr) in °C at which the PMV equals each limit for
+    # every relative air speed, the result has shape (len(pmv_limits), len(vr_values))
+    limits_grid, vr_grid = np.meshgrid(
+        np.asarray(pmv_limits, dtype=float),
+        np.asarray(vr_values, dtype=float),
+        indexing="ij",
+    )
+    t_op = map_chunks(
+        pmv_roots,
+        split={
+            "targets": limits_grid.ravel(),
+            "vr": vr_grid.ravel(),
+            "low": np.full(limits_grid.size, low, dtype=float),
+            "high": np.full(limits_grid.size, high, dtype=float),
+        },
+        tr=None,
+        rh=rh,
+        met=met,
+        clo=clo,
+        wme=wme,
+        standard=standard,
+        units=UnitSystem.SI.value,
+        xtol=xtol,
+    )
+    return t_op.reshape(limits_grid.shape)
@@ -0,0 +1,165 @@
+import functools
+import hashlib
+import json
+import threading
+
+from pythermalcomfort.models import pmv_ppd, set_tmp, cooling_effect
+from pythermalcomfort.utilities import v_relative, clo_dynamic
+
+from utils.comfort_boundaries import BoundaryCache
+from utils.my_config_file import ElementsIDs, Models, CacheSettings
+
+
+def shared_result(func):
+    # like functools.cached_property, which has no lock since Python 3.12, so that
+    # a result asked for by update_chart and update_outputs at once is computed once
+    @functools.wraps(func)
+    def get(self):
+        with self._lock:
+            if func.__name__ not in self._results:
+                self._results[func.__name__] = func(self)
+            return self._results[func.__name__]
+
+    return property(get)
+
+
+class ComfortCondition:
+    # comfort model results of one set of inputs, in the units of the inputs, each
+    # result is calculated the first time it is used and then shared
+    def __init__(self, tdb, tr, v, rh, met, clo, units: str, standard: str):
+        # reentrant as the results use vr and clo_d
+        self._lock = threading.RLock()
+        self._results = {}
+        self.tdb = tdb
+        self.tr = tr
+        self.v = v
+        self.rh = rh
+        self.met = met
+        self.clo = clo
+        self.units = units
+        self.standard = standard
+
+    @shared_result
+    def vr(self):
+        return v_relative(v=self.v, met=self.met)
+
+    @shared_result
+    def clo_d(self):
+        return clo_dynamic(clo=self.clo, met=self.met)
+
+    @shared_result
+    def pmv_ppd(self):
+        return pmv_ppd(
+            tdb=self.tdb,
+            tr=self.tr,
+            vr=self.vr,
+            rh=self.rh,
+            met=self.met,
+            clo=self.clo_d,
+            wme=0,
+            limit_inputs=True,
+            units=self.units,
+            standard=self.standard,
+        )
+
+    @shared_result
+    def set_tmp(self):
+        return set_tmp(
+            tdb=self.tdb,
+            tr=self.tr,
+            v=self.vr,
+            rh=self.rh,
+            met=self.met,
+            clo=self.clo_d,
+            wme=0,
+            limit_inputs=True,
+            units=self.units,
+            standard=self.standard,
+        )
+
+    @shared_result
+    def cooling_effect(self):
+        return cooling_effect(
+            tdb=self.tdb,
+            tr=self.tr,
+            vr=self.vr,
+            rh=self.rh,
+            met=self.met,
+            clo=self.clo_d,
+            wme=0,
+            units=self.units,
+        )
+
+
+# ids of the tdb, tr, v, rh, met and clo inputs of each condition
+CONDITION_INPUTS = (
+    ElementsIDs.t_db_input,
+    ElementsIDs.t_r_input,
+    ElementsIDs.v_input,
+    ElementsIDs.rh_input,
+    ElementsIDs.met_input,
+    ElementsIDs.clo_input,
+)
+COMPARE_CONDITION_INPUTS = (
+    ElementsIDs.t_db_input_input2,
+    ElementsIDs.t_r_input_input2,
+    ElementsIDs.v_input_input2,
+    ElementsIDs.rh_input_input2,
+    ElementsIDs.met_input_input2,
+    ElementsIDs.clo_input_input2,
+)
+
+
+class ComfortContext:
+    # comfort model results of the inputs of the store, condition holds the first set
+    # of inputs and compare_condition the second one, when the models are compared
+    def __init__(self, inputs: dict):
+        units = inputs[ElementsIDs.UNIT_TOGGLE.value]
+        standard = (
+            "ashrae"
+            if inputs.get(ElementsIDs.MODEL_SELECTION.value) == Models.PMV_ashrae.name
+            else "ISO"
+        )
+        self.condition = ComfortCondition(
+            *[inputs.get(input_id.value) for input_id in CONDITION_INPUTS],
+            units=units,
+            standard=standard,
+        )
+        self.compare_condition = None
+        if ElementsIDs.t_db_input_input2.value in inputs:
+            self.compare_condition = ComfortCondition(
+                *[inputs.get(input_id.value) for input_id in COMPARE_CONDITION_INPUTS],
+                units=units,
+                standard=standard,
+            )
+
+
+# kept in memory only, the results of a context are computed after it is stored
+context_cache = BoundaryCache(
+    max_size=CacheSettings.context_max_size.value,
+    ttl=CacheSettings.context_ttl_seconds.value,
+)
+
+
+def inputs_hash(inputs: dict) -> str:
+    # the selected chart does not change any comfort model result
+    model_inputs = {
+        k: v for k, v in inputs.items() if k != ElementsIDs.chart_selected.value
+    }
+    return hashlib.sha1(
+        json.dumps(model_inputs, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+_context_lock = threading.Lock()
+
+
+def comfort_context(inputs: dict) -> ComfortContext:
+    # built once per change of the inputs, update_chart and update_outputs run at the
+    # same time on the same change of the store, the context is created and stored
+    # under the lock, which is cheap as its results are computed when used, so that
+    # they get the same one
+    with _context_lock:
+        return context_cache.get_or_compute(
+            inputs_hash(inputs), lambda: ComfortContext(inputs)
+        )
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+
+from utils.batch_results import batch_inputs, batch_results
+from utils.my_config_file import (
+    ADAPTIVE_CATEGORIES,
+    PMV_EN_CATEGORIES,
+    ComfortLevel,
+    ComfortHoursSettings,
+    Models,
+    UnitSystem,
+)
+
+# columns of batch_results with the comfort level of each adaptive category
+ADAPTIVE_LEVELS = {
+    "cat_iii": "class_iii",
+    "cat_ii": "class_ii",
+    "cat_i": "class_i",
+    "80": "acceptability_80",
+    "90": "acceptability_90",
+}
+SUMMARY_COLUMNS = [
+    "occupied_hours",
+    "unevaluated_hours",
+    "comfort_hours",
+    "comfort_percentage",
+    "exceedance_hours",
+    "warm_hours",
+    "cool_hours",
+    "degree_hours",
+    "warm_degree_hours",
+    "cool_degree_hours",
+]
+
+
+def pmv_categories(selected_model: str) -> dict:
+    # PMV limits of the categories of the model, from the widest to the narrowest
+    if selected_model == Models.PMV_ashrae.name:
+        return {0.5: "PMV ±0.5"}
+    return {
+        limit: f"Category {name}"
+        for limit, name in sorted(PMV_EN_CATEGORIES.items(), reverse=True)
+        if np.isfinite(limit)
+    }
+
+
+def category_exceedance(selected_model: str, results: pd.DataFrame):
+    """Rows above and below the range of each comfort category of the model.
+
+    Yields the name of the category, the rows evaluated, the rows too warm and too
+    cool, and how far above and below the range they are, in PMV units for the PMV
+    models and in degrees of operative temperature for the adaptive models.
+    """
+    if selected_model in (Models.PMV_ashrae.name, Models.PMV_EN.name):
+        pmv = results["pmv"].to_numpy(dtype=float)
+        evaluated = np.isfinite(pmv)
+        for limit, name in pmv_categories(selected_model).items():
+            warm = np.where(evaluated, pmv - limit, 0)
+            cool = np.where(evaluated, -limit - pmv, 0)
+            yield name, evaluated, warm > 0, cool > 0, warm, cool
+        return
+
+    model = "iso" if selected_model == Models.Adaptive_EN.name else "ashrae"
+    t_op = results["t_op"].to_numpy(dtype=float)
+    for category, name, _ in ADAPTIVE_CATEGORIES[model]:
+        # the levels are the ones of the results, the operative temperature is
+        # rounded and is only used for the degree hours
+        levels = results[ADAPTIVE_LEVELS[category]].to_numpy()
+        evaluated = pd.notna(levels)
+        too_warm = levels == ComfortLevel.TOO_WARM.description
+        too_cool = levels == ComfortLevel.TOO_COOL.description
+        warm = np.where(
+            too_warm, t_op - results[f"tmp_cmf_{category}_up"].to_numpy(dtype=float), 0
+        )
+        cool = np.where(
+            too_cool,
+            results[f"tmp_cmf_{category}_low"].to_numpy(dtype=float) - t_op,
+            0,
+        )
+        yield name, evaluated, too_warm, too_cool, warm, cool
+
+
+def comfort_hours_totals(
+    selected_model: str, results: pd.DataFrame, occupied=None, hours=1.0
+) -> pd.DataFrame:
+    # occupied, unevaluated, warm and cool hours and degree hours of each category,
+    # they add up over the chunks of a file and are summarised by
+    # comfort_hours_summary
+    weights = np.broadcast_to(np.asarray(hours, dtype=float), len(results))
+    if occupied is not None:
+        weights = weights * np.asarray(occupied, dtype=bool)
+    totals = {}
+    for name, evaluated, too_warm, too_cool, warm, cool in category_exceedance(
+        selected_model, results
+    ):
+        occupied_weights = np.where(evaluated, weights, 0)
+        totals[name] = {
+            "occupied_hours": occupied_weights.sum(),
+            "unevaluated_hours": weights.sum() - occupied_weights.sum(),
+            "warm_hours": occupied_weights[too_warm].sum(),
+            "cool_hours": occupied_weights[too_cool].sum(),
+            "warm_degree_hours": occupied_weights[too_warm] @ warm[too_warm],
+            "cool_degree_hours": occupied_weights[too_cool] @ cool[too_cool],
+        }
+    return pd.DataFrame.from_dict(totals, orient="index").rename_axis("category")
+
+
+def comfort_hours_summary(totals: pd.DataFrame) -> pd.DataFrame:
+    summary = totals.copy()
+    summary["exceedance_hours"] = summary["warm_hours"] + summary["cool_hours"]
+    summary["comfort_hours"] = summary["occupied_hours"] - summary["exceedance_hours"]
+    summary["comfort_percentage"] = (
+        100 * summary["comfort_hours"] / summary["occupied_hours"].replace(0, np.nan)
+    )
+    summary["degree_hours"] = (
+        summary["warm_degree_hours"] + summary["cool_degree_hours"]
+    )
+    return summary[SUMMARY_COLUMNS]
+
+
+def comfort_hours(
+    selected_model: str,
+    records,
+    units: str = UnitSystem.SI.value,
+    occupied=None,
+    hours=1.0,
+    defaults: dict = None,
+) -> pd.DataFrame:
+    """Hours in comfort of a series of conditions, e.g. the 8760 hours of a year.
+
+    The records are evaluated with the models of display_results, see batch_inputs
+    for their columns. occupied flags the rows counted, all of them by default, and
+    hours is the duration of each row. Returns one row per comfort category of the
+    model, from the widest to the narrowest, with the occupied hours that could be
+    evaluated, the occupied hours that could not, e.g. outside the applicability
+    limits of the model, the hours in comfort and their percentage of the evaluated
+    ones, the hours above and below the range and the degree hours, i.e. the sum of
+    the hours weighted by how far above or below the range they are, in PMV units
+    for the PMV models.
+    """
+    inputs = batch_inputs(selected_model, records, units, defaults)
+    results = batch_results(selected_model, inputs, units)
+    return comfort_hours_summary(
+        comfort_hours_totals(selected_model, results, occupied, hours)
+    )
+
+
+def occupied_rows(chunk: pd.DataFrame):
+    # occupancy column of a chunk of a file, the rows are occupied if it is missing
+    for name in ComfortHoursSettings.occupancy_columns.value:
+        if name in chunk:
+            return pd.to_numeric(chunk[name], errors="coerce").fillna(0).to_numpy() > 0
+    return None
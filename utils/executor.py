@@ -0,0 +1,72 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from utils.my_config_file import ExecutorMode, ExecutorSettings
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count() -> int:
+    # single-core containers and the serial mode solve everything in the caller
+    if ExecutorSettings.mode.value == ExecutorMode.serial.value:
+        return 1
+    cores = available_cores()
+    return max(1, min(ExecutorSettings.max_workers.value or cores, cores))
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(workers: int):
+    # the pool is created on first use and re-created in forked processes, e.g. the
+    # background callbacks, which do not own the pool of their parent
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            if ExecutorSettings.mode.value == ExecutorMode.process.value:
+                _executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="boundaries"
+                )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def map_chunks(func, split: dict, **shared) -> np.ndarray:
+    """Evaluate ``func`` on contiguous chunks of the arrays in ``split``.
+
+    Every chunk receives the same ``shared`` keyword arguments and the results are
+    concatenated in the order of the chunks, so they do not depend on the number
+    of workers as long as ``func`` treats its elements independently.
+    """
+    size = len(next(iter(split.values())))
+    n_chunks = min(worker_count(), size // ExecutorSettings.min_chunk_size.value)
+    if n_chunks <= 1:
+        return func(**split, **shared)
+
+    executor = get_executor(worker_count())
+
+    def submit(**kwargs):
+        if isinstance(executor, ThreadPoolExecutor):
+            # each thread runs in a copy of the context of the caller, which carries
+            # its context variables such as the request metrics
+            return executor.submit(contextvars.copy_context().run, func, **kwargs)
+        return executor.submit(func, **kwargs)
+
+    futures = [
+        submit(**{name: values[chunk] for name, values in split.items()}, **shared)
+        for chunk in np.array_split(np.arange(size), n_chunks)
+    ]
+    return np.concatenate([future.result() for future in futures])
@@ -1,32 +1,16 @@
-from copy import deepcopy
+import functools
 
 from dash import no_update
 from utils.my_config_file import (
     Models,
-    UnitSystem,
     convert_units,
     ElementsIDs,
     Functionalities,
     UnitConverter,
+    UNITS_CONVERSION,
 )
 
 
-def find_dict_with_key_value(d, key, value):
-    if isinstance(d, dict):
-        if d.get(key) == value:
-            return d
-        for k, v in d.items():
-            result = find_dict_with_key_value(v, key, value)
-            if result is not None:
-                return result
-    elif isinstance(d, list):
-        for item in d:
-            result = find_dict_with_key_value(item, key, value)
-            if result is not None:
-                return result
-    return None
-
-
 def extract_float(value):
     if isinstance(value, (int, float)):
         return float(value)
@@ -43,86 +27,68 @@ def extract_float(value):
     return None
 
 
+@functools.lru_cache(maxsize=None)
+def default_model_inputs(
+    selected_model: str, units: str, compare: bool = False
+) -> tuple:
+    # frozen model inputs with their default values, converted once per unit system
+    # and shared by all the requests, inputs2 are the ones of the compared condition
+    model_info = Models[selected_model].value
+    model_inputs = model_info.inputs2 if compare else model_info.inputs
+    return tuple(convert_units(model_inputs or [], units))
+
+
+def model_inputs_snapshot(
+    selected_model: str,
+    units: str,
+    compare: bool = False,
+    values: dict = None,
+    values_units: str = None,
+) -> tuple:
+    # model inputs of a single request, the values entered by the user, in
+    # values_units, replace the defaults without modifying the shared definitions
+    model_inputs = default_model_inputs(selected_model, units, compare)
+    if not values:
+        return model_inputs
+
+    snapshot = []
+    for model_input in model_inputs:
+        value = values.get(model_input.id)
+        value = extract_float(str(value)) if value is not None else None
+        if value is None:
+            snapshot.append(model_input)
+            continue
+        if values_units is not None and values_units != units:
+            from_unit = UNITS_CONVERSION[values_units].get(model_input.unit)
+            if from_unit is not None:
+                value = UnitConverter.convert_value(value, from_unit, model_input.unit)
+        snapshot.append(model_input.model_copy(update={"value": value}))
+    return tuple(snapshot)
+
+
 def get_inputs(
     selected_model: str,
     form_content: dict,
     units: str,
     functionality_selection: str,
-    type: str,
+    form_units: str = None,
 ):
+    # form_content maps the ids of the inputs, of the form or of the url, to their
+    # values which are in form_units, by default the units selected
     if selected_model is None:
         return no_update
 
-    list_model_inputs = list(Models[selected_model].value.inputs)
-
+    combined_model_inputs = model_inputs_snapshot(
+        selected_model, units, values=form_content, values_units=form_units
+    )
     if functionality_selection == Functionalities.Compare.value and selected_model in [
         Models.PMV_ashrae.name
     ]:
-        list_model_inputs2 = list(Models[selected_model].value.inputs2)
-        combined_model_inputs = list_model_inputs + list_model_inputs2
-    else:
-        combined_model_inputs = list_model_inputs
-
-    # updating the values of the model inputs with the values from the form
-    for model_input in combined_model_inputs:
-        if type == "input":
-            input_dict = find_dict_with_key_value(form_content, "id", model_input.id)
-
-            if input_dict and "value" in input_dict:
-                original_value = input_dict["value"]
-                converted_value = extract_float(str(original_value))
-
-                if converted_value is not None:
-                    model_input.value = converted_value
-        elif type == "url":
-            original_value = form_content.get(model_input.id)
-
-            if original_value is not None:
-                converted_value = extract_float(str(original_value))
-
-                if converted_value is not None:
-                    model_input.value = converted_value
-
-    # converting the units if necessary
-    if type == "input":
-        if units == UnitSystem.IP.value:
-            combined_model_inputs = convert_units(
-                combined_model_inputs, UnitSystem.IP.value
-            )
-        elif units == UnitSystem.SI.value:
-            combined_model_inputs = convert_units(
-                combined_model_inputs, UnitSystem.SI.value
-            )
+        combined_model_inputs += model_inputs_snapshot(
+            selected_model, units, True, values=form_content, values_units=form_units
+        )
 
     inputs = {}
-    # creat model_inputs_dict to store default value,over range use default
-    model_inputs_dict = {
-        input.id: input for input in Models[selected_model].value.inputs
-    }
-
-    if units == UnitSystem.IP.value:
-        for model_input in combined_model_inputs:
-            if model_input.unit == UnitSystem.celsius.value:
-                model_input.unit = UnitSystem.fahrenheit.value
-                model_input.min = UnitConverter.convert_value(
-                    model_input.min,
-                    UnitSystem.celsius.value,
-                    UnitSystem.fahrenheit.value,
-                )
-                model_input.max = UnitConverter.convert_value(
-                    model_input.max,
-                    UnitSystem.celsius.value,
-                    UnitSystem.fahrenheit.value,
-                )
-            elif model_input.unit == UnitSystem.m_s.value:
-                model_input.unit = UnitSystem.ft_s.value
-                model_input.min = UnitConverter.convert_value(
-                    model_input.min, UnitSystem.m_s.value, UnitSystem.ft_s.value
-                )
-                model_input.max = UnitConverter.convert_value(
-                    model_input.max, UnitSystem.m_s.value, UnitSystem.ft_s.value
-                )
-
     for model_input in combined_model_inputs:
         if model_input.min <= model_input.value <= model_input.max:
             inputs[model_input.id] = model_input.value
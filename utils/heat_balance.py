@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+from pythermalcomfort.models import two_nodes
+
+
+def pmv_ppd_heat_losses(ta, tr, vel, rh, met, clo, wme=0, max_iter: int = 150):
+    """Heat losses of the ISO 7730 PMV heat balance, SI units.
+
+    All the inputs are broadcast against each other, the clothing surface
+    temperature fixed point is iterated for every element at once and an element
+    stops being updated as soon as it has converged.
+    """
+    ta, tr, vel, rh, met, clo, wme = np.broadcast_arrays(
+        *[np.asarray(x, dtype=float) for x in (ta, tr, vel, rh, met, clo, wme)]
+    )
+
+    pa = rh * 10 * np.exp(16.6536 - 4030.183 / (ta + 235))
+    icl = 0.155 * clo
+    m = met * 58.15
+    w = wme * 58.15
+    mw = m - w
+
+    fcl = np.where(icl <= 0.078, 1 + 1.29 * icl, 1.05 + 0.645 * icl)
+
+    hcf = 12.1 * np.sqrt(vel)
+    hc = hcf.copy()
+    taa = ta + 273
+    tra = tr + 273
+    t_cla = taa + (35.5 - ta) / (3.5 * icl + 0.1)
+
+    p1 = icl * fcl
+    p2 = p1 * 3.96
+    p3 = p1 * 100
+    p4 = p1 * taa
+    p5 = 308.7 - 0.028 * mw + (p2 * (tra / 100.0) ** 4)
+    xn = t_cla / 100
+    xf = t_cla / 50
+    eps = 0.00015
+
+    active = np.abs(xn - xf) > eps
+    n = 0
+    while active.any():
+        i = np.flatnonzero(active)
+        xf[i] = (xf[i] + xn[i]) / 2
+        hcn = 2.38 * np.abs(100.0 * xf[i] - taa[i]) ** 0.25
+        hc[i] = np.where(hcf[i] > hcn, hcf[i], hcn)
+        xn[i] = (p5[i] + p4[i] * hc[i] - p2[i] * xf[i] ** 4) / (100 + p3[i] * hc[i])
+        active[i] = np.abs(xn[i] - xf[i]) > eps
+        n += 1
+        if n > max_iter:
+            raise ValueError("Max iterations exceeded")
+
+    tcl = 100 * xn - 273
+
+    hl1 = 3.05 * 0.001 * (5733 - 6.99 * mw - pa)
+    hl2 = np.where(mw > 58.15, 0.42 * (mw - 58.15), 0)
+    hl3 = 1.7 * 0.00001 * m * (5867 - pa)
+    hl4 = 0.0014 * m * (34 - ta)
+    hl5 = 3.96 * fcl * (xn**4 - (tra / 100.0) ** 4)
+    hl6 = fcl * hc * (tcl - ta)
+
+    ts = 0.303 * np.exp(-0.036 * m) + 0.028
+    pmv = ts * (mw - hl1 - hl2 - hl3 - hl4 - hl5 - hl6)
+
+    ppd = 100.0 - 95.0 * np.exp(-0.03353 * pmv**4.0 - 0.2179 * pmv**2.0)
+
+    return {
+        "pmv": pmv,
+        "ppd": ppd,
+        "hl1": hl1,
+        "hl2": hl2,
+        "hl3": hl3,
+        "hl4": hl4,
+        "hl5": hl5,
+        "hl6": hl6,
+    }
+
+
+def two_nodes_outputs(
+    tdb,
+    tr,
+    v,
+    rh,
+    met,
+    clo,
+    wme=0,
+    p_atmospheric: int = 101325,
+    body_position: str = "standing",
+    calculate_ce: bool = False,
+):
+    """Two-node model outputs plotted in the SET outputs chart, SI units.
+
+    The model is evaluated for all the inputs in one call, the final clothing and
+    mean body temperatures, which two_nodes does not return, are obtained by
+    repeating its last time steps with the converged skin and core temperatures.
+    Returns a DataFrame with one row per element of the broadcast inputs.
+    """
+    tdb, tr, v, rh, met, clo, wme = np.broadcast_arrays(
+        *[
+            np.atleast_1d(np.asarray(x, dtype=float))
+            for x in (tdb, tr, v, rh, met, clo, wme)
+        ]
+    )
+    results = two_nodes(
+        tdb=tdb,
+        tr=tr,
+        v=v,
+        rh=rh,
+        met=met,
+        clo=clo,
+        wme=wme,
+        p_atmospheric=p_atmospheric,
+        body_position=body_position,
+        calculate_ce=calculate_ce,
+    )
+    t_skin = results["t_skin"]
+    t_core = results["t_core"]
+
+    alfa = np.full(tdb.shape, 0.1)
+    sbc = 0.000000056697
+    pressure_in_atmospheres = float(p_atmospheric / 101325)
+    length_time_simulation = 60  # length time simulation
+    r_clo = 0.155 * clo
+    f_a_cl = 1.0 + 0.15 * clo
+    h_cc = 3.0 * pow(pressure_in_atmospheres, 0.53)
+    h_fc = 8.600001 * pow((v * pressure_in_atmospheres), 0.53)
+    h_cc = np.maximum(h_cc, h_fc)
+    if not calculate_ce:
+        h_c_met = 5.66 * np.maximum(met - 0.85, 0) ** 0.39
+        h_cc = np.where(met > 0.85, np.maximum(h_cc, h_c_met), h_cc)
+    # ratio between radiation area of the body and the body area
+    radiation_area = 0.7 if body_position == "sitting" else 0.73
+    h_r = np.full(tdb.shape, 4.7)
+    h_t = h_r + h_cc
+    r_a = 1.0 / (f_a_cl * h_t)
+    t_op = (h_r * tr + h_cc * tdb) / h_t
+
+    for _ in range(length_time_simulation):
+        iteration_limit = 150  # for following while loop
+        # t_cl temperature of the outer surface of clothing
+        t_cl = (r_a * t_skin + r_clo * t_op) / (r_a + r_clo)  # initial guess
+        n_iterations = 0
+        active = np.ones(tdb.shape, dtype=bool)
+        while active.any():
+            i = np.flatnonzero(active)
+            # 0.95 is the clothing emissivity from ASHRAE fundamentals Ch. 9.7 Eq. 35
+            h_r[i] = (
+                4.0 * 0.95 * sbc * ((t_cl[i] + tr[i]) / 2.0 + 273.15) ** 3.0
+            ) * radiation_area
+            h_t[i] = h_r[i] + h_cc[i]
+            r_a[i] = 1.0 / (f_a_cl[i] * h_t[i])
+            t_op[i] = (h_r[i] * tr[i] + h_cc[i] * tdb[i]) / h_t[i]
+            t_cl_new = (r_a[i] * t_skin[i] + r_clo[i] * t_op[i]) / (r_a[i] + r_clo[i])
+            active[i] = np.abs(t_cl_new - t_cl[i]) > 0.01
+            t_cl[i] = t_cl_new
+            n_iterations += 1
+
+            if n_iterations > iteration_limit:
+                raise StopIteration("Max iterations exceeded")
+
+        t_body = alfa * t_skin + (1 - alfa) * t_core
+        # update alfa
+        alfa = 0.0417737 + 0.7451833 / (results["m_bl"] + 0.585417)
+
+    return pd.DataFrame(
+        {
+            "set": results["_set"],
+            "t_skin": t_skin,
+            "t_core": t_core,
+            "t_cl": t_cl,
+            "t_body": t_body,
+            "e_skin": results["e_skin"],
+            "e_rsw": results["e_rsw"],
+            "e_diff": results["e_skin"] - results["e_rsw"],
+            "q_sensible": results["q_sensible"],
+            "q_skin": results["q_skin"],
+            "q_res": results["q_res"],
+            "w": results["w"] * 100,
+        }
+    )
+
+
+def compile_two_nodes():
+    # two_nodes is compiled by numba the first time it is called in a process, ~5 s,
+    # the jobs of the background callbacks are forked from the server and inherit
+    # it compiled if it is called before them
+    two_nodes_outputs(tdb=25, tr=25, v=0.1, rh=50, met=1.2, clo=0.5)
@@ -0,0 +1,263 @@
+import contextvars
+import functools
+import importlib
+import json
+import logging
+import threading
+import time
+
+import diskcache
+import flask
+
+from utils.comfort_boundaries import background_cache_path
+from utils.my_config_file import InstrumentationSettings
+
+# comfort models counted per callback, and the names they are called by
+COUNTED_MODELS = {
+    "pmv": ("pmv", "pmv_ppd"),
+    "set_tmp": ("set_tmp", "two_nodes"),
+}
+# modules whose calls of the comfort models are counted
+INSTRUMENTED_MODULES = (
+    "utils.comfort_boundaries",
+    "utils.comfort_context",
+    "utils.heat_balance",
+)
+CALLBACK_ROUTE = "_dash-update-component"
+# query arguments of the requests polling the result of a background callback job
+JOB_POLL_ARGS = ("cacheKey", "job")
+
+# model calls of the callback handled by the current request
+model_calls = contextvars.ContextVar("model_calls", default=None)
+
+
+def count_calls(func, model: str):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        calls = model_calls.get()
+        if calls is not None:
+            calls[model] += 1
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def instrument_models():
+    for module_name in INSTRUMENTED_MODULES:
+        module = importlib.import_module(module_name)
+        for model, names in COUNTED_MODELS.items():
+            for name in names:
+                func = getattr(module, name, None)
+                if callable(func) and not hasattr(func, "__wrapped__"):
+                    setattr(module, name, count_calls(func, model))
+
+
+class CallbackMetrics:
+    # running totals per callback, rendered in the Prometheus text format
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self._callbacks = {}
+        self._lock = threading.Lock()
+
+    def observe(self, record: dict):
+        with self._lock:
+            stats = self._callbacks.setdefault(
+                record["callback"],
+                {
+                    "requests": 0,
+                    "wall_seconds": 0.0,
+                    "cpu_seconds": 0.0,
+                    "request_bytes": 0,
+                    "response_bytes": 0,
+                    "buckets": [0] * len(self.buckets),
+                    **{f"{model}_calls": 0 for model in COUNTED_MODELS},
+                },
+            )
+            stats["requests"] += 1
+            for key in stats:
+                if key in record:
+                    stats[key] += record[key]
+            for i, bound in enumerate(self.buckets):
+                if record["wall_seconds"] <= bound:
+                    stats["buckets"][i] += 1
+
+    def render(self) -> str:
+        with self._lock:
+            callbacks = {name: dict(stats) for name, stats in self._callbacks.items()}
+
+        lines = []
+
+        def metric(name, kind, description, samples):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        histogram = []
+        for name, stats in callbacks.items():
+            name = label(name)
+            for bound, count in zip(self.buckets, stats["buckets"]):
+                histogram.append(
+                    f'dash_callback_wall_seconds_bucket{{callback="{name}",le="{bound}"}}'
+                    f" {count}"
+                )
+            histogram.append(
+                f'dash_callback_wall_seconds_bucket{{callback="{name}",le="+Inf"}}'
+                f' {stats["requests"]}'
+            )
+            histogram.append(
+                f'dash_callback_wall_seconds_sum{{callback="{name}"}}'
+                f' {stats["wall_seconds"]}'
+            )
+            histogram.append(
+                f'dash_callback_wall_seconds_count{{callback="{name}"}}'
+                f' {stats["requests"]}'
+            )
+        metric(
+            "dash_callback_wall_seconds",
+            "histogram",
+            "Wall time of the callback requests.",
+            histogram,
+        )
+        for key, kind, description in (
+            ("requests", "counter", "Callback requests handled."),
+            ("cpu_seconds", "counter", "CPU time of the callback requests."),
+            ("pmv_calls", "counter", "Calls of the PMV model by the callbacks."),
+            ("set_tmp_calls", "counter", "Calls of the SET model by the callbacks."),
+            ("request_bytes", "counter", "Size of the callback requests."),
+            ("response_bytes", "counter", "Size of the callback responses."),
+        ):
+            name = f"dash_callback_{key}_total"
+            metric(
+                name,
+                kind,
+                description,
+                [
+                    f'{name}{{callback="{label(callback)}"}} {stats[key]}'
+                    for callback, stats in callbacks.items()
+                ],
+            )
+        return "\n".join(lines) + "\n"
+
+
+def label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def callback_name(app, body: dict) -> str:
+    output = body.get("output", "")
+    callback = app.callback_map.get(output, {}).get("callback")
+    return getattr(callback, "__name__", None) or output
+
+
+def callback_logger() -> logging.Logger:
+    logger = logging.getLogger(InstrumentationSettings.logger_name.value)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def job_records() -> diskcache.Deque:
+    # records of the background callback jobs, which run in other processes, until
+    # the metrics of the server read them
+    return diskcache.Deque(
+        directory=str(
+            background_cache_path(InstrumentationSettings.job_directory.value)
+        )
+    )
+
+
+def instrument_background(func):
+    """Record the wall time, CPU time and comfort model calls of a background
+    callback in the process of its job. The requests submitting and polling the job
+    are not recorded, only the job is, it is logged and added to the metrics of the
+    server. Nothing is recorded unless the instrumentation is enabled."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not InstrumentationSettings.enabled.value:
+            return func(*args, **kwargs)
+        instrument_models()
+        calls = {model: 0 for model in COUNTED_MODELS}
+        token = model_calls.set(calls)
+        start = (time.perf_counter(), time.process_time())
+        try:
+            return func(*args, **kwargs)
+        finally:
+            model_calls.reset(token)
+            record = {
+                "callback": func.__name__,
+                "wall_seconds": time.perf_counter() - start[0],
+                "cpu_seconds": time.process_time() - start[1],
+                **{f"{model}_calls": count for model, count in calls.items()},
+            }
+            job_records().append(record)
+            callback_logger().info(
+                json.dumps({"severity": "INFO", "event": "background_job", **record})
+            )
+
+    return wrapper
+
+
+def is_background(app, body: dict) -> bool:
+    if any(arg in flask.request.args for arg in JOB_POLL_ARGS):
+        return True
+    return bool(app.callback_map.get(body.get("output", ""), {}).get("long"))
+
+
+def instrument_app(app):
+    """Record the wall time, CPU time, comfort model calls and payload sizes of
+    every callback request of the app, besides the background callbacks, they are logged as JSON lines and exposed
+    in the Prometheus text format. Nothing is installed unless it is called."""
+    metrics = CallbackMetrics(InstrumentationSettings.wall_time_buckets.value)
+    logger = callback_logger()
+    instrument_models()
+    server = app.server
+
+    @server.before_request
+    def start_callback_timer():
+        if flask.request.path.endswith(CALLBACK_ROUTE):
+            flask.g.callback_start = (time.perf_counter(), time.thread_time())
+            flask.g.callback_calls = {model: 0 for model in COUNTED_MODELS}
+            flask.g.callback_calls_token = model_calls.set(flask.g.callback_calls)
+
+    @server.after_request
+    def record_callback(response):
+        start = flask.g.pop("callback_start", None)
+        if start is None:
+            return response
+        model_calls.reset(flask.g.pop("callback_calls_token"))
+        calls = flask.g.pop("callback_calls")
+        body = flask.request.get_json(silent=True) or {}
+        # background callbacks are recorded by their job, see instrument_background
+        if is_background(app, body):
+            return response
+        record = {
+            "callback": callback_name(app, body),
+            "status": response.status_code,
+            "wall_seconds": time.perf_counter() - start[0],
+            "cpu_seconds": time.thread_time() - start[1],
+            **{f"{model}_calls": count for model, count in calls.items()},
+            "request_bytes": flask.request.content_length or 0,
+            "response_bytes": response.calculate_content_length() or 0,
+        }
+        metrics.observe(record)
+        logger.info(json.dumps({"severity": "INFO", "event": "callback", **record}))
+        return response
+
+    @server.route(InstrumentationSettings.metrics_route.value)
+    def callback_metrics():
+        records = job_records()
+        while True:
+            try:
+                metrics.observe(records.popleft())
+            except IndexError:
+                break
+        return flask.Response(
+            metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+    return metrics
@@ -1,8 +1,9 @@
+import os
 import platform
 from enum import Enum
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class Dimensions(Enum):
@@ -31,6 +32,7 @@ class ElementsIDs(Enum):
     FOOTER = "id-footer"
     INPUT_SECTION = "id-input-section"
     inputs_form = "id-inputs-form"
+    model_input = "model-input"  # type of the pattern-matching ids of the inputs
     t_db_input = "id-dbt-input"
     t_r_input = "id-tr-input"
     t_rm_input = "id-trm-input"
@@ -64,6 +66,17 @@ class ElementsIDs(Enum):
     PMV_ASHRAE_SPEED_SELECTION = "id-pmv-ashrae-speed-method"
     UNIT_TOGGLE = "id-unit-toggle"  # FOR IP / SI Unit system switch
     GRAPH_HOVER = "id-graph-hover"
+    CHART_PROGRESS = "id-chart-progress"
+    BULK_UPLOAD_BUTTON = "id-bulk-upload-button"
+    BULK_UPLOAD_STATUS = "id-bulk-upload-status"
+    BULK_PLOT_BUTTON = "id-bulk-plot-button"
+    TIME_SERIES_GRAPH = "id-time-series-graph"
+    DENSITY_OVERLAY = "id-density-overlay"
+
+
+def model_input_id(input_id) -> dict:
+    # the inputs of the models are read with a single ALL pattern-matching callback
+    return {"type": ElementsIDs.model_input.value, "id": input_id}
 
 
 class Config(Enum):
@@ -71,6 +84,120 @@ class Config(Enum):
     DEBUG: bool = "macOS" in platform.platform() or "Windows" in platform.platform()
 
 
+class CacheSettings(Enum):
+    # comfort-zone boundaries shared by all the chart functions
+    boundaries_max_size: int = 256
+    boundaries_ttl_seconds: int = 3600
+    boundaries_decimals: int = 3
+    # comfort model results of the inputs, shared by the charts and the results
+    context_max_size: int = 64
+    context_ttl_seconds: int = 600
+
+
+class InputSettings(Enum):
+    # quiet period after the last change of the form before its values are sent
+    quiet_period_ms: int = 300
+
+
+class BackgroundSettings(Enum):
+    # diskcache directory shared by the server and the background callback processes
+    cache_directory: str = ".background_cache"
+    # seconds after which the results of the background callbacks are discarded
+    expire: int = 600
+    # milliseconds between two polls of the browser for the result of a job
+    poll_interval: int = 200
+
+
+class ExecutorMode(Enum):
+    serial = "serial"
+    thread = "thread"
+    process = "process"
+
+
+class ExecutorSettings(Enum):
+    # pool that spreads the independent boundary solves across the cores, off by
+    # default as a chart has too few of them to fill more than one chunk, it can be
+    # set with the COMFORT_EXECUTOR environment variable, e.g. to build the tables
+    mode: str = os.environ.get("COMFORT_EXECUTOR", ExecutorMode.serial.value)
+    # 0 uses all the cores available to the process
+    max_workers: int = 0
+    # smallest number of boundary points solved by one worker
+    min_chunk_size: int = 32
+
+
+class InstrumentationSettings(Enum):
+    # callback metrics, enabled at startup with COMFORT_INSTRUMENTATION=1
+    enabled: bool = os.environ.get("COMFORT_INSTRUMENTATION", "") in ("1", "true")
+    metrics_route: str = "/metrics"
+    logger_name: str = "comfort_dash.callbacks"
+    # upper bounds of the wall time histogram buckets, in seconds
+    wall_time_buckets: tuple = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    # records of the background callback jobs, read by the metrics of the server
+    job_directory: str = os.path.join(
+        BackgroundSettings.cache_directory.value, "callback_metrics"
+    )
+
+
+class ApiSettings(Enum):
+    # batch endpoint of the comfort models served next to the Dash pages
+    url_prefix: str = "/api/v1"
+    comfort_route: str = "/comfort"
+    file_route: str = "/comfort/file"
+    series_route: str = "/comfort/series"
+    hours_route: str = "/comfort/hours"
+    # records evaluated at once, the memory used by a request is bounded by it
+    chunk_size: int = 1000
+    # largest number of records of a JSON request, NDJSON requests are not limited
+    max_records: int = 100000
+    # files evaluated by the bulk upload of the home page
+    file_types: tuple = (".csv", ".parquet")
+
+
+class DownsamplingMethod(Enum):
+    lttb = "lttb"
+    min_max = "min_max"
+
+
+class TimeSeriesSettings(Enum):
+    # results of the uploaded files plotted by the time series chart, kept on disk
+    directory: str = ".series_cache"
+    # seconds after which the results of an uploaded file are discarded
+    expire: int = 3600
+    # columns holding the timestamps of the rows, the first one found is used
+    time_columns: tuple = ("time", "timestamp", "datetime", "date")
+    # largest number of points of each trace sent for the range shown
+    max_points: int = 2000
+    method: str = DownsamplingMethod.lttb.value
+
+
+class ComfortHoursSettings(Enum):
+    # columns flagging the occupied rows of a file, the first one found is used
+    occupancy_columns: tuple = ("occupancy", "occupied")
+
+
+class DensityOverlaySettings(Enum):
+    # bins of the 2D histogram of the points of a plotted file shown on the charts
+    x_bins: int = 104
+    y_bins: int = 100
+    colorscale: str = "YlOrRd"
+
+
+class BoundaryTableSettings(Enum):
+    # precomputed PMV boundaries, built with python -m utils.build_boundary_tables
+    directory: str = "boundary_tables"
+    # grid of the table, t_r [°C], v_r [m/s], met, clo, PMV limits and rh [%]
+    tr_values: tuple = tuple(range(10, 41, 2))
+    vr_values: tuple = (0, 0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5, 0.6, 0.8, 1)
+    met_values: tuple = tuple(round(0.8 + 0.1 * i, 1) for i in range(18))
+    clo_values: tuple = tuple(round(0.1 * i, 1) for i in range(16))
+    pmv_limits: tuple = (-0.7, -0.5, -0.2, 0.2, 0.5, 0.7)
+    rh_values: tuple = tuple(range(0, 101, 10))
+    # largest difference between the unrounded PMV at an interpolated boundary and
+    # its limit, half a rounding step of the PMV as for the exact solver, before the
+    # boundary is solved exactly
+    pmv_tolerance: float = 0.005
+
+
 class Functionalities(Enum):
     Default: str = "Default"
     Compare: str = "Compare"
@@ -104,12 +231,22 @@ class ToolUrls(Enum):
 
 class MyStores(Enum):
     input_data = "store_input_data"
+    chart_zone = "store_chart_zone"
+    form_inputs = "store_form_inputs"
+    input_settings = "store_input_settings"
+    chart_request = "store_chart_request"
+    upload_settings = "store_upload_settings"
+    series_dataset = "store_series_dataset"
 
 
 class ChartsInfo(BaseModel):
     name: str
     id: str
     note_chart: str = None
+    # inputs that only move the input markers, changing them patches the figure
+    marker_inputs: List[str] = []
+    # heavy charts are rendered by a background callback outside the request threads
+    background: bool = False
 
 
 class ComfortLevel(Enum):
@@ -128,21 +265,62 @@ class ComfortLevel(Enum):
         return self.description
 
 
+# upper PMV bound of each thermal sensation of ASHRAE 55 and of each EN-16798
+# category, the latter applies to the absolute value of the PMV
+PMV_SENSATIONS = {
+    -2.5: "Cold",
+    -1.5: "Cool",
+    -0.5: "Slightly Cool",
+    0.5: "Neutral",
+    1.5: "Slightly Warm",
+    2.5: "Warm",
+    10: "Hot",
+}
+PMV_EN_CATEGORIES = {0.2: "I", 0.5: "II", 0.7: "III", float("inf"): "IV"}
+
+# comfort bands of the adaptive models, from the widest to the narrowest
+ADAPTIVE_CATEGORIES = {
+    "iso": [
+        ("cat_iii", "Category III", "rgba(168, 195, 161, 0.6)"),
+        ("cat_ii", "Category II", "rgba(34, 139, 34, 0.5)"),
+        ("cat_i", "Category I", "rgba(0, 100, 0, 0.5)"),
+    ],
+    "ashrae": [
+        ("80", "80% Acceptability", "rgba(144, 205, 239, 0.8)"),
+        ("90", "90% Acceptability", "rgba(63, 105, 152, 0.8)"),
+    ],
+}
+
+
 class Charts(Enum):
     t_rh: ChartsInfo = ChartsInfo(
         name="Temperature vs. Relative Humidity",
         id="id_t_rh_chart",
         note_chart="This chart represents only two variables, dry-bulb temperature and relative humidity. The PMV calculations are still based on all the psychrometric variables, but the visualization becomes easier to understand.",
+        marker_inputs=[
+            ElementsIDs.t_db_input.value,
+            ElementsIDs.rh_input.value,
+            ElementsIDs.t_db_input_input2.value,
+            ElementsIDs.rh_input_input2.value,
+        ],
     )
     adaptive_en: ChartsInfo = ChartsInfo(
         name="Adaptive - EN-16798",
         id="id_adaptive_en_chart",
         note_chart="Method is applicable only for buildings without mechanical cooling systems and where there is easy access to operable windows and occupants may freely adapt their clothing to the indoor and/or outdoor thermal conditions. The criteria for the spaces are the following: (a) There is no mechanical cooling or heating system in operation; (b) Metabolic rates ranging from 1.0 to 1.3 met; (c) Occupants are allowed to freely adapt their clothing insulation.",
+        # t_db and tr widen the upper limits with the cooling effect of the air
+        # speed, only the running mean temperature just moves the marker
+        marker_inputs=[ElementsIDs.t_rm_input.value],
     )
     psychrometric: ChartsInfo = ChartsInfo(
         name="Psychrometric (air temperature)",
         id="id_psy_t_chart",
         note_chart="In this psychrometric chart the abscissa is the dry-bulb temperature, and the mean radiant temperature (MRT) is fixed, controlled by the inputbox. Each point on the chart has the same MRT, which defines the comfort zone boundary. In this way you can see how changes in MRT affect thermal comfort. You can also still use the operative temperature button, yet each point will have the same MRT.",
+        marker_inputs=[
+            ElementsIDs.t_db_input.value,
+            ElementsIDs.rh_input.value,
+        ],
+        background=True,
     )
     psychrometric_operative: ChartsInfo = ChartsInfo(
         name="Psychrometric (operative temperature)",
@@ -153,6 +331,10 @@ class Charts(Enum):
         name="Air speed vs. operative temperature",
         id="id_as_psy_chart",
         note_chart="This chart represents only two variables, air speed against operative temperature. The operative temperature for each point is determined by dry-bulb temperature equals mean radiant temperature (DBT = MRT). The calculation of PMV comfort zone is based on all the psychrometric variables, with PMV values between -0.5 and +0.5 according to the standard.",
+        marker_inputs=[
+            ElementsIDs.t_db_input.value,
+            ElementsIDs.v_input.value,
+        ],
     )
     thl_psychrometric: ChartsInfo = ChartsInfo(
         name="Thermal heat losses vs. air temperature",
@@ -163,11 +345,20 @@ class Charts(Enum):
         name="SET outputs chart",
         id="id_set_outputs_chart",
         note_chart="This chart shows how some variables, calculated using the SET model, vary as a function of the input parameters you selected. You can toggle on and off the lines by clicking on the relative variable in the legend.",
+        background=True,
     )
     adaptive_ashrae: ChartsInfo = ChartsInfo(
         name="Adaptive - ASHRAE",
         id="id_adaptive_ashrae_chart",
         note_chart="Method is applicable only for occupant-controlled naturally conditioned spaces that meet all of the following criteria: (a) There is no mechanical cooling system installed. No heating system is in operation; (b) Metabolic rates ranging from 1.0 to 1.3 met; and (c) Occupants are free to adapt their clothing to the indoor and/or outdoor thermal conditions within a range at least as wide as 0.5-1.0 clo.",
+        # t_db and tr widen the upper limits with the cooling effect of the air
+        # speed, only the running mean temperature just moves the marker
+        marker_inputs=[ElementsIDs.t_rm_input.value],
+    )
+    time_series: ChartsInfo = ChartsInfo(
+        name="Time series",
+        id="id_time_series_chart",
+        note_chart="This chart shows the PMV, or the operative temperature for the adaptive models, of every row of a file plotted with Plot time series in the Bulk evaluation section, against time, together with the comfort zone. Zoom in to see the values in more detail; the points are downsampled to the range shown.",
     )
 
 
@@ -230,70 +421,49 @@ class UnitConverter:
         return value
 
 
+# units of each model input in the unit system it is converted to
+UNITS_CONVERSION = {
+    UnitSystem.IP.value: {
+        UnitSystem.celsius.value: UnitSystem.fahrenheit.value,
+        UnitSystem.m_s.value: UnitSystem.ft_s.value,
+    },
+    UnitSystem.SI.value: {
+        UnitSystem.fahrenheit.value: UnitSystem.celsius.value,
+        UnitSystem.ft_s.value: UnitSystem.m_s.value,
+    },
+}
+
+
 def convert_units(model_inputs, to_unit_system):
+    # returns converted copies, the model inputs passed in are left untouched
+    converted_inputs = []
     for input_info in model_inputs:
-        if to_unit_system == UnitSystem.IP.value:
-            if input_info.unit == UnitSystem.celsius.value:
-                input_info.value = UnitConverter.convert_value(
-                    input_info.value,
-                    UnitSystem.celsius.value,
-                    UnitSystem.fahrenheit.value,
-                )
-                input_info.min = UnitConverter.convert_value(
-                    input_info.min,
-                    UnitSystem.celsius.value,
-                    UnitSystem.fahrenheit.value,
-                )
-                input_info.max = UnitConverter.convert_value(
-                    input_info.max,
-                    UnitSystem.celsius.value,
-                    UnitSystem.fahrenheit.value,
-                )
-                input_info.unit = UnitSystem.fahrenheit.value
-            elif input_info.unit == UnitSystem.m_s.value:
-                input_info.value = UnitConverter.convert_value(
-                    input_info.value, UnitSystem.m_s.value, UnitSystem.ft_s.value
-                )
-                input_info.min = UnitConverter.convert_value(
-                    input_info.min, UnitSystem.m_s.value, UnitSystem.ft_s.value
-                )
-                input_info.max = UnitConverter.convert_value(
-                    input_info.max, UnitSystem.m_s.value, UnitSystem.ft_s.value
-                )
-                input_info.unit = UnitSystem.ft_s.value
-        elif to_unit_system == UnitSystem.SI.value:
-            if input_info.unit == UnitSystem.fahrenheit.value:
-                input_info.value = UnitConverter.convert_value(
-                    input_info.value,
-                    UnitSystem.fahrenheit.value,
-                    UnitSystem.celsius.value,
-                )
-                input_info.min = UnitConverter.convert_value(
-                    input_info.min,
-                    UnitSystem.fahrenheit.value,
-                    UnitSystem.celsius.value,
-                )
-                input_info.max = UnitConverter.convert_value(
-                    input_info.max,
-                    UnitSystem.fahrenheit.value,
-                    UnitSystem.celsius.value,
-                )
-                input_info.unit = UnitSystem.celsius.value
-            elif input_info.unit == UnitSystem.ft_s.value:
-                input_info.value = UnitConverter.convert_value(
-                    input_info.value, UnitSystem.ft_s.value, UnitSystem.m_s.value
-                )
-                input_info.min = UnitConverter.convert_value(
-                    input_info.min, UnitSystem.ft_s.value, UnitSystem.m_s.value
-                )
-                input_info.max = UnitConverter.convert_value(
-                    input_info.max, UnitSystem.ft_s.value, UnitSystem.m_s.value
-                )
-                input_info.unit = UnitSystem.m_s.value
-    return model_inputs
+        to_unit = UNITS_CONVERSION.get(to_unit_system, {}).get(input_info.unit)
+        if to_unit is None:
+            converted_inputs.append(input_info)
+            continue
+        converted_inputs.append(
+            input_info.model_copy(
+                update={
+                    "value": UnitConverter.convert_value(
+                        input_info.value, input_info.unit, to_unit
+                    ),
+                    "min": UnitConverter.convert_value(
+                        input_info.min, input_info.unit, to_unit
+                    ),
+                    "max": UnitConverter.convert_value(
+                        input_info.max, input_info.unit, to_unit
+                    ),
+                    "unit": to_unit,
+                }
+            )
+        )
+    return converted_inputs
 
 
 class ModelInputsInfo(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     name: str
     unit: str
     min: float
@@ -325,6 +495,7 @@ class Models(Enum):
             Charts.wind_temp_chart.value,
             Charts.thl_psychrometric.value,
             Charts.set_outputs.value,
+            Charts.time_series.value,
         ],
         charts_compare=[
             Charts.t_rh.value,
@@ -451,6 +622,7 @@ class Models(Enum):
             # todo add the right charts
             Charts.psychrometric.value,
             Charts.t_rh.value,
+            Charts.time_series.value,
         ],
         inputs=[
             ModelInputsInfo(
@@ -515,6 +687,7 @@ class Models(Enum):
         charts=[
             # todo add the right charts
             Charts.adaptive_ashrae.value,
+            Charts.time_series.value,
         ],
         inputs=[
             ModelInputsInfo(
@@ -561,6 +734,7 @@ class Models(Enum):
         description="Adaptive - EN-16798",
         charts=[
             Charts.adaptive_en.value,
+            Charts.time_series.value,
         ],
         inputs=[
             ModelInputsInfo(
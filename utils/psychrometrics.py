@@ -0,0 +1,32 @@
+import functools
+
+import numpy as np
+from pythermalcomfort.psychrometrics import p_sat
+from pythermalcomfort.utilities import units_converter
+
+from utils.my_config_file import UnitSystem
+
+
+def humidity_ratio(tdb, rh, p_atm: float = 101325):
+    # same humidity ratio [kg/kg] as psy_ta_rh, without its wet bulb and dew point
+    # solves, for arrays of dry-bulb temperatures [°C] and relative humidities [%]
+    p_vap = np.asarray(rh, dtype=float) / 100 * p_sat(np.asarray(tdb, dtype=float))
+    return 0.62198 * p_vap / (p_atm - p_vap)
+
+
+@functools.lru_cache(maxsize=8)
+def rh_curves(units: str = UnitSystem.SI.value, p_atm: float = 101325):
+    # RH iso-lines of the psychrometric chart, they only depend on the unit system
+    # and the atmospheric pressure so they are computed once and shared read-only
+    rh_values = np.arange(0, 110, 10, dtype=float)
+    tdb_values = np.linspace(10, 36, 500, dtype=float)
+    hr_values = (
+        humidity_ratio(tdb_values[np.newaxis, :], rh_values[:, np.newaxis], p_atm)
+        * 1000
+    )  # kg/kg => g/kg
+    if units == UnitSystem.IP.value:
+        tdb_values = np.round(units_converter(tmp=tdb_values, from_units="si")[0], 1)
+
+    for values in (rh_values, tdb_values, hr_values):
+        values.setflags(write=False)
+    return rh_values, tdb_values, hr_values
@@ -0,0 +1,282 @@
+import contextlib
+import json
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.batch_results import batch_inputs, batch_results
+from utils.my_config_file import (
+    DownsamplingMethod,
+    ElementsIDs,
+    Models,
+    TimeSeriesSettings,
+)
+
+TIME_COLUMN = "time"
+# results of each model kept for the time series chart
+SERIES_COLUMNS = {
+    Models.PMV_ashrae.name: ("pmv",),
+    Models.PMV_EN.name: ("pmv",),
+    Models.Adaptive_EN.name: (
+        "t_op",
+        "tmp_cmf_cat_iii_low",
+        "tmp_cmf_cat_iii_up",
+        "tmp_cmf_cat_ii_low",
+        "tmp_cmf_cat_ii_up",
+        "tmp_cmf_cat_i_low",
+        "tmp_cmf_cat_i_up",
+    ),
+    Models.Adaptive_ASHRAE.name: (
+        "t_op",
+        "tmp_cmf_80_low",
+        "tmp_cmf_80_up",
+        "tmp_cmf_90_low",
+        "tmp_cmf_90_up",
+    ),
+}
+# inputs kept for the density overlay of the charts, for the models that have them
+OBSERVED_COLUMNS = {
+    "t_db": ElementsIDs.t_db_input.value,
+    "rh": ElementsIDs.rh_input.value,
+}
+NAT = np.datetime64("NaT").astype(np.int64)
+
+
+def series_path(dataset: str = "") -> Path:
+    return (
+        Path(__file__).resolve().parent.parent
+        / TimeSeriesSettings.directory.value
+        / dataset
+    )
+
+
+def remove_expired_series():
+    root = series_path()
+    if not root.is_dir():
+        return
+    for path in root.iterdir():
+        if time.time() - path.stat().st_mtime > TimeSeriesSettings.expire.value:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def chunk_times(chunk: pd.DataFrame, offset: int):
+    # timestamps of the rows in ns, or their row numbers if the file has no time
+    for name in TimeSeriesSettings.time_columns.value:
+        if name in chunk:
+            times = pd.to_datetime(chunk[name], errors="coerce", utc=True)
+            return times.dt.tz_localize(None).to_numpy().view(np.int64), True
+    return np.arange(offset, offset + len(chunk), dtype=np.int64), False
+
+
+def write_series(
+    selected_model: str, chunks, units: str, defaults: dict = None
+) -> dict:
+    """Evaluate the chunks of a file and keep the results plotted by the time series
+    chart, and the inputs of the density overlay, on disk, one raw array per
+    column, so that they can be memory-mapped. Rows without a valid time are
+    skipped and the others must be sorted by time."""
+    remove_expired_series()
+    dataset = uuid.uuid4().hex
+    path = series_path(dataset)
+    path.mkdir(parents=True)
+    model_inputs = {
+        model_input.id for model_input in Models[selected_model].value.inputs
+    }
+    observed = (
+        OBSERVED_COLUMNS if set(OBSERVED_COLUMNS.values()) <= model_inputs else {}
+    )
+    columns = (TIME_COLUMN, *SERIES_COLUMNS[selected_model], *observed)
+    rows, has_time = 0, False
+    try:
+        with contextlib.ExitStack() as stack:
+            files = {
+                name: stack.enter_context(open(path / f"{name}.bin", "wb"))
+                for name in columns
+            }
+            for chunk in chunks:
+                times, has_time = chunk_times(chunk, rows)
+                valid = times != NAT
+                times = times[valid]
+                if times.size == 0:
+                    continue
+                if np.any(np.diff(times) < 0) or (rows and times[0] < last_time):
+                    raise ValueError("the rows must be sorted by time")
+                last_time = times[-1]
+                chunk = chunk[valid]
+                inputs = batch_inputs(selected_model, chunk, units, defaults)
+                results = batch_results(selected_model, inputs, units)
+                times.tofile(files[TIME_COLUMN])
+                for name in SERIES_COLUMNS[selected_model]:
+                    results[name].to_numpy(dtype=float).tofile(files[name])
+                for name, input_id in observed.items():
+                    inputs[input_id].to_numpy(dtype=float).tofile(files[name])
+                rows += times.size
+        if rows == 0:
+            raise ValueError("the file has no rows with a valid time")
+    except BaseException:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+
+    meta = {
+        "dataset": dataset,
+        "model": selected_model,
+        "units": units,
+        "rows": rows,
+        "time": has_time,
+        "columns": columns,
+    }
+    (path / "meta.json").write_text(json.dumps(meta))
+    return meta
+
+
+def read_series(dataset: str):
+    # meta data and memory-mapped columns of a file, None once they are discarded
+    if not isinstance(dataset, str) or not re.fullmatch(r"[0-9a-f]{32}", dataset):
+        return None
+    path = series_path(dataset)
+    try:
+        meta = json.loads((path / "meta.json").read_text())
+    except FileNotFoundError:
+        return None
+    columns = {
+        name: np.memmap(
+            path / f"{name}.bin",
+            dtype=np.int64 if name == TIME_COLUMN else np.float64,
+            mode="r",
+        )
+        for name in meta["columns"]
+    }
+    return meta, columns
+
+
+def observed_points(dataset: str, units: str):
+    # dry-bulb temperatures and relative humidities of a plotted file in the units
+    # given, None if it was evaluated in other units or by a model without them
+    series = read_series(dataset)
+    if series is None:
+        return None
+    meta, columns = series
+    if meta["units"] != units or not set(OBSERVED_COLUMNS) <= set(columns):
+        return None
+    return columns["t_db"], columns["rh"]
+
+
+def relayout_range(relayout_data: dict):
+    # x range of a relayout event of the chart as (start, end), (None, None) when
+    # the chart is reset and None when the x axis was not changed. The bounds of a
+    # date axis are strings and are converted to timestamps in ns
+    if not relayout_data:
+        return None
+    if relayout_data.get("xaxis.autorange"):
+        return None, None
+    bounds = relayout_data.get("xaxis.range")
+    if bounds is None and "xaxis.range[0]" in relayout_data:
+        bounds = relayout_data["xaxis.range[0]"], relayout_data.get("xaxis.range[1]")
+    if bounds is None:
+        return None
+    return tuple(
+        pd.Timestamp(bound).value if isinstance(bound, str) else float(bound)
+        for bound in bounds
+    )
+
+
+def series_window(times: np.ndarray, start=None, end=None) -> slice:
+    # rows shown in the range, with one more row on each side so the lines reach
+    # the edges of the chart
+    low = 0 if start is None else max(np.searchsorted(times, start) - 1, 0)
+    high = (
+        len(times)
+        if end is None
+        else min(np.searchsorted(times, end, side="right") + 1, len(times))
+    )
+    return slice(low, high)
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Indices of the points kept by the largest triangle three buckets algorithm.
+
+    The first and last points are kept and the others are split in n_out - 2
+    buckets, from each one the point forming the largest triangle with the point
+    kept from the previous bucket and the mean of the next bucket is kept. NaNs
+    are not kept unless a bucket has no other values.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x - x[0], dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    finite = np.isfinite(y)
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[: n - 1], edges[:-1]) / sizes
+    counts = np.add.reduceat(finite[: n - 1], edges[:-1])
+    sums = np.add.reduceat(np.where(finite, y, 0)[: n - 1], edges[:-1])
+    bucket_y = np.divide(sums, counts, out=np.full(sums.size, np.nan), where=counts > 0)
+    # the next bucket of the last one is the last point
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(bucket_y[1:], y[-1])
+    # the y of a kept point or of a next bucket without finite values is replaced by
+    # the mean of the bucket, so that its finite points are still compared
+    mean_y = np.where(np.isnan(mean_y), bucket_y, mean_y)
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    kept = 0
+    for i, (low, high) in enumerate(zip(edges[:-1], edges[1:])):
+        kept_y = y[kept] if finite[kept] else bucket_y[i]
+        area = np.abs(
+            (x[kept] - mean_x[i]) * (y[low:high] - kept_y)
+            - (x[kept] - x[low:high]) * (mean_y[i] - kept_y)
+        )
+        kept = low + int(np.argmax(np.nan_to_num(area, nan=-1)))
+        indices[i + 1] = kept
+    return indices
+
+
+def min_max_indices(y, n_out: int) -> np.ndarray:
+    """Indices of the lowest and highest points of buckets of equal size.
+
+    The first and last points are kept, and the point before the last one when
+    n_out is odd, and the others are split in (n_out - 2) // 2 buckets. A bucket
+    whose lowest and highest points are the same, e.g. constant or without finite
+    values, keeps its first or last point instead, so n_out indices are returned,
+    in their order.
+    """
+    n = len(y)
+    n_buckets = (n_out - 2) // 2
+    if n <= n_out or n_buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    # each bucket has at least 2 points as n - 2 - n_out % 2 >= 2 * n_buckets
+    tail = np.arange(n - 1 - n_out % 2, n)
+    edges = np.linspace(1, tail[0], n_buckets + 1).astype(int)
+    positions = edges[:-1, None] + np.arange(np.diff(edges).max())
+    inside = positions < edges[1:, None]
+    values = y[np.minimum(positions, n - 1)]
+    inside &= np.isfinite(values)
+    rows = np.arange(n_buckets)
+    lowest = positions[rows, np.where(inside, values, np.inf).argmin(axis=1)]
+    highest = positions[rows, np.where(inside, values, -np.inf).argmax(axis=1)]
+    highest = np.where(
+        lowest != highest,
+        highest,
+        np.where(lowest == edges[:-1], edges[1:] - 1, edges[:-1]),
+    )
+    pairs = np.sort(np.stack([lowest, highest], axis=1), axis=1)
+    return np.concatenate([[0], pairs.ravel(), tail])
+
+
+def downsample(
+    x,
+    y,
+    n_out: int = TimeSeriesSettings.max_points.value,
+    method: str = TimeSeriesSettings.method.value,
+) -> np.ndarray:
+    if method == DownsamplingMethod.min_max.value:
+        return min_max_indices(y, n_out)
+    return lttb_indices(x, y, n_out)